@@ -0,0 +1,226 @@
+"""Генерация ходов сразу для множества досок на массивах NumPy (требует numpy).
+
+Пачка позиций хранится массивом (N, 8, 8) int8: 0 - пустая клетка, код фигуры (game.PIECE_KINDS)
+со знаком + у белых и - у чёрных, и массивом (N,) bool "ходят белые". Ходы, атаки и шахи
+считаются битбордами uint64 (бит row * 8 + col) операциями над всей пачкой: таблицы лучей
+строятся из описаний движения фигур (Piece.movement, у шашек ещё capture_movement), поэтому
+новые фигуры с описанием движения поддерживаются без изменений здесь.
+
+Маска ходов фигуры - те же клетки, что у Board.get_moves и Board.get_capture_moves (у шашек -
+первые прыжки взятия; полные цепочки - в checkers.py), атаки цвета - объединение масок ходов
+его фигур (как в AttackMap), шах - король стороны, которая ходит, на клетке атаки соперника.
+"""
+import numpy as np
+
+from game import PIECE_KINDS, Board, Checker, King
+from movement import CAPTURE_ONLY, DROP, JUMP_CAPTURE, MOVE_ONLY, MOVE_OR_CAPTURE
+
+# Коды фигур - коды game.PIECE_KINDS, у чёрных - со знаком минус
+COLORS = ["white", "black"]
+PIECE_CODES = {piece_type(color, *args): (index + 1) * (1 if color == "white" else -1)
+               for index, (piece_type, args) in enumerate(PIECE_KINDS) for color in COLORS}
+CODE_PIECES = {code: piece for piece, code in PIECE_CODES.items()}
+KING_CODE = PIECE_KINDS.index((King, ())) + 1
+
+ONE = np.uint64(1)
+ZERO = np.uint64(0)
+# Сколько позиций обрабатывать за раз
+CHUNK_SIZE = 4096
+
+
+def _square_mask(squares):
+    """Битовая маска клеток (строка, столбец)."""
+    mask = 0
+    for row, col in squares:
+        mask |= 1 << (row * 8 + col)
+    return mask
+
+
+def _compile(movement, color):
+    """Переводит скомпилированные лучи движения в таблицы масок (слот луча, клетка).
+
+    Для лучей: (режим, маски лучей, признак роста индекса клеток вдоль луча);
+    для взятий прыжком: (режим, маски перепрыгиваемых клеток, маски клеток приземления);
+    для переноса: (режим, None, None).
+    """
+    components = []
+    squares_rays = movement.tables[color]
+    for index, component in enumerate(movement.components):
+        mode = component.mode
+        if mode == DROP:
+            components.append((mode, None, None))
+            continue
+        rays = [squares_rays[square][index][1] for square in range(64)]
+        slots = max((len(square_rays) for square_rays in rays), default=0)
+        first = np.zeros((slots, 64), dtype=np.uint64)
+        second = np.zeros((slots, 64), dtype=np.uint64 if mode == JUMP_CAPTURE else bool)
+        for square, square_rays in enumerate(rays):
+            for slot, ray in enumerate(square_rays):
+                if mode == JUMP_CAPTURE:
+                    jumped, landing = ray
+                    first[slot, square] = _square_mask([jumped])
+                    second[slot, square] = _square_mask([landing])
+                else:
+                    first[slot, square] = _square_mask(ray)
+                    second[slot, square] = ray[0][0] * 8 + ray[0][1] > square
+        components.append((mode, first, second))
+    return components
+
+
+def _piece_tables(piece):
+    """Таблицы всех описаний движения фигуры."""
+    movements = [piece.movement]
+    if isinstance(piece, Checker):
+        movements.append(piece.capture_movement)
+    return [component for movement in movements for component in _compile(movement, piece.color)]
+
+
+TABLES = {code: _piece_tables(piece) for code, piece in CODE_PIECES.items()}
+
+
+def lowest_bit(bitboards):
+    """Младший установленный бит каждого битборда (0 для пустого)."""
+    return bitboards & (~bitboards + ONE)
+
+
+def highest_bit(bitboards):
+    """Старший установленный бит каждого битборда (0 для пустого)."""
+    filled = bitboards.copy()
+    for shift in (1, 2, 4, 8, 16, 32):
+        filled |= filled >> np.uint64(shift)
+    return filled ^ (filled >> ONE)
+
+
+def _component_moves(mode, first, second, squares, own, enemy, occupied, empty):
+    """Клетки ходов одной составляющей движения для фигур на клетках squares."""
+    if mode == DROP:
+        return empty.copy()
+    moves = np.zeros(len(squares), dtype=np.uint64)
+    for slot in range(len(first)):
+        if mode == JUMP_CAPTURE:
+            jumped = first[slot][squares]
+            landing = second[slot][squares]
+            moves |= np.where(((jumped & enemy) != ZERO) & ((landing & empty) != ZERO), landing, ZERO)
+            continue
+        ray = first[slot][squares]
+        blockers = ray & occupied
+        nearest = np.where(second[slot][squares], lowest_bit(blockers), highest_bit(blockers))
+        # Клетки луча до первой фигуры включительно
+        reachable = np.where(nearest == ZERO, ray,
+                             np.where(second[slot][squares], ray & ((nearest << ONE) - ONE), ray & ~(nearest - ONE)))
+        if mode == MOVE_OR_CAPTURE:
+            moves |= reachable & ~own
+        elif mode == MOVE_ONLY:
+            moves |= reachable & ~nearest
+        elif mode == CAPTURE_ONLY:
+            moves |= nearest & enemy
+    return moves
+
+
+def _move_masks(flat):
+    """Маски ходов для части пачки: flat - (M, 64) int8 кодов фигур."""
+    white, black = pack_squares(flat > 0), pack_squares(flat < 0)
+    occupied = white | black
+    empty = ~occupied
+    boards, squares = np.nonzero(flat)
+    codes = flat[boards, squares]
+    masks = np.zeros(flat.shape, dtype=np.uint64)
+    for code in np.unique(codes).tolist():
+        selected = codes == code
+        piece_boards = boards[selected]
+        piece_squares = squares[selected]
+        own = (white if code > 0 else black)[piece_boards]
+        enemy = (black if code > 0 else white)[piece_boards]
+        moves = np.zeros(len(piece_boards), dtype=np.uint64)
+        for mode, first, second in TABLES[code]:
+            moves |= _component_moves(mode, first, second, piece_squares, own, enemy, occupied[piece_boards], empty[piece_boards])
+        masks[piece_boards, piece_squares] = moves
+    return masks
+
+
+def pack_squares(flags):
+    """Превращает массив (N, 64) bool в битборды (N,) uint64."""
+    return np.packbits(flags, axis=1, bitorder="little").view("<u8").ravel()
+
+
+class BoardBatch:
+    """Пачка позиций одного варианта игры в массивах NumPy."""
+    def __init__(self, pieces, white_to_move, game_type="chess", modified_chess=False):
+        """Инициализация. pieces - (N, 8, 8) int8 кодов фигур, white_to_move - (N,) bool."""
+        self.pieces = np.ascontiguousarray(pieces, dtype=np.int8)
+        self.white_to_move = np.asarray(white_to_move, dtype=bool)
+        self.game_type = game_type
+        self.modified_chess = modified_chess
+        self._move_masks = None
+
+    def __len__(self):
+        """Число позиций в пачке."""
+        return len(self.pieces)
+
+    @classmethod
+    def from_boards(cls, boards):
+        """Кодирует доски в пачку. Все доски должны быть одного варианта игры."""
+        boards = list(boards)
+        variants = {(board.game_type, board.modified_chess) for board in boards}
+        if len(variants) > 1:
+            raise ValueError("В пачке должны быть доски одного варианта игры")
+        game_type, modified_chess = variants.pop() if variants else ("chess", False)
+        codes = PIECE_CODES
+        pieces = np.array([[codes[piece] if piece else 0 for row in board.board for piece in row] for board in boards],
+                          dtype=np.int8).reshape(len(boards), 8, 8)
+        white_to_move = np.array([board.current_player == "white" for board in boards], dtype=bool)
+        return cls(pieces, white_to_move, game_type, modified_chess)
+
+    def to_boards(self, move_cache=None):
+        """Восстанавливает доски из пачки (по умолчанию без кэша ходов)."""
+        boards = []
+        for pieces, white_to_move in zip(self.pieces.tolist(), self.white_to_move.tolist()):
+            board = Board(self.game_type, self.modified_chess, move_cache)
+            board.clear()
+            for row, codes in enumerate(pieces):
+                for col, code in enumerate(codes):
+                    if code:
+                        board.set_piece(row, col, CODE_PIECES[code])
+            board.current_player = "white" if white_to_move else "black"
+            boards.append(board)
+        return boards
+
+    def occupancy(self):
+        """Битборды фигур белых и чёрных: массивы (N,) uint64."""
+        flat = self.pieces.reshape(len(self), 64)
+        return pack_squares(flat > 0), pack_squares(flat < 0)
+
+    def move_masks(self):
+        """Маски ходов фигуры на каждой клетке: массив (N, 64) uint64 (0 для пустой клетки)."""
+        if self._move_masks is None:
+            count = len(self)
+            flat = self.pieces.reshape(count, 64)
+            masks = np.zeros((count, 64), dtype=np.uint64)
+            # Пачка обрабатывается частями: промежуточные массивы части остаются в кэше процессора
+            for start in range(0, count, CHUNK_SIZE):
+                masks[start:start + CHUNK_SIZE] = _move_masks(flat[start:start + CHUNK_SIZE])
+            self._move_masks = masks
+        return self._move_masks
+
+    def attack_masks(self):
+        """Клетки, на которые может пойти хоть одна фигура цвета: массив (N, 2) uint64 (белые, чёрные)."""
+        masks = self.move_masks()
+        flat = self.pieces.reshape(len(self), 64)
+        white = np.bitwise_or.reduce(np.where(flat > 0, masks, ZERO), axis=1)
+        black = np.bitwise_or.reduce(np.where(flat < 0, masks, ZERO), axis=1)
+        return np.stack([white, black], axis=1)
+
+    def check_flags(self):
+        """Шах королю стороны, которая ходит: массив (N,) bool."""
+        flat = self.pieces.reshape(len(self), 64)
+        kings = np.where(self.white_to_move, pack_squares(flat == KING_CODE), pack_squares(flat == -KING_CODE))
+        attacks = self.attack_masks()
+        opponent_attacks = np.where(self.white_to_move, attacks[:, 1], attacks[:, 0])
+        return (kings & opponent_attacks) != ZERO
+
+    def move_counts(self):
+        """Число ходов стороны, которая ходит: массив (N,) int (клетки масок, без проверки шаха)."""
+        flat = self.pieces.reshape(len(self), 64)
+        own = np.where(self.white_to_move[:, None], flat > 0, flat < 0)
+        masks = np.where(own, self.move_masks(), ZERO)
+        return np.unpackbits(masks.view(np.uint8), axis=1).sum(axis=1)
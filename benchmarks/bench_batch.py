@@ -0,0 +1,70 @@
+"""Замер генерации ходов для пачки позиций: по одной доске (Board.generate_moves) и на NumPy (batch.py).
+
+Позиции получаются случайными партиями из начальной расстановки и повторяются до нужного
+размера пачки. Путь по доскам на больших пачках замеряется на первых --scalar-limit позициях
+и пересчитывается на всю пачку (такие строки помечены *).
+Запуск из корня проекта: python -m benchmarks.bench_batch [--variant chess] [--sizes 1,10,100,1000,10000,100000]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from batch import BoardBatch
+from benchmarks.positions import random_positions
+from game import VARIANTS
+
+
+def scalar_masks(board):
+    """Маски ходов всех фигур и шах стороне, которая ходит, обычной генерацией по одной фигуре."""
+    masks = [0] * 64
+    opponent = "black" if board.current_player == "white" else "white"
+    opponent_attacks = 0
+    for color in ("white", "black"):
+        for row, col in board.pieces_of(color):
+            mask = 0
+            for end_row, end_col in board.generate_moves(row, col) + board.generate_capture_moves(row, col):
+                mask |= 1 << (end_row * 8 + end_col)
+            masks[row * 8 + col] = mask
+            if color == opponent:
+                opponent_attacks |= mask
+    return masks, bool(board.king_masks[board.current_player] & opponent_attacks)
+
+
+def main():
+    """Разбор аргументов и вывод таблицы."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--variant", choices=sorted(VARIANTS), default="chess")
+    parser.add_argument("--sizes", default="1,10,100,1000,10000,100000")
+    parser.add_argument("--positions", type=int, default=1000, help="различных позиций в пуле")
+    parser.add_argument("--scalar-limit", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    pool = random_positions(args.variant, args.positions, args.seed)
+    pool_batch = BoardBatch.from_boards(pool)
+    started = time.perf_counter()
+    BoardBatch.from_boards(pool)
+    encode_seconds = (time.perf_counter() - started) / len(pool)
+
+    print(f"{args.variant}: кодирование доски в пачку {encode_seconds * 1e6:.1f} мкс")
+    print(f"{'позиций':>10}{'по доскам, с':>16}{'NumPy, с':>12}{'мкс/позицию':>14}{'ускорение':>12}")
+    for size in [int(size) for size in args.sizes.split(",")]:
+        indices = np.arange(size) % len(pool)
+        batch = BoardBatch(pool_batch.pieces[indices], pool_batch.white_to_move[indices], pool_batch.game_type, pool_batch.modified_chess)
+        started = time.perf_counter()
+        batch.move_masks()
+        batch.check_flags()
+        vector_seconds = time.perf_counter() - started
+
+        measured = min(size, args.scalar_limit)
+        started = time.perf_counter()
+        for index in indices[:measured].tolist():
+            scalar_masks(pool[index])
+        scalar_seconds = (time.perf_counter() - started) * size / measured
+        mark = "*" if measured < size else " "
+        print(f"{size:>10}{scalar_seconds:>15.3f}{mark}{vector_seconds:>12.3f}{vector_seconds / size * 1e6:>14.1f}{scalar_seconds / vector_seconds:>11.1f}x")
+
+
+if __name__ == "__main__":
+    main()
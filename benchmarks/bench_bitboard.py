@@ -0,0 +1,69 @@
+"""Замер доски на битбордах (bitboard.py) против обычной доски на позициях эталонов perft.
+
+Для каждого эталона (perft_fixtures.json) и каждой доски замеряются:
+    генерация   perft.generate_moves - все ходы стороны в позиции эталона, мкс на вызов
+    perft       perft до наибольшей глубины эталона (с делом и отменой ходов), с
+Берётся лучшее время из --repeat прогонов, число листьев сверяется с эталоном.
+Запуск из корня проекта: python -m benchmarks.bench_bitboard [--fixture chess_middlegame] [--repeat 3]
+"""
+import argparse
+import time
+
+from perft import fixture_board, generate_moves, load_fixtures, perft
+
+
+def best_time(function, repeat):
+    """Лучшее время вызова function из repeat прогонов, с."""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def measure(fixture, engine, repeat, calls):
+    """Время генерации ходов (мкс на вызов) и perft (с) эталона на доске engine."""
+    board = fixture_board(fixture, engine)
+
+    def generate():
+        for _ in range(calls):
+            generate_moves(board, legal=fixture.get("legal", False))
+
+    depth, expected = max(fixture["nodes"].items(), key=lambda item: int(item[0]))
+    nodes = []
+
+    def run_perft():
+        nodes.append(perft(fixture_board(fixture, engine), int(depth), legal=fixture.get("legal", False)))
+
+    generation = best_time(generate, repeat) / calls * 1e6
+    elapsed = best_time(run_perft, repeat)
+    if any(count != expected for count in nodes):
+        raise AssertionError(f"{fixture['name']}, {engine}: perft({depth}) не совпал с эталоном {expected}")
+    return depth, generation, elapsed
+
+
+def main():
+    """Разбор аргументов и вывод таблицы."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fixture", help="имя эталона (по умолчанию все)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--calls", type=int, default=200, help="вызовов генерации ходов на замер")
+    args = parser.parse_args()
+
+    fixtures = [fixture for fixture in load_fixtures() if args.fixture in (None, fixture["name"])]
+    if not fixtures:
+        parser.error(f"нет эталона {args.fixture}")
+    print(f"{'эталон':<32}{'генерация, мкс':>24}{'ускор.':>8}{'perft, с':>27}{'ускор.':>8}")
+    print(f"{'':<32}{'обычная':>12}{'битборды':>12}{'':>8}{'глубина':>9}{'обычная':>9}{'битборды':>9}")
+    for fixture in fixtures:
+        depth, mailbox_generation, mailbox_perft = measure(fixture, "mailbox", args.repeat, args.calls)
+        _, bitboard_generation, bitboard_perft = measure(fixture, "bitboard", args.repeat, args.calls)
+        print(f"{fixture['name']:<32}{mailbox_generation:>12.1f}{bitboard_generation:>12.1f}"
+              f"{mailbox_generation / bitboard_generation:>8.2f}"
+              f"{depth:>9}{mailbox_perft:>9.2f}{bitboard_perft:>9.2f}{mailbox_perft / bitboard_perft:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Замер эндшпильной базы шашек (endgame.py): открытие, значение позиции и поиск подсказки с базой и без.
+
+Без --database база до --pieces шашек строится во временный файл (3 шашки - около полуминуты).
+Позиции - случайные расстановки из базы, поиск - Engine.search с ограничением по узлам.
+Запуск из корня проекта: python -m benchmarks.bench_endgame [--database checkers_endgame.db] [--positions 200]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from checkers import CheckersRules
+from endgame import BLACK_KING, BLACK_MAN, DARK_SQUARES, WHITE_KING, WHITE_MAN, EndgameDatabase, generate
+from engine import MATE_BOUND, Engine
+from game import Board
+
+
+def random_boards(count, max_pieces, seed):
+    """Случайные позиции шашек до max_pieces шашек, у каждой стороны хотя бы одна."""
+    rng = random.Random(seed)
+    boards = []
+    for _ in range(count):
+        board = Board("checkers", False, None)
+        board.clear()
+        squares = rng.sample(DARK_SQUARES, rng.randint(2, max_pieces))
+        for number, (row, col) in enumerate(squares):
+            color = "white" if number == 0 else "black" if number == 1 else rng.choice(["white", "black"])
+            # Простая не стоит на горизонтали своего превращения
+            is_king = rng.random() < 0.5 or row == (0 if color == "white" else 7)
+            board.set_piece(row, col, (WHITE_KING if is_king else WHITE_MAN) if color == "white" else (BLACK_KING if is_king else BLACK_MAN))
+        board.current_player = rng.choice(["white", "black"])
+        boards.append(board)
+    return boards
+
+
+def main():
+    """Разбор аргументов и вывод замеров."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database", help="готовая база (иначе строится во временный файл)")
+    parser.add_argument("--pieces", type=int, default=3)
+    parser.add_argument("--positions", type=int, default=200)
+    parser.add_argument("--nodes", type=int, default=20000, help="узлов на поиск")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    directory = None
+    path = args.database
+    if path is None:
+        directory = tempfile.TemporaryDirectory()
+        path = os.path.join(directory.name, "endgame.db")
+        started = time.perf_counter()
+        generate(path, args.pieces, log=lambda line: None)
+        print(f"построение до {args.pieces} шашек: {time.perf_counter() - started:.1f} с")
+
+    started = time.perf_counter()
+    database = EndgameDatabase(path)
+    print(f"открытие: {(time.perf_counter() - started) * 1e3:.2f} мс, файл {os.path.getsize(path)} байт "
+          f"({database.layout.end - database.layout.offsets[database.layout.materials[0]]} позиций, байт на позицию)")
+    boards = random_boards(args.positions, database.max_pieces, args.seed)
+    started = time.perf_counter()
+    for board in boards:
+        database.probe(board)
+    print(f"значение позиции: {(time.perf_counter() - started) / len(boards) * 1e6:.1f} мкс")
+
+    rules = CheckersRules(database.flying_kings)
+    for name, endgame in (("без базы", None), ("с базой", database)):
+        engine = Engine(endgame=endgame)
+        nodes = 0
+        solved = 0
+        started = time.perf_counter()
+        for board in boards:
+            engine.clear()
+            result = engine.search(board, rules, time_limit=None, node_limit=args.nodes)
+            nodes += result.nodes
+            solved += result.move is not None and abs(result.score) >= MATE_BOUND
+        print(f"поиск {name}: {(time.perf_counter() - started) / len(boards) * 1e3:.1f} мс на позицию, "
+              f"{nodes / len(boards):.0f} узлов, найден выигрыш или проигрыш: {solved} из {len(boards)}")
+    database.close()
+    if directory is not None:
+        directory.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Замер истории ходов: упакованная история (history.MoveHistory) против списка записей Move.
+
+Партия - ходы коней туда и обратно (g1-f3, g8-f6, f3-g1, f6-g8), чтобы её длина не
+ограничивалась концом игры. Для каждой длины замеряются память под историю и
+отмена N ходов: прежним способом (N раз Board.unmake_move) и через контрольные позиции.
+Запуск из корня проекта: python -m benchmarks.bench_history [--plies 10000]
+"""
+import argparse
+import io
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+
+from game import Board, Game
+
+SHUFFLE = [((7, 6), (5, 5)), ((0, 6), (2, 5)), ((5, 5), (7, 6)), ((2, 5), (0, 6))]
+
+
+def play_shuffle(make_move, plies):
+    """Делает plies ходов конями g1-f3, g8-f6 и обратно."""
+    for ply in range(plies):
+        (start_row, start_col), (end_row, end_col) = SHUFFLE[ply % len(SHUFFLE)]
+        make_move(start_row, start_col, end_row, end_col)
+
+
+def old_history(plies):
+    """Прежняя история: записи Move каждого хода на доске и список ссылок на них."""
+    board = Board(move_cache=None)
+    history = []
+    play_shuffle(lambda *move: history.append(board.make_move(*move)), plies)
+    return board, history
+
+
+def new_history(plies):
+    """Партия с упакованной историей."""
+    game = Game(move_cache=None)
+    play_shuffle(game.apply_move, plies)
+    return game
+
+
+def allocated(function, *args):
+    """Память, выделенная при вызове function, байт, и её результат."""
+    tracemalloc.start()
+    result = function(*args)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size, result
+
+
+def main():
+    """Разбор аргументов и вывод таблицы."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--plies", type=int, default=10000)
+    parser.add_argument("--undo", default="1,10,100,1000,10000")
+    args = parser.parse_args()
+
+    # Прогрев: ленивые импорты и общие таблицы не должны попасть в замер
+    old_history(1)
+    new_history(1)
+    baseline, _ = allocated(old_history, 0)
+    old_bytes, _ = allocated(old_history, args.plies)
+    new_baseline, _ = allocated(new_history, 0)
+    new_bytes, game = allocated(new_history, args.plies)
+    print(f"{args.plies} ходов: список Move {(old_bytes - baseline) / args.plies:.0f} байт/ход, "
+          f"упакованная история {(new_bytes - new_baseline) / args.plies:.1f} байт/ход (массивы {game.move_history.nbytes} байт)")
+
+    print(f"{'отмена N':>10}{'unmake, мс':>14}{'история, мс':>14}")
+    for count in [int(count) for count in args.undo.split(",") if int(count) <= args.plies]:
+        board, _ = old_history(args.plies)
+        started = time.perf_counter()
+        for _ in range(count):
+            board.unmake_move()
+        old_seconds = time.perf_counter() - started
+
+        game = new_history(args.plies)
+        started = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            game.undo_moves(count)
+        new_seconds = time.perf_counter() - started
+        print(f"{count:>10}{old_seconds * 1e3:>14.3f}{new_seconds * 1e3:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
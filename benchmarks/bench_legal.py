@@ -0,0 +1,62 @@
+"""Замер генерации допустимых ходов (legal.py) против возможных ходов и пробных ходов.
+
+Для позиций случайных партий замеряется время на позицию:
+    возможные ходы    perft.generate_moves - ходы всех фигур без проверки короля
+    допустимые ходы   legal.analyse - связки и шахи за один проход, затем фильтр ходов
+    пробные ходы      каждый возможный ход делается, король проверяется по карте атак, ход отменяется
+Запуск из корня проекта: python -m benchmarks.bench_legal [--variant all] [--positions 500]
+"""
+import argparse
+import time
+
+from benchmarks.positions import random_positions
+from legal import analyse
+from perft import generate_moves
+
+
+def trial_moves(board):
+    """Допустимые ходы пробными ходами: ход, проверка шаха своему королю, отмена."""
+    color = board.current_player
+    moves = []
+    for move in generate_moves(board):
+        board.make_move(*move)
+        if not board.attack_map.is_king_in_check(color):
+            moves.append(move)
+        board.unmake_move()
+    return moves
+
+
+def measure(function, boards, repeat):
+    """Среднее время вызова function на позицию, мкс."""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for board in boards:
+            function(board)
+    return (time.perf_counter() - started) / (repeat * len(boards)) * 1e6
+
+
+def main():
+    """Разбор аргументов и вывод таблицы."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--variant", choices=["all", "chess", "modified_chess"], default="all")
+    parser.add_argument("--positions", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    variants = ["chess", "modified_chess"] if args.variant == "all" else [args.variant]
+    print(f"{'вариант':<16}{'возможные, мкс':>16}{'допустимые, мкс':>17}{'пробные, мкс':>14}{'доп./возм.':>12}")
+    for variant in variants:
+        boards = random_positions(variant, args.positions, args.seed)
+        # Прогрев: таблицы лучей боя и ленивые карты атак не должны попасть в замер
+        for board in boards:
+            analyse(board)
+            board.attack_map.refresh()
+        pseudo = measure(generate_moves, boards, args.repeat)
+        legal = measure(analyse, boards, args.repeat)
+        trial = measure(trial_moves, boards, args.repeat)
+        print(f"{variant:<16}{pseudo:>16.1f}{legal:>17.1f}{trial:>14.1f}{legal / pseudo:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
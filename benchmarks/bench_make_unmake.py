@@ -0,0 +1,39 @@
+"""Замер циклов make_move/unmake_move и проверка, что позиция восстанавливается в точности.
+
+Запуск из корня проекта: python -m benchmarks.bench_make_unmake [--cycles N]
+"""
+import argparse
+import time
+
+from perft import VARIANTS, create_board, generate_moves
+
+
+def run(variant, cycles):
+    """Делает и отменяет все ходы из начальной позиции, пока не наберётся cycles циклов. Возвращает циклы в секунду."""
+    board = create_board(variant)
+    moves = generate_moves(board)
+    start_hash = board.zobrist_hash
+    done = 0
+    started = time.perf_counter()
+    while done < cycles:
+        for move in moves:
+            board.make_move(*move)
+            board.unmake_move()
+        done += len(moves)
+    elapsed = time.perf_counter() - started
+    if board.zobrist_hash != start_hash or board.zobrist_hash != board.compute_hash():
+        raise AssertionError("Позиция не восстановлена после unmake_move")
+    return done / elapsed
+
+
+def main():
+    """Разбор аргументов и вывод результатов."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cycles", type=int, default=200000)
+    args = parser.parse_args()
+    for variant in sorted(VARIANTS):
+        print(f"{variant:<16}{run(variant, args.cycles):>12,.0f} циклов/с")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Замер памяти: сколько байт занимает одна доска, когда в памяти держатся тысячи позиций.
+
+Запуск из корня проекта: python -m benchmarks.bench_memory [--boards N]
+"""
+import argparse
+import gc
+import tracemalloc
+
+from game import Board, Game
+
+VARIANTS = [("chess", "chess", False), ("modified_chess", "chess", True), ("checkers", "checkers", False)]
+
+
+def bytes_per_board(game_type, modified_chess, count, with_queries):
+    """Возвращает средний прирост памяти на одну доску. with_queries - после запросов угроз и шаха."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    boards = []
+    for _ in range(count):
+        if with_queries:
+            game = Game(game_type, modified_chess, move_cache=None)
+            game.find_threatened_pieces()
+            game.is_king_in_check()
+            boards.append(game.board)
+        else:
+            boards.append(Board(game_type, modified_chess, None))
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / count
+
+
+def main():
+    """Разбор аргументов и вывод таблицы."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--boards", type=int, default=2000)
+    args = parser.parse_args()
+    print(f"{'вариант':<16}{'байт на доску':>16}{'с картой атак':>16}")
+    for name, game_type, modified_chess in VARIANTS:
+        plain = bytes_per_board(game_type, modified_chess, args.boards, False)
+        queried = bytes_per_board(game_type, modified_chess, args.boards, True)
+        print(f"{name:<16}{plain:>16,.0f}{queried:>16,.0f}")
+
+
+if __name__ == "__main__":
+    main()
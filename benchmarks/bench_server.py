@@ -0,0 +1,125 @@
+"""Нагрузочный клиент сервера партий (server.py): задержка ходов при заданном числе сессий.
+
+Каждая сессия - отдельное подключение, которое играет случайными ходами (moves, затем move)
+и каждые --board-every ходов запрашивает кадр доски (тяжёлый запрос в исполнителе сервера).
+Замеряется задержка команды move (от отправки до конца ответа) и команды board.
+Без --unix/--port сервер запускается отдельным процессом на временном Unix-сокете.
+Запуск из корня проекта: python -m benchmarks.bench_server [--sessions 1000] [--moves 20] [--variant chess]
+"""
+import argparse
+import asyncio
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def percentile(values, fraction):
+    """Значение, ниже которого доля fraction отсортированных значений."""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+async def request(reader, writer, line):
+    """Отправляет команду и читает ответ до пустой строки: (успех, текст, строки данных)."""
+    writer.write((line + "\n").encode("utf-8"))
+    await writer.drain()
+    status = (await reader.readline()).decode("utf-8").rstrip("\n")
+    data = []
+    while True:
+        line = (await reader.readline()).decode("utf-8").rstrip("\n")
+        if not line:
+            break
+        data.append(line)
+    ok, _, text = status.partition(" ")
+    return ok == "ok", text, data
+
+
+async def run_session(connect, args, seed, move_latencies, board_latencies):
+    """Одна сессия: партии случайными ходами, пока не сделано args.moves ходов."""
+    rng = random.Random(seed)
+    reader, writer = await connect()
+    new_game = f"new {args.variant}"
+    await request(reader, writer, new_game)
+    for number in range(1, args.moves + 1):
+        _, text, _ = await request(reader, writer, "moves")
+        if not text:
+            await request(reader, writer, new_game)
+            _, text, _ = await request(reader, writer, "moves")
+        started = time.perf_counter()
+        ok, reason, _ = await request(reader, writer, f"move {rng.choice(text.split())}")
+        move_latencies.append(time.perf_counter() - started)
+        if not ok:
+            raise RuntimeError(f"сервер отклонил ход: {reason}")
+        if args.board_every and number % args.board_every == 0:
+            started = time.perf_counter()
+            await request(reader, writer, "board")
+            board_latencies.append(time.perf_counter() - started)
+    await request(reader, writer, "quit")
+    writer.close()
+
+
+async def run(args, connect):
+    """Запускает сессии одновременно и печатает итог."""
+    move_latencies = []
+    board_latencies = []
+    started = time.perf_counter()
+    await asyncio.gather(*(run_session(connect, args, args.seed + session, move_latencies, board_latencies)
+                           for session in range(args.sessions)))
+    elapsed = time.perf_counter() - started
+    print(f"сессий: {args.sessions}, ходов: {len(move_latencies)}, время: {elapsed:.2f} с, {len(move_latencies) / elapsed:,.0f} ходов/с")
+    for name, latencies in (("move", move_latencies), ("board", board_latencies)):
+        if latencies:
+            print(f"  {name:<6} p50 {percentile(latencies, 0.5) * 1e3:8.2f} мс   p99 {percentile(latencies, 0.99) * 1e3:8.2f} мс   "
+                  f"наибольшая {max(latencies) * 1e3:8.2f} мс")
+
+
+def main():
+    """Разбор аргументов, запуск сервера (если адрес не задан) и нагрузки."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--moves", type=int, default=20, help="ходов на сессию")
+    parser.add_argument("--variant", default="chess")
+    parser.add_argument("--board-every", type=int, default=5, help="запрашивать кадр доски каждые N ходов (0 - нет)")
+    parser.add_argument("--unix", help="Unix-сокет запущенного сервера")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, help="TCP-порт запущенного сервера")
+    parser.add_argument("--executor", choices=["process", "thread"], default="process", help="исполнитель запускаемого сервера")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    server = None
+    directory = None
+    unix_path = args.unix
+    if not args.unix and args.port is None:
+        directory = tempfile.TemporaryDirectory()
+        unix_path = os.path.join(directory.name, "games.sock")
+        server = subprocess.Popen([sys.executable, "server.py", "--unix", unix_path, "--executor", args.executor], stdout=subprocess.DEVNULL)
+        while not os.path.exists(unix_path):
+            if server.poll() is not None:
+                raise SystemExit("сервер не запустился")
+            time.sleep(0.05)
+
+    def connect():
+        """Новое подключение к серверу."""
+        if unix_path:
+            return asyncio.open_unix_connection(unix_path)
+        return asyncio.open_connection(args.host, args.port)
+
+    try:
+        asyncio.run(run(args, connect))
+    finally:
+        if server is not None:
+            # SIGINT, а не terminate: сервер завершает процессы исполнителя, а не оставляет их сиротами
+            server.send_signal(signal.SIGINT)
+            server.wait()
+            directory.cleanup()
+
+
+if __name__ == "__main__":
+    main()
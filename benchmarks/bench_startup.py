@@ -0,0 +1,72 @@
+"""Замер холодного запуска консольной игры: время до первого вопроса и до первого хода варианта.
+
+Игра запускается отдельным процессом --runs раз для каждого варианта и способа запуска:
+"python game.py" (скрипт компилируется при каждом запуске) и "python -m game" (байт-код из
+кэша), без кэша таблиц движения и с ним (GAME_TABLE_CACHE; первый запуск заполняет кэш и в
+замер не входит). Замеряется время от запуска до вопроса о выборе игры и, после ответа, до
+вопроса о фигуре первого хода (вариант загружен, доска выведена).
+Запуск из корня проекта: python -m benchmarks.bench_startup [--runs 20]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+FIRST_PROMPT = "Выберите игру".encode("utf-8")
+MOVE_PROMPT = "Выберите фигуру для хода".encode("utf-8")
+COMMANDS = {"game.py": [sys.executable, "game.py"], "-m game": [sys.executable, "-m", "game"]}
+
+
+def read_until(stream, marker):
+    """Читает вывод процесса, пока не встретится marker."""
+    output = b""
+    while marker not in output:
+        chunk = os.read(stream.fileno(), 65536)
+        if not chunk:
+            raise RuntimeError(f"процесс завершился до вопроса: {output.decode('utf-8', 'replace')[-500:]}")
+        output += chunk
+
+
+def start_game(command, variant, environment):
+    """Один запуск: (с до первого вопроса, с до вопроса о первом ходе)."""
+    started = time.perf_counter()
+    process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=environment)
+    try:
+        read_until(process.stdout, FIRST_PROMPT)
+        prompt = time.perf_counter() - started
+        process.stdin.write(f"{variant}\n".encode("utf-8"))
+        process.stdin.flush()
+        read_until(process.stdout, MOVE_PROMPT)
+        return prompt, time.perf_counter() - started
+    finally:
+        process.kill()
+        process.wait()
+
+
+def main():
+    """Разбор аргументов и вывод таблицы."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    from game import VARIANTS
+    with tempfile.TemporaryDirectory() as directory:
+        environments = {"нет": dict(os.environ, PYTHONIOENCODING="utf-8"),
+                        "да": dict(os.environ, PYTHONIOENCODING="utf-8", GAME_TABLE_CACHE=directory)}
+        environments["нет"].pop("GAME_TABLE_CACHE", None)
+        print(f"{'вариант':<16}{'запуск':<10}{'кэш таблиц':<12}{'до вопроса, мс':>16}{'до первого хода, мс':>22}")
+        for variant in VARIANTS:
+            for name, command in COMMANDS.items():
+                for cache, environment in environments.items():
+                    start_game(command, variant, environment)
+                    # Медиана: на общей машине отдельные запуски заметно шумят
+                    times = [start_game(command, variant, environment) for _ in range(args.runs)]
+                    print(f"{variant:<16}{name:<10}{cache:<12}{statistics.median(prompt for prompt, _ in times) * 1e3:>16.1f}"
+                          f"{statistics.median(ready for _, ready in times) * 1e3:>22.1f}")
+
+
+if __name__ == "__main__":
+    main()
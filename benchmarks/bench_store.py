@@ -0,0 +1,74 @@
+"""Замер файла позиций (position.PositionStore) против pickle досок.
+
+Пул различных позиций случайных партий упаковывается и повторяется до --count записей в
+временном файле. Замеряются открытие файла, чтение случайных записей без копирования,
+восстановление досок из записей и, для сравнения, pickle тех же досок (pickle на --pickle-limit
+досках пересчитывается на весь объём, такие строки помечены *).
+Запуск из корня проекта: python -m benchmarks.bench_store [--variant chess] [--count 1000000]
+"""
+import argparse
+import os
+import pickle
+import random
+import tempfile
+import time
+
+from benchmarks.positions import random_positions
+from game import VARIANTS
+from position import RECORD_SIZE, PositionStore, pack_board, unpack_board
+
+
+def timed(function):
+    """Время выполнения function, с, и её результат."""
+    started = time.perf_counter()
+    result = function()
+    return time.perf_counter() - started, result
+
+
+def main():
+    """Разбор аргументов и вывод замеров."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--variant", choices=sorted(VARIANTS), default="chess")
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--positions", type=int, default=1000, help="различных позиций в пуле")
+    parser.add_argument("--reads", type=int, default=100_000, help="случайных чтений записей")
+    parser.add_argument("--pickle-limit", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    pool = random_positions(args.variant, args.positions, args.seed)
+    pack_seconds, records = timed(lambda: [pack_board(board, index + 1) for index, board in enumerate(pool)])
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "positions.bin")
+        with PositionStore(path, writable=True) as store:
+            pool_bytes = b"".join(records)
+            repeats, rest = divmod(args.count, len(pool))
+            write_seconds, _ = timed(lambda: (store.append_record(pool_bytes * repeats), store.append_record(b"".join(records[:rest]))))
+
+        open_seconds, store = timed(lambda: PositionStore(path))
+        with store:
+            count = len(store)
+            indices = [rng.randrange(count) for _ in range(args.reads)]
+            read_seconds, _ = timed(lambda: [store[index] for index in indices])
+            sample = indices[:args.pickle_limit]
+            unpack_seconds, _ = timed(lambda: [unpack_board(store[index], move_cache=None) for index in sample])
+
+        boards = [pool[index % len(pool)] for index in range(min(args.count, args.pickle_limit))]
+        dump_seconds, dumped = timed(lambda: pickle.dumps(boards))
+        load_seconds, _ = timed(lambda: pickle.loads(dumped))
+        scale = args.count / len(boards)
+
+    print(f"{args.variant}: {count} позиций, запись {RECORD_SIZE} байт, файл {count * RECORD_SIZE / 2**20:.1f} МиБ")
+    print(f"  упаковка доски               {pack_seconds / len(pool) * 1e6:10.1f} мкс")
+    print(f"  запись файла                 {write_seconds * 1e3:10.1f} мс")
+    print(f"  открытие файла               {open_seconds * 1e3:10.3f} мс")
+    print(f"  чтение записи по номеру      {read_seconds / args.reads * 1e6:10.2f} мкс")
+    print(f"  восстановление доски         {unpack_seconds / len(sample) * 1e6:10.1f} мкс")
+    print(f"  pickle: {len(dumped) / len(boards):.0f} байт на доску, всего {len(dumped) * scale / 2**20:.1f} МиБ{'*' if scale > 1 else ''}")
+    print(f"  pickle.dumps всех досок      {dump_seconds * scale:10.2f} с{'*' if scale > 1 else ''}")
+    print(f"  pickle.loads всех досок      {load_seconds * scale:10.2f} с{'*' if scale > 1 else ''}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Замер стоимости одного хода: поиск фигур под боем и проверка шаха.
+
+Сравнивает прежний полный перебор доски с запросами к инкрементальной карте атак.
+Запуск из корня проекта: python -m benchmarks.bench_turn [--plies N] [--games N] [--engine bitboard] [--no-cache]
+"""
+import argparse
+import random
+import time
+
+from game import Game, King
+from move_cache import default_cache
+
+
+def scan_threatened_pieces(game):
+    """Прежний алгоритм: ходы каждой фигуры соперника проверяются по всем 64 клеткам."""
+    board = game.board
+    threatened_pieces = []
+    opponent_color = "black" if game.current_player == "white" else "white"
+    for opponent_row in range(8):
+        for opponent_col in range(8):
+            opponent_piece = board.board[opponent_row][opponent_col]
+            if opponent_piece and opponent_piece.color == opponent_color:
+                possible_opponent_moves = opponent_piece.possible_moves(board, opponent_row, opponent_col)
+                for row in range(8):
+                    for col in range(8):
+                        piece = board.board[row][col]
+                        if piece and piece.color == game.current_player and not isinstance(piece, King) and (row, col) in possible_opponent_moves:
+                            threatened_pieces.append((row, col))
+    return threatened_pieces
+
+
+def scan_king_in_check(game):
+    """Прежний алгоритм: поиск короля и перегенерация всех ходов соперника."""
+    board = game.board
+    king_position = next(((row, col) for row in range(8) for col in range(8) if isinstance(board.board[row][col], King) and board.board[row][col].color == game.current_player), None)
+    if not king_position:
+        return False
+    opponent_color = "black" if game.current_player == "white" else "white"
+    return any(board.board[row][col] and board.board[row][col].color == opponent_color and king_position in board.board[row][col].possible_moves(board, row, col) for row in range(8) for col in range(8))
+
+
+def random_move(game, rng):
+    """Делает случайный ход текущего игрока. Возвращает False, если ходов нет."""
+    board = game.board
+    candidates = []
+    for row in range(8):
+        for col in range(8):
+            piece = board.board[row][col]
+            if piece and piece.color == game.current_player:
+                candidates += [(row, col, end, False) for end in board.get_moves(row, col)]
+                candidates += [(row, col, end, True) for end in board.get_capture_moves(row, col)]
+    if not candidates:
+        return False
+    row, col, (end_row, end_col), is_jump = rng.choice(candidates)
+    if is_jump:
+        board.make_move(row, col, end_row, end_col, (row + end_row) // 2, (col + end_col) // 2)
+    else:
+        board.make_move(row, col, end_row, end_col)
+    return True
+
+
+def run(game_type, modified_chess, engine, games, plies, seed, move_cache=default_cache):
+    """Возвращает среднее время одного хода (в микросекундах) для перебора и для карты атак."""
+    rng = random.Random(seed)
+    scan_time = map_time = 0.0
+    turns = 0
+    for _ in range(games):
+        game = Game(game_type, modified_chess, engine, move_cache)
+        for _ in range(plies):
+            started = time.perf_counter()
+            expected = (set(scan_threatened_pieces(game)), scan_king_in_check(game))
+            scan_time += time.perf_counter() - started
+
+            started = time.perf_counter()
+            actual = (set(game.find_threatened_pieces()), game.is_king_in_check())
+            map_time += time.perf_counter() - started
+
+            if expected != actual:
+                raise AssertionError(f"Карта атак расходится с перебором: {expected} != {actual}")
+            turns += 1
+            if not random_move(game, rng):
+                break
+    return scan_time / turns * 1e6, map_time / turns * 1e6
+
+
+def main():
+    """Разбор аргументов и вывод таблицы результатов."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=20)
+    parser.add_argument("--plies", type=int, default=60)
+    parser.add_argument("--engine", default="mailbox", choices=["mailbox", "bitboard"])
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-cache", action="store_true", help="отключить кэш ходов")
+    args = parser.parse_args()
+    move_cache = None if args.no_cache else default_cache
+
+    print(f"{'вариант':<16}{'перебор, мкс':>14}{'карта атак, мкс':>18}{'ускорение':>12}")
+    for name, game_type, modified_chess in [("chess", "chess", False), ("modified_chess", "chess", True), ("checkers", "checkers", False)]:
+        scan_us, map_us = run(game_type, modified_chess, args.engine, args.games, args.plies, args.seed, move_cache)
+        print(f"{name:<16}{scan_us:>14.1f}{map_us:>18.1f}{scan_us / map_us:>11.1f}x")
+    if move_cache is not None:
+        print("Кэш ходов:", move_cache.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+"""Позиции для замеров: случайные партии из начальной расстановки (без NumPy)."""
+import random
+
+from game import VARIANTS, Board
+from perft import generate_moves
+
+
+def random_positions(variant, count, seed):
+    """Возвращает count позиций случайных партий варианта."""
+    rng = random.Random(seed)
+    boards = []
+    for _ in range(count):
+        board = Board(*VARIANTS[variant], move_cache=None)
+        for _ in range(rng.randrange(0, 60)):
+            moves = generate_moves(board)
+            if not moves:
+                break
+            board.make_move(*rng.choice(moves))
+        boards.append(board)
+    return boards
@@ -0,0 +1,284 @@
+"""Доска на 64-битных битбордах: по одному битборду на тип фигуры и цвет."""
+from game import Board, Pawn, Rook, Knight, Bishop, Queen, King, Checker, Lancer, Assassin, Fortress, mask_squares
+from move_cache import default_cache
+
+# Клетка (строка, столбец) кодируется индексом row * 8 + col, бит индекса - 1 << index
+SQUARES = [(index // 8, index % 8) for index in range(64)]
+FULL = (1 << 64) - 1
+
+
+def _leaper_table(offsets):
+    """Строит таблицу атак прыгающей фигуры для каждой клетки."""
+    table = []
+    for row, col in SQUARES:
+        mask = 0
+        for row_offset, col_offset in offsets:
+            new_row, new_col = row + row_offset, col + col_offset
+            if 0 <= new_row < 8 and 0 <= new_col < 8:
+                mask |= 1 << (new_row * 8 + new_col)
+        table.append(mask)
+    return table
+
+
+def _ray_table(direction):
+    """Строит таблицу лучей в одном направлении для каждой клетки."""
+    table = []
+    for row, col in SQUARES:
+        mask = 0
+        new_row, new_col = row + direction[0], col + direction[1]
+        while 0 <= new_row < 8 and 0 <= new_col < 8:
+            mask |= 1 << (new_row * 8 + new_col)
+            new_row, new_col = new_row + direction[0], new_col + direction[1]
+        table.append(mask)
+    return table
+
+
+KNIGHT_ATTACKS = _leaper_table([(-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)])
+KING_ATTACKS = _leaper_table([(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)])
+FORTRESS_STEPS = _leaper_table([(-1, 0), (1, 0), (0, -1), (0, 1)])
+# Шаги шашки и пешки зависят от цвета: белые идут вверх (к строке 0), чёрные - вниз
+DIAGONAL_STEPS = {-1: _leaper_table([(-1, -1), (-1, 1)]), 1: _leaper_table([(1, -1), (1, 1)])}
+
+# Лучи с растущим индексом клетки: первый блокирующий бит - младший
+POSITIVE_RAYS = [_ray_table(direction) for direction in [(0, 1), (1, 0), (1, 1), (1, -1)]]
+# Лучи с убывающим индексом клетки: первый блокирующий бит - старший
+NEGATIVE_RAYS = [_ray_table(direction) for direction in [(0, -1), (-1, 0), (-1, -1), (-1, 1)]]
+ROOK_RAYS = ([POSITIVE_RAYS[0], POSITIVE_RAYS[1]], [NEGATIVE_RAYS[0], NEGATIVE_RAYS[1]])
+BISHOP_RAYS = ([POSITIVE_RAYS[2], POSITIVE_RAYS[3]], [NEGATIVE_RAYS[2], NEGATIVE_RAYS[3]])
+QUEEN_RAYS = (POSITIVE_RAYS, NEGATIVE_RAYS)
+# Копейщик ходит только вперёд по вертикали
+LANCER_RAYS = {"white": ([], [NEGATIVE_RAYS[1]]), "black": ([POSITIVE_RAYS[1]], [])}
+
+
+def slider_attacks(square, occupied, rays):
+    """Возвращает битборд клеток, достижимых скользящей фигурой до первого препятствия включительно."""
+    positive, negative = rays
+    attacks = 0
+    for table in positive:
+        ray = table[square]
+        blockers = ray & occupied
+        if blockers:
+            ray ^= table[(blockers & -blockers).bit_length() - 1]
+        attacks |= ray
+    for table in negative:
+        ray = table[square]
+        blockers = ray & occupied
+        if blockers:
+            ray ^= table[blockers.bit_length() - 1]
+        attacks |= ray
+    return attacks
+
+
+# Запомненные списки клеток для уже встречавшихся битбордов (их набор в игре быстро насыщается)
+_SQUARES_CACHE = {}
+SQUARES_CACHE_LIMIT = 1 << 16
+
+
+def squares_of(bitboard):
+    """Превращает битборд в список клеток (строка, столбец) в порядке обхода доски."""
+    squares = _SQUARES_CACHE.get(bitboard)
+    if squares is None:
+        squares = tuple(mask_squares(bitboard))
+        if len(_SQUARES_CACHE) < SQUARES_CACHE_LIMIT:
+            _SQUARES_CACHE[bitboard] = squares
+    return list(squares)
+
+
+class BitboardBoard(Board):
+    """Доска, которая дополнительно хранит позицию в битбордах и генерирует ходы по таблицам атак.
+
+    Битборды фигур каждого цвета и пустых клеток - это индекс базовой доски (piece_masks, empty_mask).
+
+    Список board.board поддерживается как прежде, поэтому код, читающий клетки напрямую, продолжает работать.
+    """
+    def __init__(self, game_type="chess", modified_chess=False, move_cache=default_cache):
+        """Инициализация доски и битбордов."""
+        # Фигуры общие для всех досок (game.PieceType), поэтому битборды хранятся по самой фигуре:
+        # ключ не нужно собирать из типа и цвета при каждом изменении клетки
+        self.bitboards = {}
+        self.generators = {
+            Pawn: self._pawn_moves, Rook: self._rook_moves, Knight: self._knight_moves,
+            Bishop: self._bishop_moves, Queen: self._queen_moves, King: self._king_moves,
+            Checker: self._checker_moves, Lancer: self._lancer_moves, Assassin: self._knight_moves,
+            Fortress: self._fortress_moves,
+        }
+        super().__init__(game_type, modified_chess, move_cache)
+
+    def set_piece(self, row, col, piece):
+        """Ставит фигуру на клетку, обновляя битборды."""
+        bit = 1 << (row * 8 + col)
+        bitboards = self.bitboards
+        old_piece = self.board[row][col]
+        if old_piece:
+            bitboards[old_piece] ^= bit
+        if piece:
+            bitboards[piece] = bitboards.get(piece, 0) | bit
+        super().set_piece(row, col, piece)
+
+    def pieces_bitboard(self, piece_type, color):
+        """Возвращает битборд фигур заданного типа и цвета."""
+        bitboard = 0
+        for piece, pieces in self.bitboards.items():
+            if type(piece) is piece_type and piece.color == color:
+                bitboard |= pieces
+        return bitboard
+
+    def generate_moves(self, row, col):
+        """Генерирует возможные ходы фигуры, используя таблицы атак."""
+        piece = self.board[row][col]
+        if not piece:
+            return []
+        generator = self.generators.get(type(piece))
+        if generator is None:
+            # Новые типы фигур работают через свою обычную реализацию
+            return piece.possible_moves(self, row, col)
+        return squares_of(generator(piece, row * 8 + col))
+
+    def moves_bitboard(self, row, col):
+        """Возвращает возможные ходы фигуры в виде битборда (без преобразования в список клеток)."""
+        piece = self.board[row][col]
+        if not piece:
+            return 0
+        generator = self.generators.get(type(piece))
+        if generator is None:
+            bitboard = 0
+            for new_row, new_col in piece.possible_moves(self, row, col):
+                bitboard |= 1 << (new_row * 8 + new_col)
+            return bitboard
+        return generator(piece, row * 8 + col)
+
+    def pseudo_moves(self, color):
+        """Возвращает возможные ходы всех фигур цвета color по битбордам (без кэша ходов, битборд не даёт повторов)."""
+        grid = self.board
+        generators = self.generators
+        moves = {}
+        pieces = self.piece_masks[color]
+        while pieces:
+            low = pieces & -pieces
+            pieces ^= low
+            square = low.bit_length() - 1
+            row, col = square >> 3, square & 7
+            piece = grid[row][col]
+            generator = generators.get(type(piece))
+            moves[row, col] = squares_of(generator(piece, square) if generator else self.moves_bitboard(row, col))
+        return moves
+
+    def side_moves(self):
+        """Возвращает все ходы стороны, которая ходит, как кортежи аргументов make_move (без кэша ходов).
+
+        Фигуры и клетки ходов перебираются по битам, без промежуточных списков клеток каждой фигуры.
+        """
+        grid = self.board
+        moves = []
+        pieces = self.piece_masks[self.current_player]
+        while pieces:
+            low = pieces & -pieces
+            pieces ^= low
+            square = low.bit_length() - 1
+            row, col = square >> 3, square & 7
+            piece = grid[row][col]
+            generator = self.generators.get(type(piece))
+            targets = generator(piece, square) if generator else self.moves_bitboard(row, col)
+            while targets:
+                low = targets & -targets
+                targets ^= low
+                target = low.bit_length() - 1
+                moves.append((row, col, target >> 3, target & 7, None, None, ()))
+        return moves
+
+    def side_move_count(self):
+        """Возвращает число ходов стороны, которая ходит, подсчётом битов (без построения списка ходов)."""
+        grid = self.board
+        count = 0
+        pieces = self.piece_masks[self.current_player]
+        while pieces:
+            low = pieces & -pieces
+            pieces ^= low
+            square = low.bit_length() - 1
+            piece = grid[square >> 3][square & 7]
+            generator = self.generators.get(type(piece))
+            targets = generator(piece, square) if generator else self.moves_bitboard(square >> 3, square & 7)
+            count += targets.bit_count()
+        return count
+
+    def generate_capture_moves(self, row, col):
+        """Генерирует ходы взятия шашки, используя битборды."""
+        piece = self.board[row][col]
+        if type(piece) is not Checker:
+            return super().generate_capture_moves(row, col)
+        square = row * 8 + col
+        enemies = self.piece_masks["black" if piece.color == "white" else "white"]
+        empty = ~(self.piece_masks["white"] | self.piece_masks["black"]) & FULL
+        captures = 0
+        for direction in ([-1, 1] if piece.is_queen else [piece.direction]):
+            for col_offset in [-1, 1]:
+                new_col = col + 2 * col_offset
+                new_row = row + 2 * direction
+                if 0 <= new_row < 8 and 0 <= new_col < 8 and enemies >> (square + direction * 8 + col_offset) & 1:
+                    captures |= (1 << (new_row * 8 + new_col)) & empty
+        return squares_of(captures)
+
+    def _own_and_occupied(self, piece):
+        """Возвращает битборды своих фигур и всех фигур."""
+        white, black = self.piece_masks["white"], self.piece_masks["black"]
+        return (white if piece.color == "white" else black), white | black
+
+    def _pawn_moves(self, piece, square):
+        """Ходы пешки."""
+        white, black = self.piece_masks["white"], self.piece_masks["black"]
+        occupied = white | black
+        row = square >> 3
+        if piece.color == "white":
+            if row == 0:
+                return 0
+            push = (1 << (square - 8)) & ~occupied
+            if push and row == 6:
+                push |= (1 << (square - 16)) & ~occupied
+            return push | DIAGONAL_STEPS[-1][square] & black
+        if row == 7:
+            return 0
+        push = (1 << (square + 8)) & ~occupied
+        if push and row == 1:
+            push |= (1 << (square + 16)) & ~occupied
+        return push | DIAGONAL_STEPS[1][square] & white
+
+    def _rook_moves(self, piece, square):
+        """Ходы ладьи."""
+        own, occupied = self._own_and_occupied(piece)
+        return slider_attacks(square, occupied, ROOK_RAYS) & ~own
+
+    def _bishop_moves(self, piece, square):
+        """Ходы слона."""
+        own, occupied = self._own_and_occupied(piece)
+        return slider_attacks(square, occupied, BISHOP_RAYS) & ~own
+
+    def _queen_moves(self, piece, square):
+        """Ходы ферзя."""
+        own, occupied = self._own_and_occupied(piece)
+        return slider_attacks(square, occupied, QUEEN_RAYS) & ~own
+
+    def _lancer_moves(self, piece, square):
+        """Ходы Копейщика."""
+        own, occupied = self._own_and_occupied(piece)
+        return slider_attacks(square, occupied, LANCER_RAYS[piece.color]) & ~own
+
+    def _knight_moves(self, piece, square):
+        """Ходы коня и Ассасина."""
+        own = self.piece_masks[piece.color]
+        return KNIGHT_ATTACKS[square] & ~own
+
+    def _king_moves(self, piece, square):
+        """Ходы короля."""
+        return KING_ATTACKS[square] & ~self.piece_masks[piece.color]
+
+    def _fortress_moves(self, piece, square):
+        """Ходы Крепости: шаг на соседнюю клетку или перенос на любую пустую клетку."""
+        own, occupied = self._own_and_occupied(piece)
+        return FORTRESS_STEPS[square] & ~own | ~occupied & FULL
+
+    def _checker_moves(self, piece, square):
+        """Тихие ходы шашки."""
+        empty = ~(self.piece_masks["white"] | self.piece_masks["black"])
+        if piece.is_queen:
+            return (DIAGONAL_STEPS[-1][square] | DIAGONAL_STEPS[1][square]) & empty
+        return DIAGONAL_STEPS[piece.direction][square] & empty
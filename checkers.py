@@ -0,0 +1,156 @@
+"""Ходы шашек с цепочками взятий и обязательным взятием.
+
+Взятие - полная цепочка прыжков одной шашкой: после каждого прыжка шашка обязана бить дальше,
+пока есть кого. Снятые шашки остаются на доске до конца цепочки (их нельзя перепрыгнуть
+второй раз), простая шашка бьёт только вперёд, а дойдя до последней горизонтали, становится
+дамкой и заканчивает ход. Если у стороны есть хотя бы одно взятие, тихие ходы запрещены.
+
+Дамка по умолчанию ходит и бьёт на соседнюю клетку в любую сторону; с flying_kings=True она
+ходит на любое расстояние по диагонали и бьёт фигуру на любом расстоянии, приземляясь на
+любую свободную клетку за ней.
+
+Ход - кортеж (строка, столбец, конечная строка, конечный столбец, снятые шашки, путь), где
+снятые шашки - клетки в порядке взятия, путь - клетки приземления по порядку (пустые кортежи
+у тихого хода). Ход делается board.make_move(start_row, start_col, end_row, end_col, captured=снятые).
+"""
+from game import DIAGONAL_STEPS, Checker
+from movement import MOVE_ONLY, Movement, Rider
+
+FLYING_KING_MOVEMENT = Movement(Rider(DIAGONAL_STEPS, mode=MOVE_ONLY))
+NO_CONTINUATION = [((), (), 0)]
+
+
+class CheckersRules:
+    """Генератор ходов стороны в шашках."""
+    def __init__(self, flying_kings=False):
+        """Инициализация правил. flying_kings=True включает дальнобойных дамок."""
+        self.flying_kings = flying_kings
+
+    def side_moves(self, board):
+        """Возвращает допустимые ходы стороны, которая ходит: цепочки взятий, если они есть, иначе тихие ходы.
+
+        Результат кэшируется в кэше ходов доски по хешу позиции; изменять его нельзя.
+        """
+        return board.cached_query(("checkers", self.flying_kings), lambda: self.generate_side_moves(board))
+
+    def generate_side_moves(self, board):
+        """Один проход по шашкам стороны: взятия всех шашек и, пока взятий нет, их тихие ходы."""
+        grid = board.board
+        captures = []
+        quiet_moves = []
+        memo = {}
+        for row, col in board.pieces_of(board.current_player):
+            piece = grid[row][col]
+            if not isinstance(piece, Checker):
+                continue
+            for path, captured, _ in self._chains(board, row, col, piece, 0, memo):
+                end_row, end_col = path[-1]
+                captures.append((row, col, end_row, end_col, captured, path))
+            if not captures:
+                for end_row, end_col in self._quiet_moves(board, row, col, piece):
+                    quiet_moves.append((row, col, end_row, end_col, (), ()))
+        return captures or quiet_moves
+
+    def piece_moves(self, board, row, col):
+        """Возвращает допустимые ходы шашки на клетке с учётом обязательного взятия."""
+        return [move for move in self.side_moves(board) if move[0] == row and move[1] == col]
+
+    def chain_captures(self, board, row, col, path):
+        """Снятые шашки цепочки взятий шашки с клетки по клеткам приземления path (в порядке взятия)
+        или None, если такой цепочки прыжков нет. Доска возвращается в исходную позицию.
+
+        Полноту цепочки здесь не проверить: из side_moves остаётся по одной цепочке на конечную
+        клетку и набор снятых шашек, поэтому результат сверяют с ними по этому набору.
+        """
+        piece = board.board[row][col]
+        promotion_row = 0 if piece.color == "white" else 7
+        captured = []
+        captured_mask = 0
+        current = (row, col)
+        for number, landing in enumerate(path):
+            jumped = next((jumped for jumped, square in self._jumps(board, *current, piece, captured_mask) if square == landing), None)
+            # Простая шашка, ставшая дамкой, заканчивает ход
+            if jumped is None or not piece.is_queen and landing[0] == promotion_row and number < len(path) - 1:
+                captured = None
+                break
+            captured.append(jumped)
+            captured_mask |= 1 << (jumped[0] * 8 + jumped[1])
+            board.set_piece(*current, None)
+            board.set_piece(*landing, piece)
+            current = landing
+        board.set_piece(*current, None)
+        board.set_piece(row, col, piece)
+        return tuple(captured) if captured is not None else None
+
+    def _quiet_moves(self, board, row, col, piece):
+        """Тихие ходы шашки."""
+        if piece.is_queen and self.flying_kings:
+            return FLYING_KING_MOVEMENT.moves(board, row, col, piece.color)
+        return board.get_moves(row, col)
+
+    def _chains(self, board, row, col, piece, captured_mask, memo):
+        """Возвращает продолжения цепочки взятий шашки с клетки: (путь, снятые шашки, маска снятых шашек).
+
+        Поиск в глубину: шашка переставляется на доске на время прыжка и возвращается обратно.
+        Продолжения запоминаются по позиции, клетке шашки и уже снятым шашкам, а из продолжений
+        с одинаковыми конечной клеткой и снятыми шашками (одна и та же итоговая позиция при
+        разном порядке взятий) остаётся первое - так перебор растёт с числом различных
+        положений, а не с числом порядков взятий.
+        """
+        key = (board.zobrist_hash, captured_mask, row * 8 + col)
+        chains = memo.get(key)
+        if chains is not None:
+            return chains
+        chains = {}
+        promotion_row = 0 if piece.color == "white" else 7
+        for (jumped_row, jumped_col), (landing_row, landing_col) in self._jumps(board, row, col, piece, captured_mask):
+            jumped_bit = 1 << (jumped_row * 8 + jumped_col)
+            if not piece.is_queen and landing_row == promotion_row:
+                continuations = NO_CONTINUATION
+            else:
+                board.set_piece(row, col, None)
+                board.set_piece(landing_row, landing_col, piece)
+                continuations = self._chains(board, landing_row, landing_col, piece, captured_mask | jumped_bit, memo) or NO_CONTINUATION
+                board.set_piece(landing_row, landing_col, None)
+                board.set_piece(row, col, piece)
+            for path, captured, mask in continuations:
+                end = path[-1] if path else (landing_row, landing_col)
+                if (end, mask | jumped_bit) not in chains:
+                    chains[end, mask | jumped_bit] = (((landing_row, landing_col),) + path, ((jumped_row, jumped_col),) + captured, mask | jumped_bit)
+        chains = list(chains.values())
+        memo[key] = chains
+        return chains
+
+    def _jumps(self, board, row, col, piece, captured_mask):
+        """Возвращает прыжки шашки с клетки: пары (клетка снимаемой шашки, клетка приземления)."""
+        grid = board.board
+        color = piece.color
+        jumps = []
+        if piece.is_queen and self.flying_kings:
+            for row_step, col_step in DIAGONAL_STEPS:
+                target_row, target_col = row + row_step, col + col_step
+                while 0 <= target_row < 8 and 0 <= target_col < 8 and grid[target_row][target_col] is None:
+                    target_row, target_col = target_row + row_step, target_col + col_step
+                if not (0 <= target_row < 8 and 0 <= target_col < 8):
+                    continue
+                target = grid[target_row][target_col]
+                if target.color == color or captured_mask >> (target_row * 8 + target_col) & 1:
+                    continue
+                landing_row, landing_col = target_row + row_step, target_col + col_step
+                while 0 <= landing_row < 8 and 0 <= landing_col < 8 and grid[landing_row][landing_col] is None:
+                    jumps.append(((target_row, target_col), (landing_row, landing_col)))
+                    landing_row, landing_col = landing_row + row_step, landing_col + col_step
+            return jumps
+        steps = DIAGONAL_STEPS if piece.is_queen else [(piece.direction, -1), (piece.direction, 1)]
+        for row_step, col_step in steps:
+            landing_row, landing_col = row + 2 * row_step, col + 2 * col_step
+            if not (0 <= landing_row < 8 and 0 <= landing_col < 8) or grid[landing_row][landing_col] is not None:
+                continue
+            target_row, target_col = row + row_step, col + col_step
+            target = grid[target_row][target_col]
+            if target and target.color != color and not captured_mask >> (target_row * 8 + target_col) & 1:
+                jumps.append(((target_row, target_col), (landing_row, landing_col)))
+        return jumps
+
+
+default_rules = CheckersRules()
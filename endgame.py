@@ -0,0 +1,476 @@
+"""Эндшпильная база шашек: результат и расстояние до конца партии для позиций с малым числом шашек.
+
+Позиции до заданного числа шашек перебираются и решаются ретроградным анализом по правилам
+checkers.CheckersRules (обязательное взятие, цепочки, дамки; поражение - нет ходов), база
+записывается в двоичный файл, а в игре и анализе читается через mmap за O(1).
+
+Позиция хранится от лица стороны, которая ходит ("свои" шашки ходят вверх, как белые): если
+ходят чёрные, доска поворачивается на 180° и цвета меняются, поэтому база вдвое меньше.
+Номер позиции - совершенный хеш (каждому номеру соответствует ровно одна позиция, дыр нет):
+    срез материала (свои простые, свои дамки, чужие простые, чужие дамки) - смещение среза;
+    внутри среза подсрезы по числу своих простых на своей первой горизонтали и чужих простых
+    на их первой горизонтали (простая не стоит на горизонтали своего превращения);
+    номер позиции в подсрезе - смешанная система счисления из колексикографических номеров
+    сочетаний: простых - на своих клетках, дамок - на клетках, оставшихся свободными.
+Значение - один байт: 0 - ничья, нечётное d - выигрыш через d полуходов, чётное b > 0 -
+проигрыш через b - 2 полуходов (у проигравшего нет ходов через столько полуходов).
+
+Решение идёт по уровням (число шашек, затем число простых): взятие уменьшает число шашек,
+превращение - число простых, поэтому ходы из позиций уровня ведут в тот же срез материала,
+в срез с цветами наоборот (ход передаёт очередь) или в уже решённые уровни. Срез и срез с
+цветами наоборот решаются вместе: ходы всех позиций строятся один раз, затем значения
+расходятся от проигрышей без ходов по обратным рёбрам в порядке расстояния. Группы одного
+уровня независимы и решаются в разных процессах, которые пишут свои участки файла.
+
+Формат файла: заголовок "<4sHBBI" (b"CKDB", версия, число шашек, флаги: бит 0 - дальнобойные
+дамки, бит 1 - база дописана до конца; число срезов), таблица срезов "<4BQ" (материал и
+смещение значений среза от начала файла), затем значения.
+
+Запуск:
+    python endgame.py --pieces 4 [--flying-kings] [--workers N] [--output checkers_endgame.db]
+    python endgame.py --probe position.txt --side black [--database checkers_endgame.db]
+"""
+import argparse
+import mmap
+import os
+import struct
+import time
+from math import comb
+
+from game import Board, Checker, mask_squares
+
+HEADER = struct.Struct("<4sHBBI")
+SLICE = struct.Struct("<4BQ")
+MAGIC = b"CKDB"
+VERSION = 1
+FLYING_KINGS = 1
+COMPLETE = 2
+DEFAULT_PATH = "checkers_endgame.db"
+WIN, DRAW, LOSS = 1, 0, -1
+# Наибольшее расстояние, которое помещается в байт значения
+MAX_DISTANCE = 253
+
+# Тёмные клетки по порядку обхода доски: номер клетки - номер в списке (0-3 - верхняя горизонталь)
+DARK_SQUARES = [(row, col) for row in range(8) for col in range(8) if (row + col) % 2]
+SQUARE_NUMBERS = {square: number for number, square in enumerate(DARK_SQUARES)}
+# Свои простые стоят на клетках 4-31 (первая горизонталь - 28-31), чужие - на 0-27 (их первая - 0-3)
+MIDDLE = range(4, 28)
+WHITE_MAN, WHITE_KING, BLACK_MAN, BLACK_KING = Checker("white"), Checker("white", True), Checker("black"), Checker("black", True)
+# Биномиальные коэффициенты: COMB[n][k] - число сочетаний из n по k
+COMB = [[comb(n, k) for k in range(33)] for n in range(33)]
+
+
+def _rank(positions):
+    """Колексикографический номер сочетания (позиции по возрастанию)."""
+    return sum(COMB[position][count] for count, position in enumerate(positions, 1))
+
+
+def _unrank(rank, count):
+    """Сочетание из count позиций по колексикографическому номеру (позиции по возрастанию)."""
+    positions = []
+    for size in range(count, 0, -1):
+        position = size - 1
+        while COMB[position + 1][size] <= rank:
+            position += 1
+        rank -= COMB[position][size]
+        positions.append(position)
+    positions.reverse()
+    return positions
+
+
+def _free_positions(numbers, taken):
+    """Номера клеток numbers среди клеток доски без занятых taken (по возрастанию)."""
+    return [number - sum(1 for other in taken if other < number) for number in numbers]
+
+
+def _take_free(positions, squares, taken):
+    """Обратное к _free_positions: клетки по номерам среди клеток squares без занятых taken."""
+    free = [number for number in squares if number not in taken]
+    return [free[position] for position in positions]
+
+
+def materials(max_pieces):
+    """Срезы материала базы по уровням решения: (свои простые, свои дамки, чужие простые, чужие дамки)."""
+    result = []
+    for own in range(1, max_pieces):
+        for enemy in range(1, max_pieces - own + 1):
+            for own_men in range(own + 1):
+                for enemy_men in range(enemy + 1):
+                    result.append((own_men, own - own_men, enemy_men, enemy - enemy_men))
+    return sorted(result, key=lambda material: (sum(material), material[0] + material[2], material))
+
+
+def flipped(material):
+    """Срез после хода: очередь у соперника."""
+    return material[2], material[3], material[0], material[1]
+
+
+class Layout:
+    """Раскладка номеров базы: смещения срезов и подсрезов, номер позиции и позиция по номеру."""
+    def __init__(self, max_pieces, base=0):
+        """Инициализация. base - смещение значений первого среза в файле."""
+        self.max_pieces = max_pieces
+        self.materials = materials(max_pieces)
+        self.offsets = {}
+        self.sizes = {}
+        # Срез -> [(свои простые на первой горизонтали, чужие на своей первой, смещение в срезе, размер)]
+        self.subslices = {}
+        offset = base
+        for material in self.materials:
+            own_men, own_kings, enemy_men, enemy_kings = material
+            subslices = []
+            size = 0
+            for own_back in range(min(own_men, 4) + 1):
+                for enemy_back in range(min(enemy_men, 4) + 1):
+                    own_middle = own_men - own_back
+                    free_middle = len(MIDDLE) - own_middle
+                    free = 32 - own_men - enemy_men
+                    count = (COMB[4][own_back] * COMB[len(MIDDLE)][own_middle] * COMB[4][enemy_back]
+                             * COMB[free_middle][enemy_men - enemy_back] * COMB[free][own_kings] * COMB[free - own_kings][enemy_kings])
+                    if count:
+                        subslices.append((own_back, enemy_back, size, count))
+                        size += count
+            self.subslices[material] = subslices
+            self.offsets[material] = offset
+            self.sizes[material] = size
+            offset += size
+        self.end = offset
+        self._subslice_index = {material: {(own_back, enemy_back): (start, count) for own_back, enemy_back, start, count in subslices}
+                                for material, subslices in self.subslices.items()}
+
+    def index(self, own_men, own_kings, enemy_men, enemy_kings):
+        """Номер позиции внутри её среза. Клетки - номера тёмных клеток по возрастанию."""
+        material = len(own_men), len(own_kings), len(enemy_men), len(enemy_kings)
+        own_back = [number - 28 for number in own_men if number >= 28]
+        own_middle = [number - 4 for number in own_men if number < 28]
+        enemy_back = [number for number in enemy_men if number < 4]
+        enemy_middle = [number for number in enemy_men if number >= 4]
+        start, _ = self._subslice_index[material][len(own_back), len(enemy_back)]
+        men = own_men + enemy_men
+        index = _rank(own_back)
+        index = index * COMB[len(MIDDLE)][len(own_middle)] + _rank(own_middle)
+        index = index * COMB[4][len(enemy_back)] + _rank(enemy_back)
+        index = (index * COMB[len(MIDDLE) - len(own_middle)][len(enemy_middle)]
+                 + _rank([position - 4 for position in _free_positions(enemy_middle, [number for number in own_men if number < 28])]))
+        free = 32 - len(men)
+        index = index * COMB[free][len(own_kings)] + _rank(_free_positions(own_kings, men))
+        index = index * COMB[free - len(own_kings)][len(enemy_kings)] + _rank(_free_positions(enemy_kings, men + own_kings))
+        return start + index
+
+    def position(self, material, index):
+        """Позиция по номеру внутри среза: (свои простые, свои дамки, чужие простые, чужие дамки)."""
+        own_men_count, own_kings_count, enemy_men_count, enemy_kings_count = material
+        for own_back_count, enemy_back_count, start, count in self.subslices[material]:
+            if index < start + count:
+                index -= start
+                break
+        else:
+            raise IndexError(f"Номер {index} вне среза {material}")
+        own_middle_count = own_men_count - own_back_count
+        enemy_middle_count = enemy_men_count - enemy_back_count
+        free = 32 - own_men_count - enemy_men_count
+        index, enemy_kings_rank = divmod(index, COMB[free - own_kings_count][enemy_kings_count])
+        index, own_kings_rank = divmod(index, COMB[free][own_kings_count])
+        index, enemy_middle_rank = divmod(index, COMB[len(MIDDLE) - own_middle_count][enemy_middle_count])
+        index, enemy_back_rank = divmod(index, COMB[4][enemy_back_count])
+        own_back_rank, own_middle_rank = divmod(index, COMB[len(MIDDLE)][own_middle_count])
+        own_middle = [4 + position for position in _unrank(own_middle_rank, own_middle_count)]
+        own_men = own_middle + [28 + position for position in _unrank(own_back_rank, own_back_count)]
+        enemy_men = (_unrank(enemy_back_rank, enemy_back_count)
+                     + _take_free(_unrank(enemy_middle_rank, enemy_middle_count), MIDDLE, own_middle))
+        men = own_men + enemy_men
+        own_kings = _take_free(_unrank(own_kings_rank, own_kings_count), range(32), men)
+        enemy_kings = _take_free(_unrank(enemy_kings_rank, enemy_kings_count), range(32), men + own_kings)
+        return own_men, own_kings, sorted(enemy_men), enemy_kings
+
+
+def encode(result, distance):
+    """Байт значения позиции."""
+    if result == DRAW:
+        return 0
+    if distance > MAX_DISTANCE:
+        raise ValueError(f"Расстояние {distance} не помещается в байт значения")
+    return distance if result == WIN else distance + 2
+
+
+def decode(value):
+    """Значение позиции по байту: (WIN, DRAW или LOSS, расстояние в полуходах; у ничьей - 0)."""
+    if not value:
+        return DRAW, 0
+    return (WIN, value) if value & 1 else (LOSS, value - 2)
+
+
+def describe(result, distance):
+    """Значение позиции словами."""
+    if result == DRAW:
+        return "ничья"
+    return f"{'выигрыш' if result == WIN else 'проигрыш'} через {distance} полуходов"
+
+
+def board_squares(board):
+    """Шашки доски от лица стороны, которая ходит: (свои простые, свои дамки, чужие простые, чужие дамки)."""
+    grid = board.board
+    black_to_move = board.current_player == "black"
+    groups = ([], [], [], [])
+    for row, col in mask_squares(board.piece_masks["white"] | board.piece_masks["black"]):
+        piece = grid[row][col]
+        number = SQUARE_NUMBERS[row, col]
+        own = (piece.color == "black") == black_to_move
+        groups[(0 if own else 2) + piece.is_queen].append(31 - number if black_to_move else number)
+    return tuple(sorted(group) for group in groups)
+
+
+class EndgameDatabase:
+    """База на диске, открытая через mmap: значения позиций за O(1)."""
+    def __init__(self, path=DEFAULT_PATH, partial=False):
+        """Открывает базу. partial=True разрешает недописанную базу (читают решённые уровни при генерации)."""
+        self.path = path
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.max_pieces, flags, slice_count = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: не эндшпильная база шашек версии {VERSION}")
+        if not flags & COMPLETE and not partial:
+            raise ValueError(f"{path}: база не дописана")
+        self.flying_kings = bool(flags & FLYING_KINGS)
+        self.layout = Layout(self.max_pieces, HEADER.size + slice_count * SLICE.size)
+        for number in range(slice_count):
+            *material, offset = SLICE.unpack_from(self._mmap, HEADER.size + number * SLICE.size)
+            if self.layout.offsets.get(tuple(material)) != offset:
+                raise ValueError(f"{path}: таблица срезов не совпадает с раскладкой")
+        if len(self._mmap) < self.layout.end:
+            raise ValueError(f"{path}: файл обрезан")
+
+    def __enter__(self):
+        """Контекстный менеджер возвращает саму базу."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Закрывает базу."""
+        self.close()
+
+    def close(self):
+        """Закрывает отображение файла."""
+        self._mmap.close()
+
+    def value(self, own_men, own_kings, enemy_men, enemy_kings):
+        """Байт значения позиции от лица стороны, которая ходит (клетки - номера тёмных клеток по возрастанию)."""
+        material = len(own_men), len(own_kings), len(enemy_men), len(enemy_kings)
+        return self._mmap[self.layout.offsets[material] + self.layout.index(own_men, own_kings, enemy_men, enemy_kings)]
+
+    def probe(self, board):
+        """Значение позиции шашек для стороны, которая ходит: (WIN, DRAW или LOSS, полуходов) или None,
+        если позиции нет в базе (больше шашек, не шашки, у соперника не осталось шашек)."""
+        if board.game_type != "checkers":
+            return None
+        occupied = board.piece_masks["white"] | board.piece_masks["black"]
+        if occupied.bit_count() > self.max_pieces:
+            return None
+        if not board.piece_masks[board.current_player]:
+            return LOSS, 0
+        if not board.piece_masks["black" if board.current_player == "white" else "white"]:
+            return None
+        return decode(self.value(*board_squares(board)))
+
+
+def _successor(position, move):
+    """Позиция после хода от лица соперника (доска повёрнута, цвета наоборот)."""
+    own_men, own_kings, enemy_men, enemy_kings = position
+    start_row, start_col, end_row, end_col, captured, _ = move
+    start = SQUARE_NUMBERS[start_row, start_col]
+    end = SQUARE_NUMBERS[end_row, end_col]
+    captured = {SQUARE_NUMBERS[square] for square in captured}
+    if start in own_men:
+        own_men = [number for number in own_men if number != start]
+        # Простая на верхней горизонтали (клетки 0-3) становится дамкой
+        if end < 4:
+            own_kings = own_kings + [end]
+        else:
+            own_men.append(end)
+    else:
+        own_kings = [end if number == start else number for number in own_kings]
+    return (sorted(31 - number for number in enemy_men if number not in captured),
+            sorted(31 - number for number in enemy_kings if number not in captured),
+            sorted(31 - number for number in own_men), sorted(31 - number for number in own_kings))
+
+
+def _set_board(board, position):
+    """Расставляет позицию (от лица белых, ходят белые) на доске."""
+    board.clear()
+    for pieces, piece in zip(position, (WHITE_MAN, WHITE_KING, BLACK_MAN, BLACK_KING)):
+        for number in pieces:
+            board.set_piece(*DARK_SQUARES[number], piece)
+    board.current_player = "white"
+
+
+def solve_group(path, max_pieces, flying_kings, group):
+    """Решает срезы группы (срез и срез с цветами наоборот) и пишет их значения в файл базы.
+
+    Ходы в другие срезы берутся из уже решённых уровней того же файла. Возвращает
+    (группа, позиций, выигрышей, проигрышей, ничьих, наибольшее расстояние, секунд).
+    """
+    from checkers import CheckersRules
+    started = time.perf_counter()
+    rules = CheckersRules(flying_kings)
+    database = EndgameDatabase(path, partial=True)
+    layout = database.layout
+    starts = {}
+    size = 0
+    for material in group:
+        starts[material] = size
+        size += layout.sizes[material]
+
+    board = Board("checkers", False, None)
+    # Рёбра внутри группы (позиция, следующая позиция) и значения ходов в решённые уровни
+    edge_from = []
+    edge_to = []
+    unresolved = [0] * size
+    worst = [0] * size
+    escape = bytearray(size)
+    buckets = {}
+    for material in group:
+        base = starts[material]
+        for index in range(layout.sizes[material]):
+            position = layout.position(material, index)
+            _set_board(board, position)
+            moves = rules.generate_side_moves(board)
+            node = base + index
+            if not moves:
+                buckets.setdefault(0, []).append(node)
+                continue
+            best_win = None
+            for move in moves:
+                successor = _successor(position, move)
+                successor_material = tuple(map(len, successor))
+                if successor_material in starts:
+                    edge_from.append(node)
+                    edge_to.append(starts[successor_material] + layout.index(*successor))
+                    unresolved[node] += 1
+                    continue
+                if not successor[0] and not successor[1]:
+                    result, distance = LOSS, 0
+                else:
+                    result, distance = decode(database.value(*successor))
+                if result == LOSS:
+                    best_win = distance + 1 if best_win is None else min(best_win, distance + 1)
+                elif result == WIN:
+                    worst[node] = max(worst[node], distance + 1)
+                else:
+                    escape[node] = 1
+            if best_win is not None:
+                escape[node] = 1
+                buckets.setdefault(best_win, []).append(node)
+            elif not unresolved[node] and not escape[node]:
+                buckets.setdefault(worst[node], []).append(node)
+    database.close()
+
+    # Обратные рёбра: предшественники позиции - predecessors[first[node]:first[node + 1]]
+    first = [0] * (size + 1)
+    for node in edge_to:
+        first[node + 1] += 1
+    for node in range(size):
+        first[node + 1] += first[node]
+    fill = first[:-1]
+    predecessors = [0] * len(edge_to)
+    for source, target in zip(edge_from, edge_to):
+        predecessors[fill[target]] = source
+        fill[target] += 1
+    del edge_from, edge_to, fill
+
+    # Значения расходятся по возрастанию расстояния: нечётное - выигрыш, чётное - проигрыш
+    values = bytearray(size)
+    while buckets:
+        distance = min(buckets)
+        for node in buckets.pop(distance):
+            if values[node]:
+                continue
+            values[node] = encode(WIN if distance & 1 else LOSS, distance)
+            for predecessor in predecessors[first[node]:first[node + 1]]:
+                if values[predecessor]:
+                    continue
+                if not distance & 1:
+                    buckets.setdefault(distance + 1, []).append(predecessor)
+                    continue
+                unresolved[predecessor] -= 1
+                if distance + 1 > worst[predecessor]:
+                    worst[predecessor] = distance + 1
+                if not unresolved[predecessor] and not escape[predecessor]:
+                    buckets.setdefault(worst[predecessor], []).append(predecessor)
+
+    with open(path, "r+b") as file:
+        for material in group:
+            file.seek(layout.offsets[material])
+            file.write(values[starts[material]:starts[material] + layout.sizes[material]])
+    wins = sum(1 for value in values if value & 1)
+    draws = values.count(0)
+    return group, size, wins, size - wins - draws, draws, max((decode(value)[1] for value in values), default=0), time.perf_counter() - started
+
+
+def generate(path, max_pieces, flying_kings=False, workers=None, log=print):
+    """Строит базу до max_pieces шашек в файл path. workers - число процессов (1 - в этом процессе)."""
+    layout = Layout(max_pieces, HEADER.size + len(materials(max_pieces)) * SLICE.size)
+    flags = FLYING_KINGS if flying_kings else 0
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, max_pieces, flags, len(layout.materials)))
+        for material in layout.materials:
+            file.write(SLICE.pack(*material, layout.offsets[material]))
+        file.truncate(layout.end)
+
+    # Уровни решения: группы уровня зависят только от предыдущих уровней
+    levels = {}
+    done = set()
+    for material in layout.materials:
+        if material in done:
+            continue
+        group = tuple(sorted({material, flipped(material)}))
+        done.update(group)
+        levels.setdefault((sum(material), material[0] + material[2]), []).append(group)
+
+    workers = workers or os.cpu_count()
+    # Пул процессов нужен только генерации, чтение базы в игре его не импортирует
+    from concurrent.futures import ProcessPoolExecutor
+    executor = ProcessPoolExecutor(workers) if workers > 1 else None
+    try:
+        for level in sorted(levels):
+            arguments = [(path, max_pieces, flying_kings, group) for group in levels[level]]
+            results = executor.map(solve_group, *zip(*arguments)) if executor else (solve_group(*argument) for argument in arguments)
+            for group, size, wins, losses, draws, longest, seconds in results:
+                log(f"{' '.join(''.join(map(str, material)) for material in group):<10}{size:>10} позиций  "
+                    f"выигрышей {wins:>9}  проигрышей {losses:>9}  ничьих {draws:>9}  до {longest:>3} полуходов  {seconds:7.1f} с")
+    finally:
+        if executor:
+            executor.shutdown()
+
+    with open(path, "r+b") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, max_pieces, flags | COMPLETE, len(layout.materials)))
+    return layout.end
+
+
+def main():
+    """Разбор аргументов: построение базы или значение позиции из файла."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pieces", type=int, default=4, help="наибольшее число шашек на доске")
+    parser.add_argument("--flying-kings", action="store_true", help="дальнобойные дамки")
+    parser.add_argument("--workers", type=int, default=None, help="процессов (по умолчанию - по числу ядер)")
+    parser.add_argument("--output", default=DEFAULT_PATH)
+    parser.add_argument("--probe", help="файл с диаграммой позиции: вывести её значение из базы")
+    parser.add_argument("--side", choices=["white", "black"], default="white", help="кто ходит в позиции --probe")
+    parser.add_argument("--database", default=DEFAULT_PATH, help="база для --probe")
+    args = parser.parse_args()
+
+    if args.probe:
+        board = Board("checkers", False, None)
+        with open(args.probe, encoding="utf-8") as file:
+            board.load_diagram(file.read(), args.side)
+        with EndgameDatabase(args.database) as database:
+            value = database.probe(board)
+        print(describe(*value) if value else "Позиции нет в базе.")
+        return
+
+    started = time.perf_counter()
+    size = generate(args.output, args.pieces, args.flying_kings, args.workers)
+    print(f"{args.output}: {size} байт, {time.perf_counter() - started:.1f} с")
+
+
+if __name__ == "__main__":
+    main()
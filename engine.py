@@ -0,0 +1,373 @@
+"""Поиск лучшего хода: negamax с альфа-бета отсечением и итеративным углублением.
+
+Ходы - те же кортежи аргументов board.make_move, что и в perft; в шахматах перебираются только
+допустимые ходы (legal.py): нет ходов под шахом - мат, без шаха - пат (ничья). Поиск ведётся на переданной доске через make_move/unmake_move
+и возвращает её в исходную позицию.
+
+Порядок ходов: ход из таблицы транспозиций, взятия (самая ценная жертва самым дешёвым
+нападающим), ходы-убийцы своей глубины, остальные по истории отсечений. На листьях -
+форсированный перебор взятий, чтобы оценка не обрывалась посреди размена. В шашках позиции
+из эндшпильной базы (endgame.py) не перебираются: их значение берётся из базы.
+
+Запуск:
+    python engine.py --variant chess --time 2 [--depth 8] [--nodes 100000]
+    python engine.py --variant checkers --position position.txt --side black [--flying-kings] [--endgame checkers_endgame.db]
+"""
+import argparse
+import time
+
+from game import ALL_SQUARES, VARIANTS, Checker, King, Pawn, mask_squares
+from legal import analyse
+from perft import create_board, generate_moves, square_name
+
+MATE = 100000
+# Оценки ближе MATE_BOUND к MATE - найденный мат, их расстояние пересчитывается по ply
+MATE_BOUND = MATE - 1000
+INFINITY = MATE + 1
+EXACT, LOWER, UPPER = 0, 1, 2
+# Как часто (в узлах) проверять ограничения по времени и числу узлов
+CHECK_INTERVAL = 512
+# Бонус за близость к центру: 0 в углу, 6 в центре
+CENTER_DISTANCE = [min(row, 7 - row) + min(col, 7 - col) for row, col in ALL_SQUARES]
+
+
+def evaluate(board):
+    """Оценивает позицию с точки зрения стороны, которая ходит: материал и положение фигур.
+
+    Пешки и простые шашки ценятся тем выше, чем дальше продвинулись, остальные фигуры (кроме
+    короля) - чем ближе к центру.
+    """
+    grid = board.board
+    score = 0
+    for color, sign in (("white", 1), ("black", -1)):
+        for row, col in mask_squares(board.piece_masks[color]):
+            piece = grid[row][col]
+            value = piece.value
+            if isinstance(piece, Pawn) or isinstance(piece, Checker) and not piece.is_queen:
+                value += 5 * (7 - row if color == "white" else row)
+            elif not isinstance(piece, King):
+                value += 4 * CENTER_DISTANCE[row * 8 + col]
+            score += sign * value
+    return score if board.current_player == "white" else -score
+
+
+def move_name(move):
+    """Записывает ход: e2e4, взятия цепочкой шашек - с перечислением снятых шашек (c3e7xd4xf6)."""
+    start_row, start_col, end_row, end_col = move[:4]
+    taken = "".join(f"x{square_name(row, col)}" for row, col in move[6])
+    return f"{square_name(start_row, start_col)}{square_name(end_row, end_col)}{taken}"
+
+
+class SearchResult:
+    """Итог поиска: лучший ход, его оценка, достигнутая глубина, число узлов и главный вариант."""
+    def __init__(self, move, score, depth, nodes, seconds, principal_variation):
+        """Инициализация итога."""
+        self.move = move
+        self.score = score
+        self.depth = depth
+        self.nodes = nodes
+        self.seconds = seconds
+        self.principal_variation = principal_variation
+
+    @property
+    def nodes_per_second(self):
+        """Скорость поиска."""
+        return self.nodes / self.seconds if self.seconds else 0.0
+
+    def describe(self):
+        """Строка отчёта: лучший ход, глубина, оценка, узлы, скорость, главный вариант."""
+        if abs(self.score) >= MATE_BOUND:
+            score = f"{'выигрыш' if self.score > 0 else 'проигрыш'} через {MATE - abs(self.score)} полуходов"
+        else:
+            score = f"{self.score / 100:+.2f}"
+        variation = " ".join(move_name(move) for move in self.principal_variation)
+        return (f"ход {move_name(self.move) if self.move else '-'}, глубина {self.depth}, оценка {score}, узлов {self.nodes:,}, {self.seconds:.2f} с, "
+                f"{self.nodes_per_second:,.0f} узлов/с, вариант: {variation}")
+
+
+class Engine:
+    """Движок анализа. Таблица транспозиций, ходы-убийцы и история сохраняются между поисками."""
+    def __init__(self, table_size=1 << 18, endgame=None):
+        """Инициализация. table_size - число ячеек таблицы транспозиций (ограничивает её память),
+        endgame - эндшпильная база шашек (endgame.EndgameDatabase)."""
+        self.table_size = table_size
+        self.endgame = endgame
+        self.use_endgame = False
+        self.table = [None] * table_size
+        self.killers = []
+        self.history = {}
+        self.board = None
+        self.rules = None
+        self.nodes = 0
+        self.stopped = False
+        self.deadline = None
+        self.node_limit = None
+        self.root_move = None
+
+    def clear(self):
+        """Забывает накопленные таблицы."""
+        self.table = [None] * self.table_size
+        self.killers = []
+        self.history = {}
+
+    def search(self, board, rules=None, time_limit=1.0, max_depth=64, node_limit=None, info=None):
+        """Ищет лучший ход стороны, которая ходит, углубляясь, пока не кончится время или узлы.
+
+        rules - правила шашек (checkers.CheckersRules); time_limit - секунды или None (без
+        ограничения); info(result) вызывается после каждой завершённой глубины. Возвращает
+        SearchResult последней завершённой глубины (move=None, если ходов нет).
+        """
+        # not > 0 отсекает и nan: такой срок никогда не наступил бы
+        if time_limit is not None and not time_limit > 0:
+            raise ValueError(f"Время поиска должно быть положительным: {time_limit}")
+        self.board = board
+        self.rules = rules
+        # База годится только для тех же правил дамок, для которых построена
+        self.use_endgame = (self.endgame is not None and board.game_type == "checkers"
+                            and (rules.flying_kings if rules is not None else False) == self.endgame.flying_kings)
+        self.nodes = 0
+        self.stopped = False
+        started = time.perf_counter()
+        self.deadline = started + time_limit if time_limit is not None else None
+        self.node_limit = node_limit
+        self.root_move = None
+        self.history = {key: value // 8 for key, value in self.history.items() if value >= 8}
+
+        result = SearchResult(None, 0, 0, 0, 0.0, [])
+        for depth in range(1, max_depth + 1):
+            score = self._negamax(depth, -INFINITY, INFINITY, 0)
+            if self.stopped and depth > 1:
+                break
+            variation = self._principal_variation(depth)
+            # Если время кончилось посреди первой глубины, лучший из просмотренных ходов всё равно есть
+            move = variation[0] if variation else self.root_move
+            result = SearchResult(move, score, depth, self.nodes, time.perf_counter() - started, variation or ([move] if move else []))
+            if info is not None:
+                info(result)
+            if move is None or abs(score) >= MATE_BOUND or self.stopped:
+                break
+            # Следующая глубина обычно дольше всех предыдущих вместе: не начинаем её, если она не успеет
+            if self.deadline is not None and time.perf_counter() - started > (self.deadline - started) / 2:
+                break
+        result.nodes = self.nodes
+        result.seconds = time.perf_counter() - started
+        return result
+
+    def _check_limits(self):
+        """Останавливает поиск по времени или числу узлов."""
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            self.stopped = True
+        elif self.deadline is not None and time.perf_counter() >= self.deadline:
+            self.stopped = True
+
+    def _negamax(self, depth, alpha, beta, ply):
+        """Оценка позиции перебором на depth полуходов с окном (alpha, beta)."""
+        board = self.board
+        self.nodes += 1
+        if self.nodes % CHECK_INTERVAL == 0:
+            self._check_limits()
+        if self.stopped:
+            return 0
+        if self.use_endgame and ply > 0:
+            value = self.endgame.probe(board)
+            if value is not None:
+                # База уже открыта, поэтому модуль загружен; импорт не на уровне модуля, чтобы шахматы его не грузили
+                from endgame import DRAW, WIN
+                result, distance = value
+                return 0 if result == DRAW else MATE - ply - distance if result == WIN else ply + distance - MATE
+
+        key = board.zobrist_hash
+        index = key % self.table_size
+        entry = self.table[index]
+        table_move = None
+        if entry is not None and entry[0] == key:
+            _, entry_depth, entry_score, flag, table_move = entry
+            if entry_depth >= depth and ply > 0:
+                entry_score = self._score_from_table(entry_score, ply)
+                if flag == EXACT:
+                    return entry_score
+                if flag == LOWER and entry_score >= beta or flag == UPPER and entry_score <= alpha:
+                    return entry_score
+
+        if depth <= 0:
+            return self._quiescence(alpha, beta, ply)
+
+        moves, in_check = self._side_moves()
+        if not moves:
+            # В шашках нет ходов - поражение; в шахматах - мат под шахом, иначе пат
+            return ply - MATE if in_check else 0
+
+        original_alpha = alpha
+        best_score = -INFINITY
+        best_move = None
+        for move in self._ordered(moves, table_move, ply):
+            board.make_move(*move)
+            score = -self._negamax(depth - 1, -beta, -alpha, ply + 1)
+            board.unmake_move()
+            if self.stopped:
+                return 0
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if ply == 0:
+                    self.root_move = move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                if not self._is_capture(move):
+                    self._remember_cutoff(move, depth, ply)
+                break
+
+        flag = UPPER if best_score <= original_alpha else LOWER if best_score >= beta else EXACT
+        self.table[index] = (key, depth, self._score_to_table(best_score, ply), flag, best_move)
+        return best_score
+
+    def _quiescence(self, alpha, beta, ply):
+        """Оценка на листе: статическая, если она уже не хуже beta, иначе с перебором взятий."""
+        board = self.board
+        self.nodes += 1
+        if self.nodes % CHECK_INTERVAL == 0:
+            self._check_limits()
+        if self.stopped:
+            return 0
+        moves, in_check = self._side_moves()
+        if not moves:
+            return ply - MATE if in_check else 0
+
+        best_score = evaluate(board)
+        if best_score >= beta:
+            return best_score
+        if best_score > alpha:
+            alpha = best_score
+        captures = [move for move in moves if self._is_capture(move)]
+        captures.sort(key=self._capture_order, reverse=True)
+        for move in captures:
+            board.make_move(*move)
+            score = -self._quiescence(-beta, -alpha, ply + 1)
+            board.unmake_move()
+            if self.stopped:
+                return 0
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        return best_score
+
+    def _side_moves(self):
+        """Ходы стороны, которая ходит, и стоит ли она под шахом (в шашках нет ходов - всегда поражение)."""
+        board = self.board
+        if board.game_type == "checkers":
+            return generate_moves(board, rules=self.rules), True
+        legal = analyse(board)
+        return [(row, col, end_row, end_col, None, None, ())
+                for (row, col), targets in legal.moves.items() for end_row, end_col in targets], legal.in_check
+
+    def _is_capture(self, move):
+        """Ход берёт фигуру соперника."""
+        return bool(move[6]) or self.board.board[move[2]][move[3]] is not None
+
+    def _capture_order(self, move):
+        """Ключ сортировки взятий: ценная жертва и дешёвый нападающий - раньше."""
+        grid = self.board.board
+        victim = grid[move[2]][move[3]]
+        if move[6]:
+            gain = sum(grid[row][col].value for row, col in move[6])
+        else:
+            gain = victim.value
+        return gain * 16 - grid[move[0]][move[1]].value // 64
+
+    def _ordered(self, moves, table_move, ply):
+        """Упорядочивает ходы для перебора."""
+        killers = self.killers[ply] if ply < len(self.killers) else ()
+        history = self.history
+
+        def order(move):
+            if move == table_move:
+                return (3, 0)
+            if self._is_capture(move):
+                return (2, self._capture_order(move))
+            if move in killers:
+                return (1, 0)
+            return (0, history.get(move[:4], 0))
+
+        return sorted(moves, key=order, reverse=True)
+
+    def _remember_cutoff(self, move, depth, ply):
+        """Запоминает тихий ход, вызвавший отсечение: как ход-убийцу глубины ply и в истории."""
+        while len(self.killers) <= ply:
+            self.killers.append([])
+        killers = self.killers[ply]
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[2:]
+        self.history[move[:4]] = self.history.get(move[:4], 0) + depth * depth
+
+    @staticmethod
+    def _score_to_table(score, ply):
+        """Оценка мата хранится в таблице от текущей позиции, а не от корня."""
+        if score >= MATE_BOUND:
+            return score + ply
+        if score <= -MATE_BOUND:
+            return score - ply
+        return score
+
+    @staticmethod
+    def _score_from_table(score, ply):
+        """Обратное к _score_to_table."""
+        if score >= MATE_BOUND:
+            return score - ply
+        if score <= -MATE_BOUND:
+            return score + ply
+        return score
+
+    def _principal_variation(self, depth):
+        """Восстанавливает главный вариант по таблице транспозиций."""
+        board = self.board
+        variation = []
+        seen = set()
+        while len(variation) < depth and board.zobrist_hash not in seen:
+            seen.add(board.zobrist_hash)
+            entry = self.table[board.zobrist_hash % self.table_size]
+            if entry is None or entry[0] != board.zobrist_hash or entry[4] is None:
+                break
+            move = entry[4]
+            if move not in self._side_moves()[0]:
+                break
+            variation.append(move)
+            board.make_move(*move)
+        for _ in variation:
+            board.unmake_move()
+        return variation
+
+
+def main():
+    """Разбор аргументов командной строки."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--variant", choices=sorted(VARIANTS), default="chess")
+    parser.add_argument("--engine", choices=["mailbox", "bitboard"], default="mailbox")
+    parser.add_argument("--position", help="файл с диаграммой позиции в формате Board.display")
+    parser.add_argument("--side", choices=["white", "black"], default="white", help="кто ходит в загруженной позиции")
+    parser.add_argument("--flying-kings", action="store_true", help="дальнобойные дамки в шашках")
+    parser.add_argument("--time", type=float, default=2.0, help="ограничение времени, с")
+    parser.add_argument("--depth", type=int, default=64, help="наибольшая глубина")
+    parser.add_argument("--nodes", type=int, default=None, help="ограничение числа узлов")
+    parser.add_argument("--endgame", help="эндшпильная база шашек (endgame.py)")
+    args = parser.parse_args()
+
+    position = None
+    if args.position:
+        with open(args.position, encoding="utf-8") as file:
+            position = file.read()
+    from checkers import CheckersRules
+    from endgame import EndgameDatabase
+    board = create_board(args.variant, args.engine, position, args.side)
+    endgame = EndgameDatabase(args.endgame) if args.endgame else None
+    result = Engine(endgame=endgame).search(board, CheckersRules(args.flying_kings), args.time, args.depth, args.nodes,
+                             info=lambda result: print(result.describe()))
+    print(f"лучший ход: {move_name(result.move) if result.move else 'нет ходов'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,57 @@
+import os
+import sys
+
+from move_cache import default_cache
+from movement import CAPTURE_ONLY, MOVE_ONLY, Drop, Jump, Leaper, Movement, Rider
+# VARIANTS (имя -> (game_type, modified_chess)) заполняет реестр вариантов
+from variants import VARIANTS, Variant, game_type_pieces, register, variant_of
+from zobrist import SIDE_KEY, piece_keys, variant_key
+
+if __name__ == "__main__":
+    # Модули-расширения импортируют game, поэтому при запуске скриптом регистрируем себя под этим именем
+    sys.modules.setdefault("game", sys.modules[__name__])
+
+ALL_SQUARES = [(row, col) for row in range(8) for col in range(8)]
+ORTHOGONAL_DIRECTIONS = [(0, 1), (0, -1), (1, 0), (-1, 0)]
+DIAGONAL_DIRECTIONS = [(1, 1), (1, -1), (-1, 1), (-1, -1)]
+KNIGHT_OFFSETS = [(-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)]
+# Клетки для каждого значения байта каждой горизонтали: перевод битовой маски в список клеток по строкам
+ROW_SQUARES = [[tuple((row, col) for col in range(8) if byte >> col & 1) for byte in range(256)] for row in range(8)]
+FULL_MASK = (1 << 64) - 1
+# Порядок диагоналей шашки: сначала вверх (к строке 0), затем вниз, в каждом направлении - влево, затем вправо
+DIAGONAL_STEPS = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+POSITION_FORMAT_ERROR = "Неверный формат позиции.  Пример: a2"
+INVALID_MOVE_ERROR = "Недопустимый ход."
+CAPTURE_REQUIRED_ERROR = "Взятие обязательно. Выберите шашку, которая может бить."
+NO_MOVES_ERROR = "У этой фигуры нет доступных ходов. Выберите другую фигуру."
+UNDO_FORMAT_ERROR = "Неверный формат команды 'отмена'. Используйте 'отмена N', где N - целое положительное число."
+EMPTY_HISTORY_MESSAGE = "История ходов пуста."
+CHECKMATE_MESSAGE = "Мат. Победа {winner}."
+STALEMATE_MESSAGE = "Пат. Ничья."
+
+def mask_squares(mask):
+    """Превращает битовую маску клеток (бит row * 8 + col) в список клеток в порядке обхода доски."""
+    squares = []
+    row = 0
+    while mask:
+        byte = mask & 255
+        if byte:
+            squares += ROW_SQUARES[row][byte]
+        mask >>= 8
+        row += 1
+    return squares
+
 class Move:
-    """Представляет ход в игре. Хранит информацию о ходе для отмены."""
-    def __init__(self, start_row, start_col, end_row, end_col, piece, captured_piece, jumped_piece_row=None, jumped_piece_col=None, became_queen=False):
+    """Представляет ход в игре. Хранит информацию о ходе для отмены.
+
+    piece - фигура до хода (до превращения), captured_piece - фигура на целевой клетке,
+    jumped_piece - шашка, снятая при взятии, captured_chain - шашки, снятые цепочкой взятий:
+    кортежи (строка, столбец, фигура) в порядке взятия.
+    """
+    __slots__ = ("start_row", "start_col", "end_row", "end_col", "piece", "captured_piece",
+                 "jumped_piece_row", "jumped_piece_col", "became_queen", "jumped_piece", "captured_chain")
+
+    def __init__(self, start_row, start_col, end_row, end_col, piece, captured_piece, jumped_piece_row=None, jumped_piece_col=None, became_queen=False, jumped_piece=None, captured_chain=()):
         """Инициализация хода."""
         self.start_row = start_row
         self.start_col = start_col
@@ -11,493 +62,945 @@ class Move:
         self.jumped_piece_row = jumped_piece_row
         self.jumped_piece_col = jumped_piece_col
         self.became_queen = became_queen
+        self.jumped_piece = jumped_piece
+        self.captured_chain = captured_chain
+
+class PieceType(type):
+    """Метакласс фигур: фигура неизменяема, поэтому на каждый (тип, цвет, превращение) хватает одного общего экземпляра."""
+    def __init__(cls, name, bases, namespace):
+        """Заводит классу собственный набор экземпляров."""
+        super().__init__(name, bases, namespace)
+        cls.instances = {}
+
+    def __call__(cls, *args, **kwargs):
+        """Возвращает общий экземпляр фигуры, создавая его при первом обращении."""
+        key = args + tuple(sorted(kwargs.items())) if kwargs else args
+        piece = cls.instances.get(key)
+        if piece is None:
+            piece = super().__call__(*args, **kwargs)
+            piece.zobrist_keys = piece_keys(piece.hash_kind())
+            # Checker("white") и Checker("white", False) - одна и та же фигура
+            piece = cls.instances.setdefault(piece.flyweight_args(), piece)
+            cls.instances[key] = piece
+        return piece
+
+class Piece(metaclass=PieceType):
+    """Базовый класс для фигур. Определяет общие свойства и методы.
+
+    Экземпляры общие для всех досок (см. PieceType): атрибуты задаются один раз при создании.
+    """
+    __slots__ = ("color", "symbol", "zobrist_keys")
+    # Описание движения (см. movement.Movement); фигуры без него переопределяют possible_moves
+    movement = None
+    # Ценность фигуры для оценки позиции (в сотых долях пешки)
+    value = 0
 
-class Piece:
-    """Базовый класс для фигур. Определяет общие свойства и методы."""
     def __init__(self, color, symbol):
         """Инициализация фигуры."""
         self.color = color
         self.symbol = symbol
 
+    def __setattr__(self, name, value):
+        """Разрешает только первое присваивание атрибута."""
+        if hasattr(self, name):
+            raise AttributeError(f"Фигура неизменяема: нельзя изменить {name}")
+        object.__setattr__(self, name, value)
+
+    def __reduce__(self):
+        """При копировании и передаче между процессами фигура снова становится общим экземпляром."""
+        return (type(self), self.flyweight_args())
+
+    def flyweight_args(self):
+        """Аргументы конструктора, однозначно задающие фигуру."""
+        return (self.color,)
+
     def __str__(self):
         """Возвращает строковое представление фигуры (символ)."""
         return self.symbol
 
     def possible_moves(self, board, start_row, start_col):
-        """Возвращает список возможных ходов для фигуры. Реализуется в подклассах."""
-        return []
+        """Возвращает список возможных ходов для фигуры по описанию её движения."""
+        if self.movement is None:
+            return []
+        return self.movement.moves(board, start_row, start_col, self.color)
 
     def is_valid_move(self, board, start_row, start_col, end_row, end_col):
         """Проверяет допустимость хода."""
         return (end_row, end_col) in self.possible_moves(board, start_row, start_col)
 
+    def watched_squares(self, board, start_row, start_col):
+        """Возвращает клетки, от содержимого которых зависят ходы фигуры. Без описания движения - вся доска."""
+        if self.movement is None:
+            return ALL_SQUARES
+        return self.movement.watched_squares(board, start_row, start_col, self.color)
+
+    def hash_kind(self):
+        """Возвращает вид фигуры для хеширования позиции: фигуры одного вида взаимозаменяемы."""
+        return (type(self).__name__, self.color)
+
 class Pawn(Piece):
     """Класс для пешки. Наследует от Piece и реализует логику движения."""
+    __slots__ = ()
+    value = 100
+    # Ход вперёд только на пустую клетку (с начальной горизонтали - на две), взятие только по диагонали
+    movement = Movement(Rider([(-1, 0)], max_range=1, mode=MOVE_ONLY, relative=True, initial_row=6, initial_range=2),
+                        Leaper([(-1, -1), (-1, 1)], mode=CAPTURE_ONLY, relative=True))
+
     def __init__(self, color):
         """Инициализация пешки."""
         super().__init__(color, "P" if color == "white" else "p")
 
-    def possible_moves(self, board, start_row, start_col):
-        """Возвращает список возможных ходов для пешки."""
-        moves = []
-        direction = -1 if self.color == "white" else 1
-        new_row = start_row + direction
-
-        if 0 <= new_row < 8 and not board.board[new_row][start_col]:
-            moves.append((new_row, start_col))
-
-        if (self.color == "white" and start_row == 6) or (self.color == "black" and start_row == 1):
-            new_row = start_row + 2 * direction
-            if not board.board[new_row][start_col] and not board.board[start_row + direction][start_col]:
-                moves.append((new_row, start_col))
-
-        for col_offset in [-1, 1]:
-            new_col = start_col + col_offset
-            new_row = start_row + direction
-            if 0 <= new_row < 8 and 0 <= new_col < 8 and board.board[new_row][new_col] and board.board[new_row][new_col].color != self.color:
-                moves.append((new_row, new_col))
-
-        return moves
-
 class Rook(Piece):
     """Класс для ладьи. Наследует от Piece и реализует логику движения."""
+    __slots__ = ()
+    value = 500
+    movement = Movement(Rider(ORTHOGONAL_DIRECTIONS))
+
     def __init__(self, color):
         """Инициализация ладьи."""
         super().__init__(color, "R" if color == "white" else "r")
 
-    def possible_moves(self, board, start_row, start_col):
-        """Возвращает список возможных ходов для ладьи."""
-        moves = []
-        for direction in [(0, 1), (0, -1), (1, 0), (-1, 0)]:
-            for i in range(1, 8):
-                new_row = start_row + direction[0] * i
-                new_col = start_col + direction[1] * i
-
-                if 0 <= new_row < 8 and 0 <= new_col < 8:
-                    if not board.board[new_row][new_col]:
-                        moves.append((new_row, new_col))
-                    else:
-                        if board.board[new_row][new_col].color != self.color:
-                            moves.append((new_row, new_col))
-                        break
-                else:
-                    break
-
-        return moves
-
 class Knight(Piece):
     """Класс для коня. Наследует от Piece и реализует логику движения."""
+    __slots__ = ()
+    value = 320
+    movement = Movement(Leaper(KNIGHT_OFFSETS))
+
     def __init__(self, color):
         """Инициализация коня."""
         super().__init__(color, "N" if color == "white" else "n")
 
-    def possible_moves(self, board, start_row, start_col):
-        """Возвращает список возможных ходов для коня."""
-        moves = []
-        knight_moves = [(-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)]
-        for move in knight_moves:
-            new_row = start_row + move[0]
-            new_col = start_col + move[1]
-
-            if 0 <= new_row < 8 and 0 <= new_col < 8 and (not board.board[new_row][new_col] or board.board[new_row][new_col].color != self.color):
-                moves.append((new_row, new_col))
-
-        return moves
-
 class Bishop(Piece):
     """Класс для слона. Наследует от Piece и реализует логику движения."""
+    __slots__ = ()
+    value = 330
+    movement = Movement(Rider(DIAGONAL_DIRECTIONS))
+
     def __init__(self, color):
         """Инициализация слона."""
         super().__init__(color, "B" if color == "white" else "b")
 
-    def possible_moves(self, board, start_row, start_col):
-        """Возвращает список возможных ходов для слона."""
-        moves = []
-        for direction in [(1, 1), (1, -1), (-1, 1), (-1, -1)]:
-            for i in range(1, 8):
-                new_row = start_row + direction[0] * i
-                new_col = start_col + direction[1] * i
-
-                if 0 <= new_row < 8 and 0 <= new_col < 8:
-                    if not board.board[new_row][new_col]:
-                        moves.append((new_row, new_col))
-                    else:
-                        if board.board[new_row][new_col].color != self.color:
-                            moves.append((new_row, new_col))
-                        break
-                else:
-                    break
-
-        return moves
-
 class Queen(Piece):
     """Класс для ферзя. Наследует от Piece и реализует логику движения."""
+    __slots__ = ()
+    value = 900
+    # Ферзь ходит как ладья и слон
+    movement = Movement(Rider(ORTHOGONAL_DIRECTIONS + DIAGONAL_DIRECTIONS))
+
     def __init__(self, color):
         """Инициализация ферзя."""
         super().__init__(color, "Q" if color == "white" else "q")
 
-    def possible_moves(self, board, start_row, start_col):
-        """Возвращает список возможных ходов для ферзя. Ферзь ходит как ладья и слон."""
-        return Rook(self.color).possible_moves(board, start_row, start_col) + Bishop(self.color).possible_moves(board, start_row, start_col)
-
 class King(Piece):
     """Класс для короля. Наследует от Piece и реализует логику движения."""
+    __slots__ = ()
+    movement = Movement(Leaper([(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]))
+
     def __init__(self, color):
         """Инициализация короля."""
         super().__init__(color, "K" if color == "white" else "k")
 
-    def possible_moves(self, board, start_row, start_col):
-        """Возвращает список возможных ходов для короля."""
-        moves = []
-        king_moves = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
-        for move in king_moves:
-            new_row = start_row + move[0]
-            new_col = start_col + move[1]
-
-            if 0 <= new_row < 8 and 0 <= new_col < 8 and (not board.board[new_row][new_col] or board.board[new_row][new_col].color != self.color):
-                moves.append((new_row, new_col))
-
-        return moves
-
 class Checker(Piece):
     """Класс для шашки. Наследует от Piece и реализует логику движения."""
+    __slots__ = ("direction", "is_queen", "movement", "capture_movement", "value")
+    man_movement = Movement(Leaper([(-1, -1), (-1, 1)], mode=MOVE_ONLY, relative=True))
+    man_capture_movement = Movement(Jump([(-1, -1), (-1, 1)], relative=True))
+    queen_movement = Movement(Leaper(DIAGONAL_STEPS, mode=MOVE_ONLY))
+    queen_capture_movement = Movement(Jump(DIAGONAL_STEPS))
+
     def __init__(self, color, is_queen = False):
         """Инициализация шашки."""
-        super().__init__(color, "W" if color == "white" else "B")
+        if is_queen:
+            super().__init__(color, "WQ" if color == "white" else "BQ")
+        else:
+            super().__init__(color, "W" if color == "white" else "B")
         self.direction = -1 if color == "white" else 1
         self.is_queen = is_queen  # Flag to check if the checker is a queen
-        if self.is_queen:
-            self.symbol = "WQ" if color == "white" else "BQ"
+        self.movement = self.queen_movement if is_queen else self.man_movement
+        self.capture_movement = self.queen_capture_movement if is_queen else self.man_capture_movement
+        self.value = 300 if is_queen else 100
 
-    def possible_moves(self, board, start_row, start_col):
-        """Возвращает список возможных ходов для шашки."""
-        moves = []
-        directions = [-1, 1] if self.is_queen else [self.direction]
-
-        for direction in directions:
-            for col_offset in [-1, 1]:
-                new_col = start_col + col_offset
-                new_row = start_row + direction
-                if 0 <= new_col < 8 and 0 <= new_row < 8 and not board.board[new_row][new_col]:
-                    moves.append((new_row, new_col))
-        return moves
+    def flyweight_args(self):
+        """Шашка задаётся цветом и превращением в дамку."""
+        return (self.color, self.is_queen)
+
+    def hash_kind(self):
+        """Вид шашки учитывает превращение в дамку."""
+        return (type(self).__name__, self.color, self.is_queen)
 
     def find_capture_moves(self, board, start_row, start_col):
         """Находит все ходы взятия для шашки."""
-        capture_moves = []
-        directions = [-1, 1] if self.is_queen else [self.direction]
-
-        for direction in directions:
-            for col_offset in [-1, 1]:
-                new_col = start_col + col_offset
-                new_row = start_row + direction
-                jumped_row = start_row + 2 * direction
-                jumped_col = start_col + 2 * col_offset
-
-                if (0 <= new_row < 8 and 0 <= new_col < 8 and 0 <= jumped_row < 8 and 0 <= jumped_col < 8 and
-                    board.board[new_row][new_col] and board.board[new_row][new_col].color != self.color and not board.board[jumped_row][jumped_col]):
-                    capture_moves.append((jumped_row, jumped_col))
-        return capture_moves
+        return self.capture_movement.moves(board, start_row, start_col, self.color)
 
 class Lancer(Piece):
     """Класс для Копейщика. Наследует от Piece и реализует логику движения."""
+    __slots__ = ()
+    value = 300
+    movement = Movement(Rider([(-1, 0)], relative=True))
     def __init__(self, color): super().__init__(color, "L" if color == "white" else "l")
-    def possible_moves(self, board, start_row, start_col):
-        """Возвращает список возможных ходов для Копейщика."""
-        moves = []
-        direction = -1 if self.color == "white" else 1
-        for i in range(1, 8):
-            new_row = start_row + direction * i
-            if 0 <= new_row < 8:
-                if not board.board[new_row][start_col]:
-                    moves.append((new_row, start_col))
-                else:
-                    if board.board[new_row][start_col].color != self.color:
-                        moves.append((new_row, start_col))
-                    break
-            else:
-                break
-        return moves
 
 class Assassin(Piece):
     """Класс для Ассасина. Наследует от Piece и реализует логику движения."""
+    __slots__ = ()
+    value = 320
+    movement = Movement(Leaper(KNIGHT_OFFSETS))
     def __init__(self, color): super().__init__(color, "A" if color == "white" else "a")
-    def possible_moves(self, board, start_row, start_col):
-        """Возвращает список возможных ходов для Ассасина."""
-        moves = []
-        assassin_moves = [(-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)]
-        for move in assassin_moves:
-            new_row = start_row + move[0]
-            new_col = start_col + move[1]
-            if 0 <= new_row < 8 and 0 <= new_col < 8 and (not board.board[new_row][new_col] or board.board[new_row][new_col].color != self.color):
-                moves.append((new_row, new_col))
-        return moves
 
 class Fortress(Piece):
     """Класс для Крепости. Наследует от Piece и реализует логику движения."""
+    __slots__ = ()
+    value = 450
+    # Шаг на соседнюю клетку или перенос на любую пустую клетку
+    movement = Movement(Leaper([(-1, 0), (1, 0), (0, -1), (0, 1)]), Drop())
     def __init__(self, color): super().__init__(color, "F" if color == "white" else "f")
-    def possible_moves(self, board, start_row, start_col):
-        """Возвращает список возможных ходов для Крепости."""
-        moves = []
-        fortress_moves = [(-1, 0), (1, 0), (0, -1), (0, 1)]
-        for move in fortress_moves:
-            new_row = start_row + move[0]
-            new_col = start_col + move[1]
-            if 0 <= new_row < 8 and 0 <= new_col < 8 and (not board.board[new_row][new_col] or board.board[new_row][new_col].color != self.color):
-                moves.append((new_row, new_col))
-        for row in range(8):
-            for col in range(8):
-                if not board.board[row][col]:
-                    moves.append((row, col))
-        return moves
+
+# Виды фигур в порядке их числовых кодов (код - номер в списке + 1) для двоичного и массивного
+# представления позиции (position.py, batch.py); новые виды добавляются в конец
+PIECE_KINDS = [(Pawn, ()), (Rook, ()), (Knight, ()), (Bishop, ()), (Queen, ()), (King, ()),
+               (Lancer, ()), (Assassin, ()), (Fortress, ()), (Checker, (False,)), (Checker, (True,))]
+
+def piece_from_symbol(symbol, game_type="chess"):
+    """Создаёт фигуру по её символу на доске (как в Board.display) среди фигур вариантов game_type."""
+    for piece_type, args in game_type_pieces(game_type):
+        for color in ["white", "black"]:
+            piece = piece_type(color, *args)
+            if piece.symbol == symbol:
+                return piece
+    raise ValueError(f"Неизвестный символ {'шашки' if game_type == 'checkers' else 'фигуры'}: {symbol}")
+
+def setup_chess(board):
+    """Начальная расстановка шахмат."""
+    piece_order = [Rook, Knight, Bishop, Queen, King, Bishop, Knight, Rook]
+    for i, piece_type in enumerate(piece_order):
+        board.set_piece(7, i, piece_type("white"))
+        board.set_piece(0, i, piece_type("black"))
+    for i in range(8):
+        board.set_piece(6, i, Pawn("white"))
+        board.set_piece(1, i, Pawn("black"))
+
+def setup_modified_chess(board):
+    """Начальная расстановка шахмат с новыми фигурами: Копейщик, Ассасин и Крепость вместо трёх пешек."""
+    setup_chess(board)
+    pawn_replace = {1: Lancer, 4: Assassin, 6: Fortress}
+    for i, piece_type in pawn_replace.items():
+        board.set_piece(6, i, piece_type("white"))
+        board.set_piece(1, i, piece_type("black"))
+
+def setup_checkers(board):
+    """Начальная расстановка шашек."""
+    for row in [0, 1, 2]:
+        for col in range(8):
+            if (row + col) % 2 != 0: board.set_piece(row, col, Checker("black"))
+    for row in [5, 6, 7]:
+        for col in range(8):
+            if (row + col) % 2 != 0: board.set_piece(row, col, Checker("white"))
+
+# Встроенные варианты. Фигуры и расстановки определены выше и ссылаются прямо, правила шашек -
+# ссылкой: модуль checkers загружается, только когда играют в шашки
+CHESS_PIECES = [(Pawn, ()), (Rook, ()), (Knight, ()), (Bishop, ()), (Queen, ()), (King, ())]
+register(Variant("chess", "chess", setup=setup_chess, pieces=CHESS_PIECES))
+register(Variant("modified_chess", "chess", True, setup=setup_modified_chess,
+                 pieces=CHESS_PIECES + [(Lancer, ()), (Assassin, ()), (Fortress, ())]))
+register(Variant("checkers", "checkers", setup=setup_checkers, pieces=[(Checker, (False,)), (Checker, (True,))],
+                 rules="checkers:CheckersRules"))
+
+class AttackMap:
+    """Карта атак обоих цветов: для каждой клетки - фигуры, которые могут на неё пойти.
+
+    Доска сообщает карте об изменённых клетках, а карта пересчитывает только фигуры,
+    стоящие на них или зависящие от них (см. Piece.watched_squares).
+    """
+    def __init__(self, board):
+        """Инициализация пустой карты атак."""
+        self.board = board
+        self.dirty = set()
+        self.targets = {}
+        self.watched = {}
+        self.watchers = {square: set() for square in ALL_SQUARES}
+        self.attackers = {"white": {}, "black": {}}
+
+    def touch(self, row, col):
+        """Отмечает клетку как изменённую."""
+        self.dirty.add((row, col))
+
+    def refresh(self):
+        """Пересчитывает ходы фигур, затронутых изменёнными клетками."""
+        if not self.dirty:
+            return
+        affected = set(self.dirty)
+        for square in self.dirty:
+            affected |= self.watchers[square]
+        self.dirty.clear()
+        for square in affected:
+            self._forget(square)
+        for square in affected:
+            self._learn(square)
+
+    def _forget(self, square):
+        """Убирает вклад фигуры, стоявшей на клетке при прошлом пересчёте."""
+        targets = self.targets.pop(square, None)
+        if targets is None:
+            return
+        color, moves = targets
+        attackers = self.attackers[color]
+        for target in moves:
+            # Ходы Крепости могут повторять одну клетку дважды
+            squares = attackers.get(target)
+            if squares is not None:
+                squares.discard(square)
+                if not squares:
+                    del attackers[target]
+        for watched in self.watched.pop(square):
+            self.watchers[watched].discard(square)
+
+    def _learn(self, square):
+        """Добавляет вклад фигуры, стоящей на клетке сейчас."""
+        row, col = square
+        piece = self.board.board[row][col]
+        if not piece:
+            return
+        moves = self.board.get_moves(row, col)
+        attackers = self.attackers[piece.color]
+        for target in moves:
+            attackers.setdefault(target, set()).add(square)
+        self.targets[square] = (piece.color, moves)
+        watched = piece.watched_squares(self.board, row, col)
+        for watched_square in watched:
+            self.watchers[watched_square].add(square)
+        self.watched[square] = watched
+
+    def attackers_of(self, row, col, color):
+        """Возвращает клетки фигур цвета color, которые могут пойти на клетку."""
+        self.refresh()
+        return self.attackers[color].get((row, col), set())
+
+    def threatened_pieces(self, color):
+        """Возвращает клетки фигур цвета color (кроме короля), находящихся под боем."""
+        self.refresh()
+        opponent_attackers = self.attackers["black" if color == "white" else "white"]
+        board = self.board
+        return [square for square in mask_squares(board.piece_masks[color] & ~board.king_masks[color]) if square in opponent_attackers]
+
+    def is_king_in_check(self, color):
+        """Проверяет, атакован ли король цвета color."""
+        king_square = self.board.king_square(color)
+        if king_square is None:
+            return False
+        self.refresh()
+        return king_square in self.attackers["black" if color == "white" else "white"]
 
 class Board:
     """Представляет шахматную/шашечную доску."""
-    def __init__(self, game_type="chess", modified_chess=False):
-        """Инициализация доски."""
+    def __init__(self, game_type="chess", modified_chess=False, move_cache=default_cache):
+        """Инициализация доски. move_cache=None отключает кэширование ходов."""
         self.board = [[None for _ in range(8)] for _ in range(8)]
         self.game_type = game_type
         self.modified_chess = modified_chess
+        self.move_cache = move_cache
+        self.zobrist_hash = variant_key(game_type, modified_chess)
+        self._current_player = "white"
+        # Карта атак создаётся при первом запросе: доскам, которые только хранят позицию, она не нужна
+        self._attack_map = None
+        # Записи ходов, сделанных make_move, переиспользуются: move_stack[:ply] - сделанные ходы
+        self.move_stack = []
+        self.ply = 0
+        # Индекс фигур - битовые маски (бит row * 8 + col): фигуры и короли каждого цвета, пустые клетки
+        self.piece_masks = {"white": 0, "black": 0}
+        self.king_masks = {"white": 0, "black": 0}
+        self.empty_mask = FULL_MASK
         self.setup_board()
 
+    @property
+    def attack_map(self):
+        """Карта атак доски (см. AttackMap)."""
+        if self._attack_map is None:
+            self._attack_map = AttackMap(self)
+            for row, col in mask_squares(~self.empty_mask & FULL_MASK):
+                self._attack_map.touch(row, col)
+        return self._attack_map
+
+    def pieces_of(self, color):
+        """Возвращает клетки фигур цвета color в порядке обхода доски."""
+        return mask_squares(self.piece_masks[color])
+
+    def king_square(self, color):
+        """Возвращает клетку короля цвета color или None. Если королей несколько - первого в порядке обхода доски."""
+        kings = self.king_masks[color]
+        if not kings:
+            return None
+        square = (kings & -kings).bit_length() - 1
+        return square >> 3, square & 7
+
+    def empty_squares(self):
+        """Возвращает пустые клетки в порядке обхода доски."""
+        return mask_squares(self.empty_mask)
+
+    def is_empty(self, row, col):
+        """Проверяет, пуста ли клетка."""
+        return self.empty_mask >> (row * 8 + col) & 1 == 1
+
+    @property
+    def current_player(self):
+        """Цвет игрока, который сейчас ходит."""
+        return self._current_player
+
+    @current_player.setter
+    def current_player(self, color):
+        """Меняет очередь хода, обновляя хеш позиции."""
+        if color != self._current_player:
+            self.zobrist_hash ^= SIDE_KEY
+        self._current_player = color
+
     def setup_board(self):
-        """Расстановка фигур."""
-        if self.game_type == "chess":
-            piece_order = [Rook, Knight, Bishop, Queen, King, Bishop, Knight, Rook]
-            for i, piece_type in enumerate(piece_order):
-                self.board[7][i] = piece_type("white")
-                self.board[0][i] = piece_type("black")
-
-            if self.modified_chess:
-                pawn_replace = {1: Lancer, 4: Assassin, 6: Fortress}
-                for i in range(8):
-                    piece_type = pawn_replace.get(i, Pawn)
-                    self.board[6][i] = piece_type("white")
-                    self.board[1][i] = piece_type("black")
-            else:
-                for i in range(8):
-                    self.board[6][i] = Pawn("white")
-                    self.board[1][i] = Pawn("black")
-
-        elif self.game_type == "checkers":
-            for row in [0, 1, 2]:
-                for col in range(8):
-                    if (row + col) % 2 != 0: self.board[row][col] = Checker("black")
-            for row in [5, 6, 7]:
-                for col in range(8):
-                    if (row + col) % 2 != 0: self.board[row][col] = Checker("white")
-
-    def display(self, move_count, possible_moves=None, capture_moves=None, threatened_pieces=None, king_in_check=False):
-        """Отображает доску в консоли."""
-        print(f"Текущий ход: {move_count}")
-        print("  a b c d e f g h")
-        for row in range(8):
-            print(8 - row, end=" ")
-            for col in range(8):
-                piece = self.board[row][col]
-                if king_in_check and isinstance(piece, King) and piece.color == self.current_player: print("# ", end="")
-                elif threatened_pieces and (row, col) in threatened_pieces: print("? ", end="")
-                elif possible_moves and (row, col) in possible_moves: print("* ", end="")
-                elif capture_moves and (row, col) in capture_moves: print("! ", end="")
-                elif not piece: print(". ", end="")
-                else: print(piece, end=" ")
-            print(8 - row)
-        print("  a b c d e f g h")
+        """Расстановка фигур варианта доски (см. variants.py)."""
+        variant_of(self.game_type, self.modified_chess).setup(self)
+
+    def clear(self):
+        """Убирает все фигуры с доски."""
+        for row, col in mask_squares(~self.empty_mask & FULL_MASK):
+            self.set_piece(row, col, None)
+
+    def load_diagram(self, text, current_player="white"):
+        """Расставляет позицию из текстовой диаграммы в формате Board.display.
+
+        Строки заголовка и номера горизонталей по краям допускаются и пропускаются.
+        """
+        rows = []
+        for line in text.strip().splitlines():
+            tokens = line.split()
+            if len(tokens) == 10 and tokens[0].isdigit() and tokens[-1].isdigit():
+                tokens = tokens[1:9]
+            if len(tokens) == 8 and tokens != list("abcdefgh"):
+                rows.append(tokens)
+        if len(rows) != 8:
+            raise ValueError(f"Ожидалось 8 строк доски, найдено {len(rows)}")
+        self.clear()
+        for row, tokens in enumerate(rows):
+            for col, symbol in enumerate(tokens):
+                if symbol != ".":
+                    self.set_piece(row, col, piece_from_symbol(symbol, self.game_type))
+        self.current_player = current_player
+
+    def to_diagram(self):
+        """Возвращает позицию текстовой диаграммой: 8 строк символов фигур, "." - пустая клетка (читается load_diagram)."""
+        return "\n".join(" ".join(str(piece) if piece else "." for piece in row) for row in self.board)
+
+    def to_bytes(self, move_count=1):
+        """Двоичная запись позиции фиксированного размера (см. position.py)."""
+        from position import pack_board
+        return pack_board(self, move_count)
+
+    @classmethod
+    def from_bytes(cls, data, move_cache=default_cache):
+        """Доска из двоичной записи позиции (номер хода из записи отбрасывается)."""
+        from position import unpack_board
+        return unpack_board(data, move_cache=move_cache, board_type=cls)[0]
+
+    def to_text(self, move_count=1):
+        """Текстовая запись позиции, похожая на FEN (см. position.py)."""
+        from position import board_to_text
+        return board_to_text(self, move_count)
+
+    @classmethod
+    def from_text(cls, text, move_cache=default_cache):
+        """Доска из текстовой записи позиции (номер хода отбрасывается)."""
+        from position import board_from_text
+        return board_from_text(text, move_cache=move_cache, board_type=cls)[0]
+
+    def set_piece(self, row, col, piece):
+        """Ставит фигуру (или None) на клетку. Все изменения доски проходят через этот метод."""
+        old_piece = self.board[row][col]
+        square = row * 8 + col
+        bit = 1 << square
+        if old_piece:
+            self.zobrist_hash ^= old_piece.zobrist_keys[square]
+            self.piece_masks[old_piece.color] &= ~bit
+            if isinstance(old_piece, King):
+                self.king_masks[old_piece.color] &= ~bit
+            self.empty_mask |= bit
+        if piece:
+            self.zobrist_hash ^= piece.zobrist_keys[square]
+            self.piece_masks[piece.color] |= bit
+            if isinstance(piece, King):
+                self.king_masks[piece.color] |= bit
+            self.empty_mask &= ~bit
+        self.board[row][col] = piece
+        if self._attack_map is not None:
+            self._attack_map.touch(row, col)
+
+    def compute_hash(self):
+        """Вычисляет хеш позиции заново (инкрементальный хеш хранится в zobrist_hash)."""
+        zobrist_hash = variant_key(self.game_type, self.modified_chess) ^ (SIDE_KEY if self._current_player == "black" else 0)
+        for row, col in ALL_SQUARES:
+            piece = self.board[row][col]
+            if piece:
+                zobrist_hash ^= piece_keys(piece.hash_kind())[row * 8 + col]
+        return zobrist_hash
+
+    def get_moves(self, row, col):
+        """Возвращает возможные ходы фигуры на клетке (через кэш). Возвращённый список нельзя изменять."""
+        cache = self.move_cache
+        if cache is None:
+            return self.generate_moves(row, col)
+        key = (self.zobrist_hash, row * 8 + col)
+        moves = cache.get(key)
+        if moves is None:
+            moves = self.generate_moves(row, col)
+            cache.put(key, moves)
+        return moves
+
+    def get_capture_moves(self, row, col):
+        """Возвращает ходы взятия шашки на клетке (через кэш). Возвращённый список нельзя изменять."""
+        cache = self.move_cache
+        if cache is None:
+            return self.generate_capture_moves(row, col)
+        key = (self.zobrist_hash, 64 + row * 8 + col)
+        moves = cache.get(key)
+        if moves is None:
+            moves = self.generate_capture_moves(row, col)
+            cache.put(key, moves)
+        return moves
+
+    def pseudo_moves(self, color):
+        """Возвращает возможные ходы всех фигур цвета color: {клетка фигуры: список клеток без повторов}."""
+        # Повторы клеток в списке ходов (шаг Крепости на пустую клетку) - один ход
+        return {(row, col): list(dict.fromkeys(self.get_moves(row, col))) for row, col in self.pieces_of(color)}
+
+    def generate_moves(self, row, col):
+        """Генерирует возможные ходы фигуры на клетке. Подклассы доски могут ускорять генерацию."""
+        piece = self.board[row][col]
+        return piece.possible_moves(self, row, col) if piece else []
+
+    def generate_capture_moves(self, row, col):
+        """Генерирует ходы взятия шашки на клетке."""
+        piece = self.board[row][col]
+        return piece.find_capture_moves(self, row, col) if isinstance(piece, Checker) else []
+
+    def cached_query(self, name, compute):
+        """Возвращает результат запроса о текущей позиции (угрозы, шах), вычисляя его при промахе кэша."""
+        if self.move_cache is None:
+            return compute()
+        key = (self.zobrist_hash, name)
+        result = self.move_cache.get(key)
+        if result is None:
+            result = compute()
+            self.move_cache.put(key, result)
+        return result
+
+    def display(self, move_count, possible_moves=None, capture_moves=None, threatened_pieces=None, king_in_check=False, renderer=None):
+        """Отображает доску в консоли. renderer=None - общий вывод render.default_renderer()."""
+        if renderer is None:
+            from render import default_renderer
+            renderer = default_renderer()
+        renderer.render(self, move_count, possible_moves, capture_moves, threatened_pieces, king_in_check)
 
     def move_piece(self, start_row, start_col, end_row, end_col, jumped_piece_row=None, jumped_piece_col=None):
         """Перемещает фигуру с начальной позиции на конечную."""
         piece = self.board[start_row][start_col]
         captured_piece = self.board[end_row][end_col]
 
-        self.board[end_row][end_col] = piece
-        self.board[start_row][start_col] = None
+        self.set_piece(end_row, end_col, piece)
+        self.set_piece(start_row, start_col, None)
 
         if jumped_piece_row is not None and jumped_piece_col is not None:
-            self.board[jumped_piece_row][jumped_piece_col] = None
+            self.set_piece(jumped_piece_row, jumped_piece_col, None)
 
         return captured_piece
 
     def undo_move(self, move):
-        """Отменяет ход."""
-        self.board[move.start_row][move.start_col] = move.piece
-        self.board[move.end_row][move.end_col] = move.captured_piece
-
-        if move.jumped_piece_row and move.jumped_piece_col and self.game_type == "checkers":
-            color = "black" if self.current_player == "white" else "white"
-            self.board[move.jumped_piece_row][move.jumped_piece_col] = Checker(color)
-
-        if move.became_queen:
-            color = "black" if self.current_player == "white" else "white"
-            self.board[move.start_row][move.start_col] = Checker(color)
-            self.board[move.end_row][move.end_col] = None
+        """Отменяет ход, описанный записью Move. Очередь хода не меняется."""
+        piece = move.piece
+        if move.became_queen and piece.is_queen:
+            # Запись хранит уже превращённую шашку: возвращаем простую
+            piece = Checker(piece.color)
+        self.set_piece(move.start_row, move.start_col, piece)
+        self.set_piece(move.end_row, move.end_col, move.captured_piece)
+
+        if move.jumped_piece_row is not None and move.jumped_piece_col is not None:
+            jumped_piece = move.jumped_piece or Checker("black" if piece.color == "white" else "white")
+            self.set_piece(move.jumped_piece_row, move.jumped_piece_col, jumped_piece)
+        for row, col, captured in move.captured_chain:
+            self.set_piece(row, col, captured)
+
+    def make_move(self, start_row, start_col, end_row, end_col, jumped_piece_row=None, jumped_piece_col=None, captured=()):
+        """Делает ход без проверки допустимости и передаёт очередь хода сопернику.
+
+        captured - клетки шашек, снимаемых цепочкой взятий (см. checkers.py). Шашка, дошедшая
+        до последней горизонтали, становится дамкой. Возвращает запись хода из пула доски:
+        она действительна до отмены хода через unmake_move, потом переиспользуется.
+        """
+        if self.ply == len(self.move_stack):
+            self.move_stack.append(Move(0, 0, 0, 0, None, None))
+        move = self.move_stack[self.ply]
+        self.ply += 1
+
+        board = self.board
+        piece = board[start_row][start_col]
+        move.start_row, move.start_col, move.end_row, move.end_col = start_row, start_col, end_row, end_col
+        move.piece = piece
+        move.captured_piece = board[end_row][end_col]
+        move.jumped_piece_row, move.jumped_piece_col = jumped_piece_row, jumped_piece_col
+        move.jumped_piece = board[jumped_piece_row][jumped_piece_col] if jumped_piece_row is not None else None
+        move.became_queen = isinstance(piece, Checker) and not piece.is_queen and (end_row == 0 or end_row == 7)
+        move.captured_chain = tuple((row, col, board[row][col]) for row, col in captured) if captured else ()
+
+        self.set_piece(start_row, start_col, None)
+        self.set_piece(end_row, end_col, Checker(piece.color, True) if move.became_queen else piece)
+        if move.jumped_piece is not None:
+            self.set_piece(jumped_piece_row, jumped_piece_col, None)
+        for row, col in captured:
+            self.set_piece(row, col, None)
+        self.current_player = "black" if self._current_player == "white" else "white"
+        return move
+
+    def forget_moves(self):
+        """Делает ходы, сделанные make_move, необратимыми: позиция остаётся, записи пула снова свободны."""
+        self.ply = 0
+
+    def unmake_move(self):
+        """Отменяет последний ход, сделанный make_move, восстанавливая позицию в точности."""
+        self.ply -= 1
+        move = self.move_stack[self.ply]
+        self.current_player = move.piece.color
+        for row, col, captured in move.captured_chain:
+            self.set_piece(row, col, captured)
+        if move.jumped_piece is not None:
+            self.set_piece(move.jumped_piece_row, move.jumped_piece_col, move.jumped_piece)
+        self.set_piece(move.end_row, move.end_col, move.captured_piece)
+        self.set_piece(move.start_row, move.start_col, move.piece)
+        return move
 
 class Game:
     """Управляет игровым процессом."""
-    def __init__(self, game_type="chess", modified_chess=False):
-        """Инициализация игры."""
-        self.board = Board(game_type, modified_chess)
-        self.current_player = "white"
+    def __init__(self, game_type="chess", modified_chess=False, engine="mailbox", move_cache=default_cache, flying_kings=False, hint_time=1.0, journal=None,
+                 endgame=None):
+        """Инициализация игры. engine="bitboard" включает доску на битбордах, move_cache=None отключает кэш ходов,
+        flying_kings=True включает дальнобойных дамок в шашках, hint_time - время на подсказку хода, с,
+        journal - файл журнала ходов для продолжения прерванной партии (Game.resume),
+        endgame - эндшпильная база шашек: путь к файлу или endgame.EndgameDatabase."""
+        if engine == "bitboard":
+            from bitboard import BitboardBoard
+            self.board = BitboardBoard(game_type, modified_chess, move_cache)
+        else:
+            self.board = Board(game_type, modified_chess, move_cache)
         self.move_count = 1
         self.game_type = game_type
         self.modified_chess = modified_chess
-        self.move_history = []
+        from history import MoveHistory, MoveJournal
+        self.move_history = MoveHistory(self.board, journal=MoveJournal(journal) if journal else None)
+        # Правила ходов стороны варианта (шашки - checkers.CheckersRules), у шахмат - None
+        self.checkers_rules = variant_of(game_type, modified_chess).rules(flying_kings)
+        if hint_time is not None and not hint_time > 0:
+            raise ValueError(f"Время подсказки должно быть положительным: {hint_time}")
+        self.hint_time = hint_time
+        if isinstance(endgame, str):
+            from endgame import EndgameDatabase
+            endgame = EndgameDatabase(endgame)
+        if endgame is not None and endgame.flying_kings != flying_kings:
+            raise ValueError("Эндшпильная база построена для других правил дамок.")
+        self.endgame = endgame
+        # Движок подсказок создаётся при первой подсказке и хранит свои таблицы между ними
+        self.search_engine = None
+
+    @property
+    def current_player(self):
+        """Цвет игрока, который сейчас ходит (хранится в доске, так как входит в хеш позиции)."""
+        return self.board.current_player
+
+    @current_player.setter
+    def current_player(self, color):
+        """Меняет очередь хода."""
+        self.board.current_player = color
+
+    def to_bytes(self):
+        """Двоичная запись позиции и номера хода партии (см. position.py)."""
+        from position import pack_game
+        return pack_game(self)
+
+    @classmethod
+    def from_bytes(cls, data, **options):
+        """Партия с позицией из двоичной записи. options - остальные аргументы Game (engine, move_cache, ...)."""
+        from position import unpack_game
+        return unpack_game(data, **options)
+
+    def to_text(self):
+        """Текстовая запись позиции и номера хода партии."""
+        from position import game_to_text
+        return game_to_text(self)
+
+    @classmethod
+    def from_text(cls, text, **options):
+        """Партия с позицией из текстовой записи. options - остальные аргументы Game."""
+        from position import game_from_text
+        return game_from_text(text, **options)
+
+    @classmethod
+    def resume(cls, journal, **options):
+        """Продолжает прерванную партию по журналу ходов с последнего хода. options - остальные аргументы Game."""
+        from history import resume_game
+        return resume_game(journal, **options)
 
     def get_coordinates(self, position):
         """Преобразует шахматную нотацию (a2) в координаты доски (строка, столбец)."""
-        if len(position) != 2 or not (0 <= (col := ord(position[0]) - ord("a")) < 8 and 0 <= (row := 8 - int(position[1])) < 8):
+        # Только латинские буквы и цифры ASCII: isdigit принял бы и "²", на котором int падает
+        if len(position) != 2 or position[0] not in "abcdefgh" or position[1] not in "12345678":
+            return None
+        return 8 - int(position[1]), ord(position[0]) - ord("a")
+
+    def selection_error(self, row, col):
+        """Проверяет, может ли текущий игрок ходить фигурой с клетки. Возвращает причину отказа или None."""
+        piece = self.board.board[row][col]
+        if not piece:
+            return "На этой позиции нет фигуры."
+        if piece.color != self.current_player:
+            return "Это не ваша фигура."
+        if self.checkers_rules is not None:
+            side_moves = self.checkers_rules.side_moves(self.board)
+            # Ходы стороны - либо только взятия, либо только тихие ходы
+            if side_moves and side_moves[0][4] and not any(move[0] == row and move[1] == col for move in side_moves):
+                return CAPTURE_REQUIRED_ERROR
+        return None
+
+    def legal_moves(self):
+        """Допустимые ходы текущего игрока в шахматах: ходы, после которых его король не под боем (см. legal.py)."""
+        from legal import legal_moves
+        return legal_moves(self.board)
+
+    def piece_moves(self, row, col):
+        """Возвращает ходы и взятия фигуры на клетке (взятия бывают только у шашек)."""
+        if self.checkers_rules is not None:
+            moves = self.checkers_rules.piece_moves(self.board, row, col)
+            return [(move[2], move[3]) for move in moves if not move[4]], [(move[2], move[3]) for move in moves if move[4]]
+        return self.legal_moves().piece_moves(row, col), []
+
+    def side_moves(self):
+        """Ходы текущего игрока: кортежи (строка, столбец, конечная строка, конечный столбец, промежуточные клетки цепочки)."""
+        if self.checkers_rules is not None:
+            return [(move[0], move[1], move[2], move[3], move[5][:-1]) for move in self.checkers_rules.side_moves(self.board)]
+        return [(row, col, end_row, end_col, ()) for (row, col), targets in self.legal_moves().moves.items()
+                for end_row, end_col in targets]
+
+    def result(self):
+        """Итог партии в шахматы для текущего игрока: "мат", "пат" или None, пока партия продолжается."""
+        if self.checkers_rules is not None:
+            return None
+        legal_moves = self.legal_moves()
+        if legal_moves.checkmate:
+            return "мат"
+        if legal_moves.stalemate:
+            return "пат"
+        return None
+
+    def result_message(self):
+        """Сообщение об окончании партии или None, пока партия продолжается."""
+        result = self.result()
+        if result == "мат":
+            return CHECKMATE_MESSAGE.format(winner="black" if self.current_player == "white" else "white")
+        if result == "пат":
+            return STALEMATE_MESSAGE
+        return None
+
+    def select_piece(self, position):
+        """Первый шаг хода: выбор фигуры в шахматной нотации (a2).
+
+        Возвращает (клетка, ходы, взятия, причина отказа или None) - то, что play подсвечивает на доске.
+        """
+        start_coordinates = self.get_coordinates(position)
+        if not start_coordinates:
+            return None, [], [], POSITION_FORMAT_ERROR
+        error = self.selection_error(*start_coordinates)
+        if error:
+            return start_coordinates, [], [], error
+        possible_moves, capture_moves = self.piece_moves(*start_coordinates)
+        if not possible_moves and not capture_moves and self.game_type == "chess":
+            return start_coordinates, possible_moves, capture_moves, NO_MOVES_ERROR
+        return start_coordinates, possible_moves, capture_moves, None
+
+    def move_selected(self, start_coordinates, end_position):
+        """Второй шаг хода: ход выбранной фигурой на клетку в шахматной нотации. Возвращает причину отказа или None."""
+        end_coordinates = self.get_coordinates(end_position)
+        if not end_coordinates:
+            return POSITION_FORMAT_ERROR
+        if not self.apply_move(*start_coordinates, *end_coordinates):
+            return INVALID_MOVE_ERROR
+        return None
+
+    def apply_move(self, start_row, start_col, end_row, end_col, path=None):
+        """Делает ход фигурой текущего игрока, если он допустим. Возвращает запись хода (действительна до
+        следующего хода) или None.
+
+        path - промежуточные клетки цепочки взятий; если он не задан и к целевой клетке ведут
+        несколько цепочек, выбирается цепочка с наибольшим числом взятий. Заданная цепочка
+        допустима, если снимает те же шашки, что и одна из цепочек к целевой клетке, в любом порядке.
+        """
+        captured = ()
+        if self.checkers_rules is not None:
+            candidates = [move for move in self.checkers_rules.piece_moves(self.board, start_row, start_col)
+                          if move[2] == end_row and move[3] == end_col]
+            if not candidates:
+                return None
+            if path is None:
+                captured = max(candidates, key=lambda move: len(move[4]))[4]
+            else:
+                captured = self.checkers_rules.chain_captures(self.board, start_row, start_col, [*path, (end_row, end_col)])
+                if captured is None or not any(set(move[4]) == set(captured) for move in candidates):
+                    return None
+        elif (end_row, end_col) not in self.legal_moves().piece_moves(start_row, start_col):
+            return None
+
+        # make_move сам превращает шашку в дамку и передаёт ход сопернику
+        move = self.board.make_move(start_row, start_col, end_row, end_col, captured=captured)
+        # Отмена идёт через историю партии, поэтому пул записей ходов доски не растёт с длиной партии
+        self.board.forget_moves()
+        self.move_count += 1
+        self.move_history.record(start_row, start_col, end_row, end_col, captured, self.move_count)
+        return move
+
+    def try_move(self, start_position, end_position, via=()):
+        """Проверяет и делает ход в шахматной нотации (a2, a4) без ввода с клавиатуры.
+
+        via - промежуточные клетки цепочки взятий шашки (c3, e5, g7: via=["e5"]).
+        Возвращает None, если ход сделан, иначе причину отказа - то же сообщение, что видит игрок в play.
+        """
+        start_coordinates = self.get_coordinates(start_position)
+        end_coordinates = self.get_coordinates(end_position)
+        path = [self.get_coordinates(position) for position in via]
+        if not start_coordinates or not end_coordinates or not all(path):
+            return POSITION_FORMAT_ERROR
+        error = self.selection_error(*start_coordinates)
+        if error:
+            return error
+        if not self.apply_move(*start_coordinates, *end_coordinates, path or None):
+            return INVALID_MOVE_ERROR
+        return None
+
+    def run_command(self, text):
+        """Выполняет команду игрока: 'отмена', 'отмена N' или 'подсказка'.
+
+        Возвращает сообщение для игрока или None, если текст - не команда.
+        """
+        if text == "отмена":
+            return self.undo(1)
+        if text.startswith("отмена "):
+            try:
+                number_moves = int(text[7:])
+            except ValueError:
+                return UNDO_FORMAT_ERROR
+            return self.undo(number_moves)
+        if text == "подсказка":
+            result = self.hint()
+            return f"Подсказка: {result.describe()}" if result.move else "Ходов нет."
+        return None
+
+    def threat_status(self):
+        """Фигуры текущего игрока под боем и шах королю: (клетки, шах)."""
+        return self.find_threatened_pieces(), self.is_king_in_check()
+
+    def endgame_value(self):
+        """Значение позиции шашек из эндшпильной базы: (endgame.WIN, DRAW или LOSS, полуходов) или None."""
+        if self.endgame is None:
             return None
-        return row, col
+        return self.endgame.probe(self.board)
+
+    def hint(self, time_limit=None):
+        """Ищет лучший ход для текущего игрока за time_limit секунд (по умолчанию hint_time). Возвращает engine.SearchResult."""
+        if self.search_engine is None:
+            from engine import Engine
+            self.search_engine = Engine(endgame=self.endgame)
+        return self.search_engine.search(self.board, self.checkers_rules, self.hint_time if time_limit is None else time_limit)
 
     def play(self):
         """Основной игровой цикл."""
         while True:
-            threatened_pieces = self.find_threatened_pieces()
-            king_in_check = self.is_king_in_check()
+            threatened_pieces, king_in_check = self.threat_status()
 
             self.board.display(self.move_count, possible_moves=None, capture_moves=None, threatened_pieces=threatened_pieces, king_in_check=king_in_check)
+            result_message = self.result_message()
+            if result_message:
+                print(result_message)
+                break
+            endgame_value = self.endgame_value()
+            if endgame_value:
+                from endgame import describe
+                print(f"База эндшпиля: {describe(*endgame_value)}.")
             print(f"Ход {self.move_count}. Ход {self.current_player}.")
-            print("Введите 'отмена' для отмены хода или 'отмена N' для отмены N ходов.  Введите координаты фигуры (например, a2).")
+            print("Введите 'отмена' для отмены хода или 'отмена N' для отмены N ходов, 'подсказка' - для подсказки хода.  Введите координаты фигуры (например, a2).")
 
             # 1. Выбор фигуры
             while True:
                 start_position = input("Выберите фигуру для хода: ")
 
-                if start_position == "отмена":
-                    self.undo_last_move()
-                    break
-                elif start_position.startswith("отмена "):
-                    try:
-                        number_moves = int(start_position[7:])
-                        self.undo_moves(number_moves)
+                history_length = len(self.move_history)
+                message = self.run_command(start_position)
+                if message is not None:
+                    print(message)
+                    if len(self.move_history) != history_length:
                         break
-                    except ValueError:
-                        print("Неверный формат команды 'отмена'. Используйте 'отмена N', где N - целое число.")
-                        continue
-
-                start_coordinates = self.get_coordinates(start_position)
-                if not start_coordinates:
-                    print("Неверный формат позиции.  Пример: a2")
                     continue
 
-                start_row, start_col = start_coordinates
-                piece = self.board.board[start_row][start_col]
-                if not piece:
-                    print("На этой позиции нет фигуры.")
-                    continue
-                if piece.color != self.current_player:
-                    print("Это не ваша фигура.")
+                start_coordinates, possible_moves, capture_moves, error = self.select_piece(start_position)
+                if error:
+                    print(error)
                     continue
 
                 # 2. Подсказка и отображение
-                possible_moves = piece.possible_moves(self.board, start_row, start_col)
-                capture_moves = piece.find_capture_moves(self.board, start_row, start_col) if self.game_type == "checkers" and isinstance(piece, Checker) else []
-
-                if not possible_moves and not capture_moves and self.game_type == "chess":
-                    print("У этой фигуры нет доступных ходов. Выберите другую фигуру.")
-                    continue
-
                 self.board.display(self.move_count, possible_moves, capture_moves, threatened_pieces, king_in_check)
                 break
 
-            if start_position == "отмена" or start_position.startswith("отмена "):
+            if message is not None:
                 continue
 
             # 3. Ввод целевой позиции
             while True:
-                end_position = input("Введите целевую позицию: ")
-                end_coordinates = self.get_coordinates(end_position)
-
-                if not end_coordinates:
-                    print("Неверный формат позиции.  Пример: a2")
-                    continue
-
-                end_row, end_col = end_coordinates
-                jumped_piece_row = None
-                jumped_piece_col = None
-                captured_piece = None
-                became_queen = False
-
-
-                if self.game_type == "checkers" and isinstance(piece, Checker) and (end_row, end_col) in capture_moves:
-                    jumped_piece_row = (start_row + end_row) // 2
-                    jumped_piece_col = (start_col + end_col) // 2
-                    captured_piece = self.board.board[jumped_piece_row][jumped_piece_col]
-
-                elif self.board.board[end_row][end_col] and self.board.board[end_row][end_col].color != piece.color:
-                  captured_piece = self.board.board[end_row][end_col]
-
-
-                is_valid_move = (self.game_type == "checkers" and isinstance(piece, Checker) and (end_row, end_col) in capture_moves) or ((end_row, end_col) in possible_moves or (end_row, end_col) in capture_moves)
-
-                if is_valid_move:
-                    if self.game_type == "checkers" and isinstance(piece, Checker) and not piece.is_queen and (end_row == 0 or end_row == 7):
-                        became_queen = True
-                        piece = Checker(piece.color, True)
-                        self.board.board[start_row][start_col] = None
-                        self.board.board[end_row][end_col] = piece
-
-                    captured_piece = self.board.move_piece(start_row, start_col, end_row, end_col, jumped_piece_row, jumped_piece_col)
-                    move = Move(start_row, start_col, end_row, end_col, piece, captured_piece, jumped_piece_row, jumped_piece_col, became_queen)
-                    self.move_history.append(move)
-                    self.current_player = "black" if self.current_player == "white" else "white"
-                    self.move_count += 1
+                error = self.move_selected(start_coordinates, input("Введите целевую позицию: "))
+                if not error:
                     break
-                else:
-                    print("Недопустимый ход.")
-                    threatened_pieces = self.find_threatened_pieces()
-                    king_in_check = self.is_king_in_check()
+                print(error)
+                if error == INVALID_MOVE_ERROR:
+                    threatened_pieces, king_in_check = self.threat_status()
                     self.board.display(self.move_count, possible_moves, capture_moves, threatened_pieces, king_in_check)
 
     def find_threatened_pieces(self):
         """Находит все фигуры текущего игрока, находящиеся под боем."""
-        threatened_pieces = []
-        opponent_color = "black" if self.current_player == "white" else "white"
-        for opponent_row in range(8):
-            for opponent_col in range(8):
-                opponent_piece = self.board.board[opponent_row][opponent_col]
-                if opponent_piece and opponent_piece.color == opponent_color:
-                    possible_opponent_moves = opponent_piece.possible_moves(self.board, opponent_row, opponent_col)
-                    for row in range(8):
-                        for col in range(8):
-                            piece = self.board.board[row][col]
-                            if piece and piece.color == self.current_player and not isinstance(piece, King) and (row, col) in possible_opponent_moves:
-                                threatened_pieces.append((row, col))
-        return threatened_pieces
+        return self.board.cached_query("threats", lambda: self.board.attack_map.threatened_pieces(self.current_player))
 
     def is_king_in_check(self):
         """Проверяет, находится ли король под шахом."""
-        king_position = next(((row, col) for row in range(8) for col in range(8) if isinstance(self.board.board[row][col], King) and self.board.board[row][col].color == self.current_player), None)
-        if not king_position: return False
-        king_row, king_col = king_position
-        opponent_color = "black" if self.current_player == "white" else "white"
-        return any(isinstance(self.board.board[row][col], Piece) and self.board.board[row][col].color == opponent_color and (king_row, king_col) in self.board.board[row][col].possible_moves(self.board, row, col) for row in range(8) for col in range(8))
+        return self.board.cached_query("check", lambda: self.board.attack_map.is_king_in_check(self.current_player))
+
+    def undo(self, number_moves):
+        """Отменяет до number_moves ходов сразу (позиция восстанавливается от ближайшей контрольной позиции истории).
+
+        Возвращает сообщение для игрока; число ходов меньше 1 - ошибка формата команды.
+        """
+        if number_moves < 1:
+            return UNDO_FORMAT_ERROR
+        undone, self.move_count = self.move_history.undo(number_moves)
+        messages = []
+        if undone:
+            messages.append("Ход отменен." if undone == 1 else f"Отменено ходов: {undone}.")
+        if undone < number_moves:
+            messages.append(EMPTY_HISTORY_MESSAGE)
+        return " ".join(messages)
 
     def undo_last_move(self):
         """Отменяет последний ход."""
-        if self.move_history:
-            move = self.move_history.pop()
-            self.board.undo_move(move)
-            self.current_player = "black" if self.current_player == "white" else "white"
-            self.move_count -= 1
-            print("Ход отменен.")
-        else: print("История ходов пуста.")
+        print(self.undo(1))
 
     def undo_moves(self, number_moves):
         """Отменяет несколько ходов."""
-        for _ in range(number_moves):
-            if self.move_history: self.undo_last_move()
-            else: print("История ходов пуста.")
+        print(self.undo(number_moves))
 
 if __name__ == "__main__":
+    # Запуск "python -m game" быстрее "python game.py": скрипт компилируется при каждом запуске, модуль - из кэша байт-кода
     while True:
-        game_type = input("Выберите игру (chess или checkers): ").lower()
-        if game_type in ["chess", "checkers"]: break
+        variant = input(f"Выберите игру ({', '.join(VARIANTS)}): ").lower()
+        if variant in VARIANTS: break
         else: print("Неверный выбор.")
 
-    modified_chess = False #Изначально ставим False
-    if game_type == "chess":
-        mod_str = input("Играть с новыми фигурами? (y/n): ").lower()
-        modified_chess = mod_str == "y" #Если ввели y, то ставим True, иначе остаётся False.
+    if os.environ.get("GAME_PROFILE"):
+        from profiling import enable_from_environment
+        enable_from_environment()
 
-    game = Game(game_type, modified_chess)
+    game = Game(*VARIANTS[variant])
     game.play()
@@ -0,0 +1,218 @@
+"""История ходов партии в упакованном виде с контрольными позициями и журналом на диске.
+
+Ход хранится одним числом в array("Q"): клетка начала (биты 0-5), клетка конца (6-11), число
+снятых цепочкой шашек (12-15) и смещение их клеток в массиве captures (с 16-го бита); клетка -
+row * 8 + col. Каждые checkpoint_interval ходов запоминается позиция в двоичной записи
+position.py (вместе с номером хода). Отмена N ходов восстанавливает ближайшую контрольную
+позицию не позже нужной и доигрывает от неё меньше checkpoint_interval ходов, поэтому время
+отмены не зависит от N.
+
+Журнал - файл, который только дописывается: после заголовка JOURNAL_HEADER (метка, версия,
+интервал контрольных позиций) идут записи из байта вида и данных:
+    S + позиция   начало истории (позиция до первого хода)
+    P + позиция   контрольная позиция
+    M + ход       ход: число хода (<Q) и клетки снятых шашек по байту на клетку
+    U + длина     отмена ходов: история укорачивается до длины (<I)
+По журналу прерванная партия продолжается с последнего хода (resume_game): история
+собирается из записей без ходов на доске, а позиция - из последней контрольной позиции.
+"""
+import os
+import struct
+from array import array
+
+from game import VARIANTS, Game
+from position import RECORD_SIZE, load_record, pack_board, read_record
+
+CHECKPOINT_INTERVAL = 32
+JOURNAL_MAGIC = b"MJRN"
+JOURNAL_VERSION = 1
+JOURNAL_HEADER = struct.Struct("<4sHH")
+MOVE_WORD = struct.Struct("<Q")
+LENGTH = struct.Struct("<I")
+
+
+def pack_move(start_row, start_col, end_row, end_col, captured_count, captures_offset):
+    """Число хода для array("Q")."""
+    return start_row * 8 + start_col | (end_row * 8 + end_col) << 6 | captured_count << 12 | captures_offset << 16
+
+
+class MoveHistory:
+    """Упакованная история ходов партии, сделанных на доске board."""
+    def __init__(self, board, move_count=1, checkpoint_interval=CHECKPOINT_INTERVAL, journal=None):
+        """Начинает историю с текущей позиции доски (board=None - пустая история для read_journal).
+
+        journal - открытый MoveJournal или None.
+        """
+        self.board = board
+        self.checkpoint_interval = checkpoint_interval
+        self.journal = journal
+        self.moves = array("Q")
+        self.captures = array("B")
+        self.checkpoints = bytearray()
+        if board is not None:
+            self.reset(move_count)
+
+    def reset(self, move_count=1):
+        """Начинает историю заново с текущей позиции доски."""
+        self.moves = array("Q")
+        self.captures = array("B")
+        self.checkpoints = bytearray(pack_board(self.board, move_count))
+        if self.journal is not None:
+            self.journal.write(b"S", self.checkpoints)
+
+    def __len__(self):
+        """Число ходов в истории."""
+        return len(self.moves)
+
+    def __getitem__(self, index):
+        """Ход по номеру: (начальная строка, столбец, конечная строка, столбец, клетки снятых шашек)."""
+        word = self.moves[index]
+        start, end, count, offset = word & 63, word >> 6 & 63, word >> 12 & 15, word >> 16
+        captured = tuple((square >> 3, square & 7) for square in self.captures[offset:offset + count])
+        return start >> 3, start & 7, end >> 3, end & 7, captured
+
+    @property
+    def nbytes(self):
+        """Память под массивы истории, байт."""
+        return self.moves.itemsize * len(self.moves) + len(self.captures) + len(self.checkpoints)
+
+    def record(self, start_row, start_col, end_row, end_col, captured=(), move_count=None):
+        """Записывает ход, уже сделанный на доске. move_count - номер хода после него (для контрольной позиции)."""
+        word = pack_move(start_row, start_col, end_row, end_col, len(captured), len(self.captures))
+        squares = bytes(row * 8 + col for row, col in captured)
+        self._append(word, squares)
+        if self.journal is not None:
+            self.journal.write(b"M", MOVE_WORD.pack(word) + squares)
+        if len(self.moves) % self.checkpoint_interval == 0:
+            checkpoint = pack_board(self.board, move_count if move_count is not None else self._move_count(len(self.moves)))
+            self.checkpoints += checkpoint
+            if self.journal is not None:
+                self.journal.write(b"P", checkpoint)
+
+    def undo(self, count):
+        """Отменяет до count последних ходов на доске. Возвращает (число отменённых ходов, номер хода после отмены)."""
+        count = max(0, min(count, len(self.moves)))
+        if count:
+            self._truncate(len(self.moves) - count)
+            if self.journal is not None:
+                self.journal.write(b"U", LENGTH.pack(len(self.moves)))
+        return count, self.restore()
+
+    def restore(self):
+        """Ставит на доску позицию после последнего хода истории: ближайшая контрольная позиция и ходы после неё.
+
+        Возвращает номер хода.
+        """
+        board = self.board
+        checkpoint = len(self.moves) // self.checkpoint_interval
+        move_count = load_record(board, self.checkpoints, checkpoint * RECORD_SIZE)
+        for index in range(checkpoint * self.checkpoint_interval, len(self.moves)):
+            start_row, start_col, end_row, end_col, captured = self[index]
+            board.make_move(start_row, start_col, end_row, end_col, captured=captured)
+            move_count += 1
+        board.forget_moves()
+        return move_count
+
+    def _move_count(self, length):
+        """Номер хода после length ходов истории."""
+        return read_record(self.checkpoints)[4] + length
+
+    def _append(self, word, squares):
+        """Добавляет ход в массивы."""
+        self.moves.append(word)
+        self.captures.frombytes(squares)
+
+    def _truncate(self, length):
+        """Укорачивает историю до length ходов вместе с контрольными позициями после неё."""
+        if length < len(self.moves):
+            del self.captures[self.moves[length] >> 16:]
+            del self.moves[length:]
+        del self.checkpoints[(length // self.checkpoint_interval + 1) * RECORD_SIZE:]
+
+
+class MoveJournal:
+    """Журнал истории ходов в файле, который только дописывается."""
+    def __init__(self, path, checkpoint_interval=CHECKPOINT_INTERVAL, sync=False, size=None):
+        """Создаёт журнал заново или, если задан size, открывает существующий для дописывания,
+        отбрасывая всё после первых size байт (недописанную запись).
+
+        sync=True сбрасывает каждую запись на диск (os.fsync), иначе - только в ОС.
+        """
+        self.path = path
+        self.sync = sync
+        if size is None:
+            self._file = open(path, "wb")
+            self._file.write(JOURNAL_HEADER.pack(JOURNAL_MAGIC, JOURNAL_VERSION, checkpoint_interval))
+            self._file.flush()
+        else:
+            self._file = open(path, "r+b")
+            self._file.truncate(size)
+            self._file.seek(size)
+
+    def write(self, kind, data):
+        """Дописывает запись вида kind."""
+        self._file.write(kind + data)
+        self._file.flush()
+        if self.sync:
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        """Закрывает файл журнала."""
+        self._file.close()
+
+
+def read_journal(path):
+    """Читает журнал: (история без доски, число байт целых записей). Последняя недописанная запись отбрасывается."""
+    with open(path, "rb") as file:
+        data = file.read()
+    magic, version, checkpoint_interval = JOURNAL_HEADER.unpack(data[:JOURNAL_HEADER.size].ljust(JOURNAL_HEADER.size, b"\0"))
+    if magic != JOURNAL_MAGIC or version != JOURNAL_VERSION or not checkpoint_interval:
+        raise ValueError(f"{path}: не журнал ходов версии {JOURNAL_VERSION}")
+    history = MoveHistory(None, checkpoint_interval=checkpoint_interval)
+    position = complete = JOURNAL_HEADER.size
+    while position < len(data):
+        kind = data[position:position + 1]
+        position += 1
+        if kind in (b"S", b"P"):
+            record = data[position:position + RECORD_SIZE]
+            if len(record) < RECORD_SIZE:
+                break
+            if kind == b"S":
+                history.moves, history.captures, history.checkpoints = array("Q"), array("B"), bytearray()
+            history.checkpoints += record
+            position += RECORD_SIZE
+        elif kind == b"M":
+            if position + MOVE_WORD.size > len(data):
+                break
+            word = MOVE_WORD.unpack_from(data, position)[0]
+            count = word >> 12 & 15
+            squares = data[position + MOVE_WORD.size:position + MOVE_WORD.size + count]
+            if len(squares) < count or not history.checkpoints:
+                break
+            history._append(word & 0xFFFF | len(history.captures) << 16, squares)
+            position += MOVE_WORD.size + count
+        elif kind == b"U":
+            if position + LENGTH.size > len(data):
+                break
+            history._truncate(LENGTH.unpack_from(data, position)[0])
+            position += LENGTH.size
+        else:
+            raise ValueError(f"{path}: неизвестная запись журнала {kind!r} (байт {position - 1})")
+        complete = position
+    if not history.checkpoints:
+        raise ValueError(f"{path}: в журнале нет начальной позиции")
+    return history, complete
+
+
+def resume_game(path, sync=False, **options):
+    """Продолжает партию по журналу с последнего хода; новые ходы дописываются в тот же журнал.
+
+    options - остальные аргументы Game (engine, move_cache, flying_kings, ...).
+    """
+    history, size = read_journal(path)
+    game = Game(*VARIANTS[read_record(history.checkpoints)[0]], **options)
+    history.board = game.board
+    history.journal = MoveJournal(path, history.checkpoint_interval, sync, size)
+    game.move_history = history
+    game.move_count = history.restore()
+    return game
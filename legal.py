@@ -0,0 +1,171 @@
+"""Допустимые ходы: ходы, после которых свой король не остаётся под боем.
+
+Фигуры ходят по описаниям движения (movement.py), и возможные ходы (Board.get_moves) могут
+оставить короля под боем. Здесь ходы фильтруются без пробных ходов: за один проход по
+фигурам соперника для позиции находятся
+    клетки, которые бьёт соперник, если убрать своего короля (куда королю ходить нельзя);
+    шахующие фигуры и клетки между ними и королём (куда можно закрыться);
+    связанные фигуры и линии, по которым им можно ходить.
+Бой берётся из режимов движения: луч в режимах MOVE_OR_CAPTURE и CAPTURE_ONLY бьёт клетки
+до первой фигуры включительно, режимы MOVE_ONLY и DROP ничего не бьют (JUMP_CAPTURE - только
+у шашек, где короля нет). Поэтому
+новые фигуры с описанием движения (модифицированные шахматы) поддерживаются без изменений
+здесь; фигура без описания движения бьёт клетки своих ходов и никого не связывает.
+
+Ход фигуры всегда снимает только фигуру на целевой клетке (взятий на проходе и рокировки
+в игре нет), поэтому других способов открыть короля нет. Позиции без своего короля (шашки,
+король уже взят) ограничений не имеют.
+"""
+from game import FULL_MASK
+from movement import CAPTURE_ONLY, MOVE_OR_CAPTURE
+
+ATTACK_MODES = (MOVE_OR_CAPTURE, CAPTURE_ONLY)
+# (фигура, клетка) -> (лучи боя: кортежи номеров клеток и маски лучей, объединённая маска)
+_attack_rays = {}
+
+
+def attack_rays(piece, square):
+    """Лучи боя фигуры с клетки (номер row * 8 + col): ([(клетки луча, маска луча)], маска всех лучей)."""
+    key = (piece, square)
+    rays = _attack_rays.get(key)
+    if rays is None:
+        ray_list = []
+        reach = 0
+        for mode, component_rays in piece.movement.tables[piece.color][square]:
+            if mode not in ATTACK_MODES:
+                continue
+            for ray in component_rays:
+                squares = tuple(row * 8 + col for row, col in ray)
+                mask = 0
+                for target in squares:
+                    mask |= 1 << target
+                ray_list.append((squares, mask))
+                reach |= mask
+        rays = _attack_rays[key] = (ray_list, reach)
+    return rays
+
+
+def _bits(squares):
+    """Маска клеток (строка, столбец)."""
+    mask = 0
+    for row, col in squares:
+        mask |= 1 << (row * 8 + col)
+    return mask
+
+
+def _index_bits(squares):
+    """Маска клеток по номерам."""
+    mask = 0
+    for square in squares:
+        mask |= 1 << square
+    return mask
+
+
+class LegalMoves:
+    """Допустимые ходы стороны в позиции и её состояние: шах, мат, пат."""
+    __slots__ = ("color", "moves", "checkers", "pinned")
+
+    def __init__(self, color, moves, checkers, pinned):
+        """Инициализация. moves - {клетка фигуры: допустимые клетки}, checkers - клетки шахующих фигур,
+        pinned - {клетка связанной фигуры: маска клеток линии связки}."""
+        self.color = color
+        self.moves = moves
+        self.checkers = checkers
+        self.pinned = pinned
+
+    @property
+    def count(self):
+        """Число допустимых ходов."""
+        return sum(len(moves) for moves in self.moves.values())
+
+    @property
+    def in_check(self):
+        """Король стороны под шахом."""
+        return bool(self.checkers)
+
+    @property
+    def checkmate(self):
+        """Мат: шах и нет допустимых ходов."""
+        return bool(self.checkers) and not any(self.moves.values())
+
+    @property
+    def stalemate(self):
+        """Пат: шаха нет, но и допустимых ходов нет."""
+        return not self.checkers and not any(self.moves.values())
+
+    def piece_moves(self, row, col):
+        """Допустимые ходы фигуры на клетке."""
+        return self.moves.get((row, col), [])
+
+
+def analyse(board):
+    """Допустимые ходы стороны, которая ходит, за один проход по фигурам соперника (без кэша)."""
+    color = board.current_player
+    enemy = "black" if color == "white" else "white"
+    grid = board.board
+    pseudo = board.pseudo_moves(color)
+    king = board.king_square(color)
+    if king is None:
+        return LegalMoves(color, pseudo, [], {})
+
+    king_square = king[0] * 8 + king[1]
+    king_bit = 1 << king_square
+    own_mask = board.piece_masks[color]
+    # Клетки, бой которых нужно знать: сам король и клетки его ходов
+    zone = king_bit | _bits(pseudo[king])
+    occupied = ~board.empty_mask & ~king_bit & FULL_MASK
+    danger = 0
+    checkers = []
+    block = 0
+    pinned = {}
+    for row, col in board.pieces_of(enemy):
+        piece = grid[row][col]
+        square = row * 8 + col
+        if piece.movement is None:
+            targets = _bits(board.get_moves(row, col))
+            danger |= targets
+            if targets & king_bit:
+                checkers.append((row, col))
+                block |= 1 << square
+            continue
+        rays, reach = attack_rays(piece, square)
+        if not reach & zone:
+            continue
+        for squares, mask in rays:
+            if not mask & zone:
+                continue
+            # Клетки луча до первой фигуры включительно (свой король убран - бой "сквозь" него)
+            for target in squares:
+                danger |= 1 << target
+                if occupied >> target & 1:
+                    break
+            if not mask & king_bit:
+                continue
+            between = squares[:squares.index(king_square)]
+            blockers = [target for target in between if occupied >> target & 1]
+            line = _index_bits(between) | 1 << square
+            if not blockers:
+                checkers.append((row, col))
+                block |= line
+            elif len(blockers) == 1 and own_mask >> blockers[0] & 1:
+                # Связанная фигура ходит только по линии связки (двух связок - пересечение линий)
+                pinned_square = blockers[0] >> 3, blockers[0] & 7
+                pinned[pinned_square] = pinned.get(pinned_square, FULL_MASK) & line
+
+    # Без шаха фильтруются только ходы короля и связанных фигур, остальные списки берутся как есть
+    moves = pseudo
+    if len(checkers) > 1:
+        moves = {origin: [] for origin in pseudo}
+    elif checkers:
+        moves = {origin: [target for target in targets if block >> (target[0] * 8 + target[1]) & 1]
+                 for origin, targets in pseudo.items()}
+    for origin, line in pinned.items():
+        moves[origin] = [target for target in moves[origin] if line >> (target[0] * 8 + target[1]) & 1]
+    moves[king] = [target for target in pseudo[king] if not danger >> (target[0] * 8 + target[1]) & 1]
+    return LegalMoves(color, moves, checkers, pinned)
+
+
+def legal_moves(board):
+    """Допустимые ходы стороны, которая ходит (LegalMoves), через кэш ходов доски. Результат изменять нельзя."""
+    return board.cached_query("legal", lambda: analyse(board))
+
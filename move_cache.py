@@ -0,0 +1,49 @@
+"""Ограниченный LRU-кэш сгенерированных ходов и ответов об угрозах, ключ - хеш позиции."""
+from collections import OrderedDict
+
+
+class MoveCache:
+    """LRU-кэш со статистикой попаданий. Выключенный кэш ничего не хранит и всегда промахивается."""
+    def __init__(self, capacity=65536, enabled=True):
+        """Инициализация кэша заданной ёмкости."""
+        self.capacity = capacity
+        self.enabled = enabled
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Возвращает сохранённое значение или None."""
+        if not self.enabled:
+            return None
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """Сохраняет значение, вытесняя самое давно использованное при переполнении."""
+        if not self.enabled:
+            return
+        self.entries[key] = value
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        """Очищает кэш и статистику."""
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        """Возвращает статистику кэша."""
+        lookups = self.hits + self.misses
+        return {"size": len(self.entries), "capacity": self.capacity, "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0}
+
+
+# Общий кэш: одинаковые позиции разных досок и партий используют одни и те же записи
+default_cache = MoveCache()
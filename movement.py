@@ -0,0 +1,227 @@
+"""Декларативное описание движения фигур и его компиляция в таблицы клеток.
+
+Фигура описывается набором составляющих: прыжки на смещения (Leaper), движение по лучам
+(Rider), взятие прыжком через фигуру (Jump), перенос на любую пустую клетку (Drop).
+Movement один раз раскладывает составляющие в лучи для каждой клетки и цвета, поэтому
+при генерации ходов не нужны проверки выхода за край доски. Таблицы строятся при первом
+обращении (процесс, играющий в шашки, не строит таблиц шахматных фигур) и по желанию
+хранятся на диске между запусками: каталог задаёт set_table_cache или переменная окружения
+GAME_TABLE_CACHE.
+"""
+import marshal
+import os
+from functools import cached_property
+
+# Что фигура может делать на клетке луча
+MOVE_OR_CAPTURE = 0
+MOVE_ONLY = 1
+CAPTURE_ONLY = 2
+JUMP_CAPTURE = 3
+DROP = 4
+
+COLORS = ["white", "black"]
+BOARD_SQUARES = [(row, col) for row in range(8) for col in range(8)]
+# Версия формата таблиц в кэше на диске: меняется вместе с compile составляющих
+TABLE_FORMAT = 1
+_table_cache = os.environ.get("GAME_TABLE_CACHE") or None
+
+
+def set_table_cache(directory):
+    """Задаёт каталог кэша таблиц движения на диске (None - не хранить таблицы на диске)."""
+    global _table_cache
+    _table_cache = directory
+
+
+def _orient(offsets, color, relative):
+    """Разворачивает смещения, заданные для белых, в сторону чёрных."""
+    if relative and color == "black":
+        return [(-row_offset, col_offset) for row_offset, col_offset in offsets]
+    return list(offsets)
+
+
+def _on_board(row, col):
+    """Проверяет, что клетка на доске."""
+    return 0 <= row < 8 and 0 <= col < 8
+
+
+class Leaper:
+    """Прыжок на заданные смещения, без учёта фигур между клетками.
+
+    relative=True означает, что смещения заданы для белых (вверх - отрицательная строка)
+    и для чёрных отражаются.
+    """
+    def __init__(self, offsets, mode=MOVE_OR_CAPTURE, relative=False):
+        """Инициализация описания прыжка."""
+        self.offsets = offsets
+        self.mode = mode
+        self.relative = relative
+
+    def compile(self, row, col, color):
+        """Возвращает лучи для клетки: каждый прыжок - луч из одной клетки."""
+        return tuple(((row + row_offset, col + col_offset),) for row_offset, col_offset in _orient(self.offsets, color, self.relative)
+                     if _on_board(row + row_offset, col + col_offset))
+
+
+class Rider:
+    """Движение по лучам до первой фигуры, не дальше max_range клеток.
+
+    initial_row и initial_range задают особую дальность с начальной горизонтали
+    (двойной ход пешки); initial_row указывается для белых.
+    """
+    def __init__(self, directions, max_range=7, mode=MOVE_OR_CAPTURE, relative=False, initial_row=None, initial_range=None):
+        """Инициализация описания движения по лучам."""
+        self.directions = directions
+        self.max_range = max_range
+        self.mode = mode
+        self.relative = relative
+        self.initial_row = initial_row
+        self.initial_range = initial_range
+
+    def compile(self, row, col, color):
+        """Возвращает лучи для клетки, обрезанные краем доски и дальностью."""
+        max_range = self.max_range
+        if self.initial_row is not None:
+            initial_row = self.initial_row if color == "white" or not self.relative else 7 - self.initial_row
+            if row == initial_row:
+                max_range = self.initial_range
+        rays = []
+        for row_step, col_step in _orient(self.directions, color, self.relative):
+            ray = tuple((row + row_step * i, col + col_step * i) for i in range(1, max_range + 1)
+                        if _on_board(row + row_step * i, col + col_step * i))
+            if ray:
+                rays.append(ray)
+        return tuple(rays)
+
+
+class Jump:
+    """Взятие прыжком: через соседнюю фигуру соперника на пустую клетку за ней (шашки)."""
+    mode = JUMP_CAPTURE
+
+    def __init__(self, offsets, relative=False):
+        """Инициализация описания взятия прыжком. offsets - направления на соседнюю клетку."""
+        self.offsets = offsets
+        self.relative = relative
+
+    def compile(self, row, col, color):
+        """Возвращает пары (перепрыгиваемая клетка, клетка приземления)."""
+        return tuple(((row + row_offset, col + col_offset), (row + 2 * row_offset, col + 2 * col_offset))
+                     for row_offset, col_offset in _orient(self.offsets, color, self.relative)
+                     if _on_board(row + 2 * row_offset, col + 2 * col_offset))
+
+
+class Drop:
+    """Перенос на любую пустую клетку доски."""
+    mode = DROP
+
+    def compile(self, row, col, color):
+        """Клетки переноса зависят только от позиции, лучей нет."""
+        return ()
+
+
+class Movement:
+    """Движение фигуры: составляющие, скомпилированные в таблицы для каждого цвета и клетки."""
+    def __init__(self, *components):
+        """Запоминает составляющие. Порядок ходов - порядок составляющих и их направлений."""
+        self.components = components
+
+    @cached_property
+    def tables(self):
+        """Таблицы лучей: tables[цвет][row * 8 + col] - кортеж пар (режим, лучи) по составляющим.
+
+        Строятся при первом обращении или читаются из кэша на диске (см. set_table_cache).
+        """
+        if _table_cache is None:
+            return self.compile()
+        import zlib
+        description = self.describe()
+        path = os.path.join(_table_cache, f"movement-{zlib.crc32(description.encode('utf-8')):08x}.tables")
+        try:
+            with open(path, "rb") as file:
+                stored_description, tables = marshal.loads(file.read())
+            # Имя файла - короткий хеш, поэтому при совпадении хешей сверяется полное описание
+            if stored_description == description:
+                return tables
+        except (OSError, EOFError, ValueError, TypeError):
+            pass
+        tables = self.compile()
+        # Запись во временный файл и переименование: параллельные процессы не прочитают файл наполовину.
+        # Кэш необязателен: если каталог недоступен для записи, таблицы остаются только в памяти
+        temporary = f"{path}.{os.getpid()}"
+        try:
+            os.makedirs(_table_cache, exist_ok=True)
+            with open(temporary, "wb") as file:
+                marshal.dump((description, tables), file)
+            os.replace(temporary, path)
+        except OSError:
+            try:
+                os.remove(temporary)
+            except OSError:
+                pass
+        return tables
+
+    def compile(self):
+        """Раскладывает составляющие в таблицы для каждого цвета и клетки."""
+        return {color: [tuple((component.mode, component.compile(row, col, color)) for component in self.components)
+                        for row, col in BOARD_SQUARES] for color in COLORS}
+
+    def describe(self):
+        """Описание составляющих и версий форматов - ключ таблиц в кэше на диске."""
+        return repr((TABLE_FORMAT, marshal.version, [(type(component).__name__, sorted(vars(component).items()))
+                                                     for component in self.components]))
+
+    def moves(self, board, start_row, start_col, color):
+        """Возвращает список ходов фигуры цвета color с клетки."""
+        grid = board.board
+        moves = []
+        for mode, rays in self.tables[color][start_row * 8 + start_col]:
+            if mode == MOVE_OR_CAPTURE:
+                for ray in rays:
+                    for square in ray:
+                        target = grid[square[0]][square[1]]
+                        if not target:
+                            moves.append(square)
+                        else:
+                            if target.color != color:
+                                moves.append(square)
+                            break
+            elif mode == MOVE_ONLY:
+                for ray in rays:
+                    for square in ray:
+                        if grid[square[0]][square[1]]:
+                            break
+                        moves.append(square)
+            elif mode == CAPTURE_ONLY:
+                for ray in rays:
+                    for square in ray:
+                        target = grid[square[0]][square[1]]
+                        if target:
+                            if target.color != color:
+                                moves.append(square)
+                            break
+            elif mode == JUMP_CAPTURE:
+                for (jumped_row, jumped_col), landing in rays:
+                    jumped = grid[jumped_row][jumped_col]
+                    if jumped and jumped.color != color and not grid[landing[0]][landing[1]]:
+                        moves.append(landing)
+            else:
+                moves.extend(board.empty_squares())
+        return moves
+
+    def watched_squares(self, board, start_row, start_col, color):
+        """Возвращает клетки, от содержимого которых зависят ходы: лучи до первой фигуры включительно."""
+        grid = board.board
+        watched = []
+        for mode, rays in self.tables[color][start_row * 8 + start_col]:
+            if mode == DROP:
+                return BOARD_SQUARES
+            if mode == JUMP_CAPTURE:
+                for jumped, landing in rays:
+                    watched.append(jumped)
+                    watched.append(landing)
+                continue
+            for ray in rays:
+                for square in ray:
+                    watched.append(square)
+                    if grid[square[0]][square[1]]:
+                        break
+        return watched
@@ -0,0 +1,214 @@
+"""Perft: подсчёт листьев дерева ходов до заданной глубины.
+
+Служит одновременно замером скорости генерации ходов и проверкой, что оптимизации
+не меняют правил: число листьев должно совпадать с эталонами из perft_fixtures.json.
+
+Запуск:
+    python perft.py --variant chess --depth 4 [--engine bitboard] [--divide] [--legal]
+    python perft.py --variant checkers --depth 6 --position position.txt --side black [--flying-kings]
+    python perft.py --check [--engine all]   # сверка со всеми эталонами
+    python perft.py --update                 # пересчёт эталонов
+"""
+import argparse
+import json
+import os
+import time
+
+from game import VARIANTS, Board
+from legal import analyse
+
+ENGINES = ["mailbox", "bitboard"]
+FIXTURES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "perft_fixtures.json")
+
+
+class PerftStats:
+    """Статистика прогона: число вызовов генерации и затраченное время по классам фигур."""
+    def __init__(self):
+        """Инициализация пустой статистики."""
+        self.calls = {}
+        self.seconds = {}
+
+    def add(self, piece_name, seconds):
+        """Учитывает один вызов генерации ходов фигуры."""
+        self.calls[piece_name] = self.calls.get(piece_name, 0) + 1
+        self.seconds[piece_name] = self.seconds.get(piece_name, 0.0) + seconds
+
+
+def create_board(variant, engine="mailbox", position=None, current_player="white"):
+    """Создаёт доску варианта (без кэша ходов, чтобы замер был честным) и при необходимости загружает позицию."""
+    game_type, modified_chess = VARIANTS[variant]
+    if engine == "bitboard":
+        from bitboard import BitboardBoard
+        board = BitboardBoard(game_type, modified_chess, None)
+    else:
+        board = Board(game_type, modified_chess, None)
+    if position:
+        board.load_diagram(position, current_player)
+    return board
+
+
+def generate_moves(board, stats=None, rules=None, legal=False):
+    """Возвращает все ходы стороны, которая ходит: кортежи аргументов board.make_move
+    (строка, столбец, строка, столбец, None, None, снятые шашки цепочки взятий).
+
+    Ходы шашек строятся правилами rules (по умолчанию checkers.default_rules).
+    legal=True - только допустимые ходы шахмат (legal.py), время учитывается под именем "legal".
+    """
+    if board.game_type == "checkers":
+        if rules is None:
+            # Правила шашек загружаются только для шашек: шахматный поиск (engine.py) их не импортирует
+            from checkers import default_rules as rules
+        if stats is not None:
+            started = time.perf_counter()
+        moves = [(row, col, end_row, end_col, None, None, captured)
+                 for row, col, end_row, end_col, captured, _ in rules.side_moves(board)]
+        if stats is not None:
+            stats.add("Checker", time.perf_counter() - started)
+        return moves
+    if legal:
+        if stats is not None:
+            started = time.perf_counter()
+        moves = [(row, col, end_row, end_col, None, None, ())
+                 for (row, col), targets in analyse(board).moves.items() for end_row, end_col in targets]
+        if stats is not None:
+            stats.add("legal", time.perf_counter() - started)
+        return moves
+    if stats is None and hasattr(board, "side_moves"):
+        # Доска на битбордах перебирает фигуры и клетки ходов по битам, минуя списки клеток
+        return board.side_moves()
+    moves = []
+    for row, col in board.pieces_of(board.current_player):
+        if stats is not None:
+            started = time.perf_counter()
+        # Списки ходов могут повторять клетку (шаг Крепости на пустую клетку), ход считается один раз
+        for end_row, end_col in dict.fromkeys(board.get_moves(row, col)):
+            moves.append((row, col, end_row, end_col, None, None, ()))
+        if stats is not None:
+            stats.add(type(board.board[row][col]).__name__, time.perf_counter() - started)
+    return moves
+
+
+def perft(board, depth, stats=None, rules=None, legal=False):
+    """Возвращает число листьев дерева ходов глубины depth (legal=True - только допустимых ходов)."""
+    if depth == 0:
+        return 1
+    if depth == 1 and stats is None and not legal and board.game_type != "checkers" and hasattr(board, "side_move_count"):
+        # На последнем уровне нужны не ходы, а их число: доска на битбордах считает биты
+        return board.side_move_count()
+    moves = generate_moves(board, stats, rules, legal)
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        board.make_move(*move)
+        nodes += perft(board, depth - 1, stats, rules, legal)
+        board.unmake_move()
+    return nodes
+
+
+def divide(board, depth, rules=None, legal=False):
+    """Возвращает число листьев для каждого хода из корня (для поиска расхождений)."""
+    result = {}
+    for move in generate_moves(board, rules=rules, legal=legal):
+        board.make_move(*move)
+        result[move] = perft(board, depth - 1, rules=rules, legal=legal)
+        board.unmake_move()
+    return result
+
+
+def square_name(row, col):
+    """Переводит координаты доски в шахматную нотацию."""
+    return f"{chr(ord('a') + col)}{8 - row}"
+
+
+def load_fixtures():
+    """Читает эталонные значения perft."""
+    with open(FIXTURES_PATH, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def fixture_board(fixture, engine):
+    """Создаёт доску для эталона."""
+    position = "\n".join(fixture["position"]) if fixture.get("position") else None
+    return create_board(fixture["variant"], engine, position, fixture.get("side", "white"))
+
+
+def check_fixtures(engines):
+    """Сверяет perft со всеми эталонами. Возвращает число расхождений."""
+    failures = 0
+    for fixture in load_fixtures():
+        for engine in engines:
+            for depth, expected in fixture["nodes"].items():
+                started = time.perf_counter()
+                nodes = perft(fixture_board(fixture, engine), int(depth), legal=fixture.get("legal", False))
+                elapsed = time.perf_counter() - started
+                status = "ok" if nodes == expected else f"ОШИБКА, ожидалось {expected}"
+                failures += nodes != expected
+                print(f"{fixture['name']:<28}{engine:<10}глубина {depth}: {nodes:>10} {elapsed:8.2f} с  {status}")
+    return failures
+
+
+def update_fixtures(engine):
+    """Пересчитывает эталоны для тех же позиций и глубин."""
+    fixtures = load_fixtures()
+    for fixture in fixtures:
+        for depth in fixture["nodes"]:
+            fixture["nodes"][depth] = perft(fixture_board(fixture, engine), int(depth), legal=fixture.get("legal", False))
+    with open(FIXTURES_PATH, "w", encoding="utf-8") as file:
+        json.dump(fixtures, file, ensure_ascii=False, indent=2)
+        file.write("\n")
+
+
+def report(board, depth, rules=None, legal=False):
+    """Печатает число листьев, скорость и распределение времени по классам фигур."""
+    stats = PerftStats()
+    started = time.perf_counter()
+    nodes = perft(board, depth, stats, rules, legal)
+    elapsed = time.perf_counter() - started
+    print(f"perft({depth}) = {nodes}, {elapsed:.2f} с, {nodes / elapsed if elapsed else 0:,.0f} листьев/с")
+    total = sum(stats.seconds.values()) or 1.0
+    print(f"{'фигура':<12}{'вызовов':>12}{'время, с':>12}{'доля':>8}")
+    for name in sorted(stats.seconds, key=stats.seconds.get, reverse=True):
+        print(f"{name:<12}{stats.calls[name]:>12}{stats.seconds[name]:>12.3f}{stats.seconds[name] / total:>8.1%}")
+
+
+def main():
+    """Разбор аргументов командной строки."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--variant", choices=sorted(VARIANTS), default="chess")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--engine", choices=ENGINES + ["all"], default="mailbox")
+    parser.add_argument("--position", help="файл с диаграммой позиции в формате Board.display")
+    parser.add_argument("--side", choices=["white", "black"], default="white", help="кто ходит в загруженной позиции")
+    parser.add_argument("--flying-kings", action="store_true", help="дальнобойные дамки в шашках")
+    parser.add_argument("--divide", action="store_true", help="вывести число листьев для каждого хода из корня")
+    parser.add_argument("--legal", action="store_true", help="только допустимые ходы (король не остаётся под боем)")
+    parser.add_argument("--check", action="store_true", help="сверить с эталонами")
+    parser.add_argument("--update", action="store_true", help="пересчитать эталоны")
+    args = parser.parse_args()
+    engines = ENGINES if args.engine == "all" else [args.engine]
+
+    if args.check:
+        raise SystemExit(1 if check_fixtures(engines) else 0)
+    if args.update:
+        update_fixtures(engines[0])
+        return
+
+    position = None
+    if args.position:
+        with open(args.position, encoding="utf-8") as file:
+            position = file.read()
+    from checkers import CheckersRules
+    rules = CheckersRules(args.flying_kings)
+    for engine in engines:
+        board = create_board(args.variant, engine, position, args.side)
+        print(f"{args.variant}, {engine}:")
+        if args.divide:
+            for (start_row, start_col, end_row, end_col, _, _, captured), nodes in divide(board, args.depth, rules, args.legal).items():
+                taken = "".join(f"x{square_name(row, col)}" for row, col in captured)
+                print(f"{square_name(start_row, start_col)}{square_name(end_row, end_col)}{taken}: {nodes}")
+        report(board, args.depth, rules, args.legal)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+"""Компактная запись позиции: двоичная фиксированного размера, текстовая (похожая на FEN) и файл позиций.
+
+Двоичная запись - RECORD_SIZE байт (little-endian):
+    32 байта  виды фигур по 4 бита на клетку (клетка row * 8 + col; чётная - младшие 4 бита байта):
+              0 - пусто, иначе код вида из game.PIECE_KINDS (простая шашка и дамка - разные виды)
+    8 байт    маска чёрных фигур (бит row * 8 + col)
+    1 байт    флаги: бит 0 - ходят чёрные, биты 1-2 - вариант игры (номер в порядке регистрации
+              variants.VARIANTS; вариант с номером больше 3 в запись не помещается)
+    3 байта   не используются (нули)
+    4 байта   номер хода (Game.move_count)
+
+Текстовая запись - поля через пробел: расстановка, сторона, номер хода, вариант, например
+    rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w 1 chess
+Горизонтали перечисляются сверху вниз (с 8-й), цифра - число пустых клеток подряд, фигуры -
+символы доски (Board.display), у шашек M/m - простые шашки белых/чёрных, K/k - дамки.
+Номер хода и вариант необязательны (по умолчанию 1 и chess).
+
+PositionStore - файл записей, который только дописывается: заголовок HEADER и записи подряд.
+Файл открывается через mmap, запись по номеру отдаётся срезом memoryview без копирования,
+поэтому открытие не зависит от числа позиций в файле.
+"""
+import mmap
+import os
+import struct
+
+from game import PIECE_KINDS, VARIANTS, Board, Checker, Game, piece_from_symbol
+from move_cache import default_cache
+from variants import variant_of
+
+RECORD = struct.Struct("<32sQB3xI")
+RECORD_SIZE = RECORD.size
+# Бит флагов под номер варианта
+VARIANT_BITS = 2
+BLACK_TO_MOVE = 1
+MAX_MOVE_COUNT = (1 << 32) - 1
+
+COLORS = ["white", "black"]
+# Код вида фигуры (без цвета) и фигура по коду вида и цвету (0 - белые, 1 - чёрные)
+KIND_CODES = {piece_type(color, *args): index + 1 for index, (piece_type, args) in enumerate(PIECE_KINDS) for color in COLORS}
+KIND_PIECES = {(index + 1, side): piece_type(color, *args)
+               for index, (piece_type, args) in enumerate(PIECE_KINDS) for side, color in enumerate(COLORS)}
+# Байт видов двух соседних клеток -> (вид чётной клетки, вид нечётной клетки)
+NIBBLE_PAIRS = [(byte & 15, byte >> 4) for byte in range(256)]
+
+CHECKER_SYMBOLS = {Checker("white"): "M", Checker("black"): "m", Checker("white", True): "K", Checker("black", True): "k"}
+CHECKER_PIECES = {symbol: piece for piece, symbol in CHECKER_SYMBOLS.items()}
+
+MAGIC = b"POSN"
+VERSION = 1
+# Заголовок файла позиций: метка, версия формата, размер записи
+HEADER = struct.Struct("<4sHH8x")
+
+
+def variant_name(board):
+    """Имя варианта игры доски (ключ game.VARIANTS)."""
+    return variant_of(board.game_type, board.modified_chess).name
+
+
+def variant_index(name):
+    """Номер варианта в двоичной записи. Реестр читается при каждом вызове: варианты регистрируются и после импорта."""
+    index = list(VARIANTS).index(name)
+    if index >= 1 << VARIANT_BITS:
+        raise ValueError(f"Вариант {name} не помещается в двоичную запись позиции: в ней {1 << VARIANT_BITS} варианта")
+    return index
+
+
+def pack_board(board, move_count=1):
+    """Упаковывает позицию доски в запись RECORD_SIZE байт."""
+    if not 0 <= move_count <= MAX_MOVE_COUNT:
+        raise ValueError(f"Номер хода вне диапазона: {move_count}")
+    codes = KIND_CODES
+    try:
+        kinds = [codes[piece] if piece else 0 for row in board.board for piece in row]
+    except KeyError as error:
+        raise ValueError(f"Фигуры {error.args[0]!r} нет в game.PIECE_KINDS: её нельзя записать") from None
+    nibbles = bytes(kinds[square] | kinds[square + 1] << 4 for square in range(0, 64, 2))
+    flags = variant_index(variant_name(board)) << 1 | (BLACK_TO_MOVE if board.current_player == "black" else 0)
+    return RECORD.pack(nibbles, board.piece_masks["black"], flags, move_count)
+
+
+def read_record(data, offset=0):
+    """Разбирает запись: (имя варианта, виды фигур по клеткам, маска чёрных, ходят ли чёрные, номер хода)."""
+    nibbles, black_mask, flags, move_count = RECORD.unpack_from(data, offset)
+    variant = flags >> 1
+    names = list(VARIANTS)
+    if variant >= len(names) or flags >> 1 + VARIANT_BITS:
+        raise ValueError(f"Неверные флаги записи позиции: {flags:#04x}")
+    kinds = []
+    for byte in nibbles:
+        kinds.extend(NIBBLE_PAIRS[byte])
+    return names[variant], kinds, black_mask, bool(flags & BLACK_TO_MOVE), move_count
+
+
+def load_record(board, data, offset=0):
+    """Расставляет на доске позицию из записи и возвращает номер хода. Вариант доски должен совпадать с записью."""
+    variant, kinds, black_mask, black_to_move, move_count = read_record(data, offset)
+    if variant != variant_name(board):
+        raise ValueError(f"Запись для варианта {variant}, а доска - {variant_name(board)}")
+    pieces = [None] * 64
+    for square, kind in enumerate(kinds):
+        side = black_mask >> square & 1
+        if not kind:
+            if side:
+                raise ValueError(f"Маска чёрных отмечает пустую клетку {square}")
+            continue
+        piece = KIND_PIECES.get((kind, side))
+        if piece is None:
+            raise ValueError(f"Неизвестный код фигуры: {kind}")
+        pieces[square] = piece
+    set_position(board, pieces, "black" if black_to_move else "white")
+    return move_count
+
+
+def set_position(board, pieces, current_player):
+    """Расставляет на доске фигуры по клеткам (64 значения, None - пусто), меняя только отличающиеся клетки.
+
+    Новая доска уже стоит в начальной расстановке, и записанные позиции обычно немного от неё отличаются.
+    """
+    grid = board.board
+    for square, piece in enumerate(pieces):
+        row, col = square >> 3, square & 7
+        if grid[row][col] is not piece:
+            board.set_piece(row, col, piece)
+    board.current_player = current_player
+
+
+def unpack_board(data, offset=0, move_cache=default_cache, board_type=Board):
+    """Восстанавливает доску из записи: (доска, номер хода)."""
+    board = board_type(*VARIANTS[read_record(data, offset)[0]], move_cache)
+    return board, load_record(board, data, offset)
+
+
+def pack_game(game):
+    """Упаковывает позицию и номер хода партии (история ходов не сохраняется)."""
+    return pack_board(game.board, game.move_count)
+
+
+def unpack_game(data, offset=0, **options):
+    """Создаёт партию с позицией из записи. options - остальные аргументы Game (engine, move_cache, flying_kings, ...)."""
+    game = Game(*VARIANTS[read_record(data, offset)[0]], **options)
+    game.move_count = load_record(game.board, data, offset)
+    game.move_history.reset(game.move_count)
+    return game
+
+
+def piece_symbol(piece):
+    """Символ фигуры в текстовой записи."""
+    return CHECKER_SYMBOLS[piece] if isinstance(piece, Checker) else piece.symbol
+
+
+def board_to_text(board, move_count=1):
+    """Текстовая запись позиции доски."""
+    ranks = []
+    for row in board.board:
+        rank = ""
+        empty = 0
+        for piece in row:
+            if piece is None:
+                empty += 1
+                continue
+            if empty:
+                rank += str(empty)
+                empty = 0
+            rank += piece_symbol(piece)
+        ranks.append(rank + (str(empty) if empty else ""))
+    side = "b" if board.current_player == "black" else "w"
+    return f"{'/'.join(ranks)} {side} {move_count} {variant_name(board)}"
+
+
+def parse_text(text):
+    """Разбирает текстовую запись: (имя варианта, фигуры по клеткам (64 значения, None - пусто), сторона, номер хода)."""
+    fields = text.split()
+    if len(fields) < 2 or len(fields) > 4:
+        raise ValueError(f"Ожидалось от 2 до 4 полей позиции: {text!r}")
+    placement, side, *rest = fields
+    if side not in ("w", "b"):
+        raise ValueError(f"Неверная сторона хода: {side}")
+    move_count, variant = 1, "chess"
+    for field in rest:
+        if field.isdigit():
+            move_count = int(field)
+        elif field in VARIANTS:
+            variant = field
+        else:
+            raise ValueError(f"Неизвестное поле позиции: {field}")
+    ranks = placement.split("/")
+    if len(ranks) != 8:
+        raise ValueError(f"Ожидалось 8 горизонталей, найдено {len(ranks)}")
+    pieces = [None] * 64
+    for row, rank in enumerate(ranks):
+        col = 0
+        for symbol in rank:
+            if symbol.isdigit():
+                col += int(symbol)
+                continue
+            if col < 8:
+                if variant == "checkers":
+                    if symbol not in CHECKER_PIECES:
+                        raise ValueError(f"Неизвестный символ шашки: {symbol}")
+                    pieces[row * 8 + col] = CHECKER_PIECES[symbol]
+                else:
+                    pieces[row * 8 + col] = piece_from_symbol(symbol)
+            col += 1
+        if col != 8:
+            raise ValueError(f"В горизонтали {8 - row} не 8 клеток: {rank}")
+    return variant, pieces, "black" if side == "b" else "white", move_count
+
+
+def board_from_text(text, move_cache=default_cache, board_type=Board):
+    """Восстанавливает доску из текстовой записи: (доска, номер хода)."""
+    variant, pieces, current_player, move_count = parse_text(text)
+    board = board_type(*VARIANTS[variant], move_cache)
+    set_position(board, pieces, current_player)
+    return board, move_count
+
+
+def game_to_text(game):
+    """Текстовая запись позиции и номера хода партии."""
+    return board_to_text(game.board, game.move_count)
+
+
+def game_from_text(text, **options):
+    """Создаёт партию с позицией из текстовой записи. options - остальные аргументы Game."""
+    variant, pieces, current_player, move_count = parse_text(text)
+    game = Game(*VARIANTS[variant], **options)
+    set_position(game.board, pieces, current_player)
+    game.move_count = move_count
+    game.move_history.reset(move_count)
+    return game
+
+
+class PositionStore:
+    """Файл позиций в двоичной записи: дописывание в конец и чтение по номеру через mmap."""
+    def __init__(self, path, writable=False):
+        """Открывает файл позиций. writable=True разрешает дописывание и создаёт файл, если его нет."""
+        self.path = path
+        self.writable = writable
+        if writable and not os.path.exists(path):
+            with open(path, "wb") as file:
+                file.write(HEADER.pack(MAGIC, VERSION, RECORD_SIZE))
+        self._file = open(path, "r+b" if writable else "rb")
+        magic, version, record_size = HEADER.unpack(self._file.read(HEADER.size).ljust(HEADER.size, b"\0"))
+        if magic != MAGIC or version != VERSION or record_size != RECORD_SIZE:
+            self._file.close()
+            raise ValueError(f"{path}: не файл позиций версии {VERSION}")
+        self._map = None
+        self._view = None
+        self._mapped_count = -1
+        self._count = (os.fstat(self._file.fileno()).st_size - HEADER.size) // RECORD_SIZE
+        # Хвост недописанной записи (например, после сбоя при записи) отбрасывается
+        if writable:
+            self._file.truncate(HEADER.size + self._count * RECORD_SIZE)
+
+    def __enter__(self):
+        """Вход в контекстный менеджер."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Закрывает файл при выходе из контекстного менеджера."""
+        self.close()
+
+    def __len__(self):
+        """Число позиций в файле."""
+        return self._count
+
+    def __getitem__(self, index):
+        """Запись позиции по номеру - memoryview без копирования (держит отображение файла, пока не освобождена)."""
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("Номер позиции вне файла")
+        start = index * RECORD_SIZE
+        return self.records()[start:start + RECORD_SIZE]
+
+    def __iter__(self):
+        """Перебор записей по порядку."""
+        for index in range(self._count):
+            yield self[index]
+
+    def records(self):
+        """Все записи одним memoryview без копирования (например, для numpy.frombuffer)."""
+        if self._mapped_count != self._count:
+            self._remap()
+        return self._view
+
+    def _remap(self):
+        """Отображает файл в память заново, чтобы увидеть дописанные записи."""
+        self._release()
+        self._file.flush()
+        if self._count:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._view = memoryview(self._map)[HEADER.size:HEADER.size + self._count * RECORD_SIZE]
+        else:
+            self._view = memoryview(b"")
+        self._mapped_count = self._count
+
+    def _release(self):
+        """Забывает отображение файла. Оно закрывается, когда освобождены все срезы записей, полученные раньше."""
+        self._map = None
+        self._view = None
+
+    def board(self, index, move_cache=default_cache, board_type=Board):
+        """Доска позиции по номеру: (доска, номер хода)."""
+        return unpack_board(self[index], move_cache=move_cache, board_type=board_type)
+
+    def game(self, index, **options):
+        """Партия с позицией по номеру. options - остальные аргументы Game."""
+        return unpack_game(self[index], **options)
+
+    def append_record(self, record):
+        """Дописывает готовую запись (или несколько записей подряд) и возвращает номер первой из них."""
+        if not self.writable:
+            raise ValueError(f"{self.path}: файл открыт только для чтения")
+        if len(record) % RECORD_SIZE:
+            raise ValueError(f"Размер записи должен быть кратен {RECORD_SIZE}")
+        index = self._count
+        self._file.seek(0, os.SEEK_END)
+        self._file.write(record)
+        self._count += len(record) // RECORD_SIZE
+        return index
+
+    def append(self, board, move_count=1):
+        """Дописывает позицию доски и возвращает её номер."""
+        return self.append_record(pack_board(board, move_count))
+
+    def append_game(self, game):
+        """Дописывает позицию партии и возвращает её номер."""
+        return self.append_record(pack_game(game))
+
+    def close(self):
+        """Закрывает файл."""
+        self._release()
+        self._file.close()
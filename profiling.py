@@ -0,0 +1,269 @@
+"""Профилирование генерации ходов и этапов хода по запросу.
+
+По умолчанию ничего не меняется и накладных расходов нет. Profiler.enable() подменяет
+замеряемые методы обёртками (disable() возвращает исходные), и обёртки считают вызовы,
+время (вместе с вложенными вызовами) и размеры списков ходов:
+    ходы <фигура>      генерация ходов фигуры (Board.generate_moves и подклассы доски)
+    взятия <фигура>    генерация взятий шашки (Board.generate_capture_moves)
+    <Класс.метод>      этапы хода: угрозы, шах, карта атак, вывод доски, ход, выбор фигуры, ...
+Кэш ходов учитывается по его счётчикам попаданий с момента включения.
+
+Данные доступны через snapshot() (словарь), строку сводки summary_line() - она же печатается
+в консоль раз в report_interval секунд - и dump() в JSON для разбора потом.
+
+Включение в консольной игре и на сервере - переменные окружения:
+    GAME_PROFILE=profile.json        запись JSON при выходе ("1" - без записи)
+    GAME_PROFILE_INTERVAL=10         строка сводки в stderr раз в 10 с
+Прогон случайных партий с профилем:
+    python profiling.py [--variant all] [--games 20] [--plies 80] [--json profile.json]
+"""
+import argparse
+import atexit
+import functools
+import io
+import json
+import os
+import random
+import sys
+import time
+
+from game import VARIANTS, AttackMap, Board, Game
+from move_cache import default_cache
+from render import BoardRenderer
+
+
+def _phases():
+    """Замеряемые этапы хода: (класс, метод, считать ли размер результата)."""
+    from checkers import CheckersRules
+    return [
+        (Game, "apply_move", False), (Game, "select_piece", False), (Game, "find_threatened_pieces", True),
+        (Game, "is_king_in_check", False), (Game, "legal_moves", False), (Game, "side_moves", True), (Game, "hint", False),
+        (Game, "undo", False), (AttackMap, "refresh", False), (Board, "display", False), (CheckersRules, "side_moves", True),
+    ]
+
+
+def _board_classes():
+    """Классы досок, которые сами определяют генерацию ходов."""
+    from bitboard import BitboardBoard
+    return [Board, BitboardBoard]
+
+
+class Profiler:
+    """Счётчики вызовов, времени и размеров списков ходов по именам замеров."""
+    def __init__(self):
+        """Инициализация выключенного профилировщика."""
+        self.enabled = False
+        # Имя замера -> [вызовы, секунды, сумма размеров, наибольший размер]
+        self.entries = {}
+        self.started = None
+        self.cache = None
+        self._cache_start = (0, 0)
+        self._originals = []
+        self._active = set()
+        self.report_interval = None
+        self.stream = None
+        self._next_report = None
+
+    def __enter__(self):
+        """Включает профилирование в блоке with."""
+        if not self.enabled:
+            self.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        """Выключает профилирование."""
+        self.disable()
+
+    def enable(self, report_interval=None, stream=None, cache=default_cache):
+        """Подменяет замеряемые методы. report_interval - печатать строку сводки раз в столько секунд
+        (в stream, по умолчанию sys.stderr); cache - кэш ходов, попадания в который учитываются."""
+        if self.enabled:
+            return
+        self.enabled = True
+        self.report_interval = report_interval
+        self.stream = stream
+        self.cache = cache
+        self.reset()
+        for owner, attribute, sized in _phases():
+            self._patch(owner, attribute, self._timed(getattr(owner, attribute), f"{owner.__name__}.{attribute}", sized))
+        for board_class in _board_classes():
+            for attribute, prefix in (("generate_moves", "ходы"), ("generate_capture_moves", "взятия")):
+                if attribute in vars(board_class):
+                    self._patch(board_class, attribute, self._piece_timed(vars(board_class)[attribute], prefix))
+
+    def disable(self):
+        """Возвращает исходные методы. Собранные данные сохраняются."""
+        for owner, attribute, original in reversed(self._originals):
+            setattr(owner, attribute, original)
+        self._originals = []
+        self.enabled = False
+
+    def reset(self):
+        """Обнуляет собранные данные."""
+        self.entries = {}
+        self.started = time.perf_counter()
+        self._cache_start = (self.cache.hits, self.cache.misses) if self.cache is not None else (0, 0)
+        self._next_report = self.started + self.report_interval if self.report_interval is not None else None
+
+    def _patch(self, owner, attribute, wrapper):
+        """Подменяет метод класса, запоминая исходный (из словаря класса, чтобы вернуть его в точности)."""
+        self._originals.append((owner, attribute, vars(owner)[attribute]))
+        setattr(owner, attribute, wrapper)
+
+    def _timed(self, function, name, sized):
+        """Обёртка, замеряющая метод под постоянным именем."""
+        profiler = self
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            result = function(*args, **kwargs)
+            profiler.record(name, time.perf_counter() - started, len(result) if sized and result is not None else None)
+            return result
+        return wrapper
+
+    def _piece_timed(self, function, prefix):
+        """Обёртка генерации ходов доски: имя замера - по классу фигуры на клетке.
+
+        Вложенный вызов того же замера (подкласс доски вызывает метод базового класса) не считается второй раз.
+        """
+        profiler = self
+        active = self._active
+
+        @functools.wraps(function)
+        def wrapper(board, row, col):
+            if prefix in active:
+                return function(board, row, col)
+            active.add(prefix)
+            started = time.perf_counter()
+            try:
+                result = function(board, row, col)
+            finally:
+                active.discard(prefix)
+            piece = board.board[row][col]
+            profiler.record(f"{prefix} {type(piece).__name__ if piece else '-'}", time.perf_counter() - started, len(result))
+            return result
+        return wrapper
+
+    def record(self, name, seconds, size=None):
+        """Учитывает один вызов замера name."""
+        entry = self.entries.get(name)
+        if entry is None:
+            entry = self.entries[name] = [0, 0.0, 0, 0]
+        entry[0] += 1
+        entry[1] += seconds
+        if size is not None:
+            entry[2] += size
+            if size > entry[3]:
+                entry[3] = size
+        if self._next_report is not None:
+            now = time.perf_counter()
+            if now >= self._next_report:
+                self._next_report = now + self.report_interval
+                print(self.summary_line(), file=self.stream or sys.stderr, flush=True)
+
+    def cache_stats(self):
+        """Попадания и промахи кэша ходов с момента включения: (попадания, промахи, доля попаданий)."""
+        if self.cache is None:
+            return 0, 0, 0.0
+        hits = self.cache.hits - self._cache_start[0]
+        misses = self.cache.misses - self._cache_start[1]
+        return hits, misses, hits / (hits + misses) if hits + misses else 0.0
+
+    def snapshot(self):
+        """Собранные данные словарем: замеры (вызовы, время, среднее, размеры списков), кэш, длительность."""
+        entries = {}
+        for name, (calls, seconds, size_total, size_max) in sorted(self.entries.items(), key=lambda item: -item[1][1]):
+            entries[name] = {"calls": calls, "seconds": seconds, "mean_us": seconds / calls * 1e6 if calls else 0.0}
+            if size_total or size_max:
+                entries[name].update(mean_size=size_total / calls, max_size=size_max)
+        hits, misses, hit_rate = self.cache_stats()
+        return {
+            "elapsed": time.perf_counter() - self.started if self.started is not None else 0.0,
+            "entries": entries,
+            "cache": {"hits": hits, "misses": misses, "hit_rate": hit_rate},
+        }
+
+    def summary_line(self, top=5):
+        """Строка сводки: ходы партий, самые долгие замеры и доля попаданий в кэш."""
+        moves = self.entries.get("Game.apply_move", [0])[0]
+        heaviest = sorted(self.entries.items(), key=lambda item: -item[1][1])[:top]
+        parts = [f"{name} {calls}× {seconds * 1e3:.1f} мс" for name, (calls, seconds, _, _) in heaviest]
+        return f"профиль: ходов {moves} | {' | '.join(parts)} | кэш {self.cache_stats()[2]:.0%}"
+
+    def dump(self, path, **meta):
+        """Записывает snapshot() и дополнительные поля meta в JSON."""
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump({**meta, **self.snapshot()}, file, ensure_ascii=False, indent=2)
+
+
+profiler = Profiler()
+
+
+def enable_from_environment():
+    """Включает общий профилировщик по переменным GAME_PROFILE и GAME_PROFILE_INTERVAL (см. описание модуля)."""
+    target = os.environ.get("GAME_PROFILE")
+    if not target:
+        return None
+    interval = os.environ.get("GAME_PROFILE_INTERVAL")
+    profiler.enable(report_interval=float(interval) if interval else None)
+    if target != "1":
+        atexit.register(lambda: profiler.dump(target, argv=sys.argv))
+    return profiler
+
+
+def play_random_game(game, plies, rng, renderer):
+    """Случайная партия теми же шагами, что и в play: угрозы, вывод доски, выбор фигуры, ход."""
+    for _ in range(plies):
+        threatened_pieces, king_in_check = game.threat_status()
+        game.board.display(game.move_count, threatened_pieces=threatened_pieces, king_in_check=king_in_check, renderer=renderer)
+        moves = game.side_moves()
+        if not moves:
+            break
+        start_row, start_col, end_row, end_col, path = rng.choice(moves)
+        game.select_piece(f"{chr(ord('a') + start_col)}{8 - start_row}")
+        game.apply_move(start_row, start_col, end_row, end_col, path or None)
+
+
+def main():
+    """Разбор аргументов, прогон партий каждого варианта и вывод сводок."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--variant", choices=["all", *VARIANTS], default="all")
+    parser.add_argument("--games", type=int, default=20)
+    parser.add_argument("--plies", type=int, default=80)
+    parser.add_argument("--engine", choices=["mailbox", "bitboard"], default="mailbox")
+    parser.add_argument("--no-cache", action="store_true", help="без кэша ходов")
+    parser.add_argument("--interval", type=float, default=None, help="печатать строку сводки раз в столько секунд")
+    parser.add_argument("--json", help="записать замеры вариантов в JSON")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    variants = list(VARIANTS) if args.variant == "all" else [args.variant]
+    renderer = BoardRenderer(io.StringIO(), ansi=False)
+    report = {}
+    for variant in variants:
+        rng = random.Random(args.seed)
+        default_cache.clear()
+        profiler.enable(report_interval=args.interval)
+        try:
+            for _ in range(args.games):
+                game = Game(*VARIANTS[variant], engine=args.engine, move_cache=None if args.no_cache else default_cache)
+                play_random_game(game, args.plies, rng, renderer)
+                renderer.stream.seek(0)
+                renderer.stream.truncate()
+        finally:
+            profiler.disable()
+        snapshot = profiler.snapshot()
+        report[variant] = snapshot
+        moves = snapshot["entries"].get("Game.apply_move", {}).get("calls", 0)
+        print(f"{variant}: {moves} ходов, {snapshot['elapsed'] / moves * 1e3 if moves else 0:.2f} мс на ход, кэш {snapshot['cache']['hit_rate']:.0%}")
+        for name, entry in list(snapshot["entries"].items())[:12]:
+            sizes = f"   ходов в списке {entry['mean_size']:.1f} (до {entry['max_size']})" if "mean_size" in entry else ""
+            print(f"  {name:<28}{entry['calls']:>9}{entry['seconds'] * 1e3:>10.1f} мс{entry['mean_us']:>9.1f} мкс{sizes}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump({"engine": args.engine, "games": args.games, "plies": args.plies, "variants": report}, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
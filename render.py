@@ -0,0 +1,175 @@
+"""Вывод доски в консоль кадрами.
+
+Кадр собирается в строки и выводится одной записью. В терминале (TTY) кадр рисуется в верхней
+части экрана, а при следующих кадрах перерисовываются только изменившиеся клетки через
+ANSI-адресацию курсора. Прокрутка терминала ограничена строками под кадром, поэтому вопросы,
+ввод и сообщения игры не сдвигают кадр и адреса его клеток остаются верными. Дорисовка кадра
+не трогает текст под ним: курсор возвращается на место, и сообщения (например, почему ход не
+принят) остаются на экране. Если под кадром нет места или терминал изменил размер, кадр
+рисуется целиком. В канал или файл каждый кадр
+выводится целиком, без управляющих последовательностей, и совпадает с прежним выводом Board.display.
+"""
+import atexit
+import os
+import sys
+
+from game import King
+
+FILES_LINE = "  a b c d e f g h"
+# Управляющие последовательности ANSI
+CLEAR_SCREEN = "\x1b[H\x1b[2J"
+CLEAR_LINE = "\x1b[2K"
+SAVE_CURSOR = "\x1b7"
+RESTORE_CURSOR = "\x1b8"
+# Сброс области прокрутки (DECSTBM переводит курсор в начало экрана, поэтому курсор сохраняется)
+RESET_SCROLL_REGION = SAVE_CURSOR + "\x1b[r" + RESTORE_CURSOR
+
+
+def move_cursor(line, column):
+    """Последовательность перевода курсора на строку и столбец экрана (считая с 0)."""
+    return f"\x1b[{line + 1};{column + 1}H"
+
+
+def scroll_region(top):
+    """Последовательность области прокрутки от строки экрана top (считая с 0) до низа экрана."""
+    return f"\x1b[{top + 1}r"
+
+
+def board_cells(board, possible_moves=None, capture_moves=None, threatened_pieces=None, king_in_check=False):
+    """Возвращает символы клеток доски (8 списков по 8 строк) с учётом подсветки."""
+    possible = set(possible_moves or ())
+    captures = set(capture_moves or ())
+    threatened = set(threatened_pieces or ())
+    current_player = board.current_player
+    rows = []
+    for row in range(8):
+        cells = []
+        for col, piece in enumerate(board.board[row]):
+            square = (row, col)
+            if king_in_check and isinstance(piece, King) and piece.color == current_player: cells.append("#")
+            elif square in threatened: cells.append("?")
+            elif square in possible: cells.append("*")
+            elif square in captures: cells.append("!")
+            elif not piece: cells.append(".")
+            else: cells.append(str(piece))
+        rows.append(cells)
+    return rows
+
+
+def frame_lines(move_count, cells):
+    """Собирает строки кадра: номер хода, буквы вертикалей, 8 горизонталей, буквы вертикалей."""
+    lines = [f"Текущий ход: {move_count}", FILES_LINE]
+    for row, row_cells in enumerate(cells):
+        lines.append(f"{8 - row} {' '.join(row_cells)} {8 - row}")
+    lines.append(FILES_LINE)
+    return lines
+
+
+class BoardRenderer:
+    """Выводит кадры доски в поток, в терминале - перерисовывая только изменения."""
+    def __init__(self, stream=None, ansi=None):
+        """Инициализация. stream=None - текущий sys.stdout; ansi=None - включать ANSI, если поток - терминал."""
+        self.stream = stream
+        self.ansi = ansi
+        self.previous_cells = None
+        self.previous_lines = None
+        # Кадр закреплён областью прокрутки (только такой кадр дорисовывается) и размер терминала при этом
+        self.pinned = False
+        self.pinned_size = None
+        self.scroll_region_set = False
+
+    def _target(self):
+        """Возвращает поток вывода и признак вывода в терминал."""
+        stream = self.stream or sys.stdout
+        ansi = self.ansi
+        if ansi is None:
+            ansi = stream.isatty() if hasattr(stream, "isatty") else False
+        return stream, ansi
+
+    def reset(self):
+        """Забывает предыдущий кадр: следующий будет нарисован целиком."""
+        self.previous_cells = None
+        self.previous_lines = None
+        self.pinned = False
+
+    def restore_terminal(self):
+        """Возвращает терминалу прокрутку всего экрана (при выходе из программы)."""
+        if self.scroll_region_set:
+            stream, _ = self._target()
+            stream.write(RESET_SCROLL_REGION)
+            stream.flush()
+            self.scroll_region_set = False
+        self.reset()
+
+    def render(self, board, move_count, possible_moves=None, capture_moves=None, threatened_pieces=None, king_in_check=False):
+        """Выводит кадр доски."""
+        stream, ansi = self._target()
+        cells = board_cells(board, possible_moves, capture_moves, threatened_pieces, king_in_check)
+        lines = frame_lines(move_count, cells)
+        if not ansi:
+            stream.write("\n".join(lines) + "\n")
+        else:
+            size = self._terminal_size(stream)
+            if self.pinned and self.pinned_size == size and len(self.previous_lines) == len(lines):
+                # Курсор возвращается под последнее сообщение: текст под кадром не стирается
+                stream.write(SAVE_CURSOR + self._diff(lines, cells) + RESTORE_CURSOR)
+            else:
+                stream.write(self._redraw(lines, size))
+        stream.flush()
+        self.previous_cells = cells
+        self.previous_lines = lines
+
+    def _redraw(self, lines, size):
+        """Возвращает кадр целиком и закрепляет его: прокрутка - только в строках под кадром."""
+        frame = CLEAR_SCREEN + "\n".join(lines) + "\n"
+        # Области прокрутки нужны хотя бы две строки под кадром; размер неизвестен - ansi включён явно
+        if size is not None and size.lines < len(lines) + 2:
+            self.pinned = False
+            return (RESET_SCROLL_REGION if self.scroll_region_set else "") + frame
+        if not self.scroll_region_set:
+            self.scroll_region_set = True
+            atexit.register(self.restore_terminal)
+        self.pinned = True
+        self.pinned_size = size
+        return RESET_SCROLL_REGION + frame + scroll_region(len(lines)) + move_cursor(len(lines), 0)
+
+    @staticmethod
+    def _terminal_size(stream):
+        """Размер терминала потока или None, если поток - не терминал."""
+        try:
+            return os.get_terminal_size(stream.fileno())
+        except (AttributeError, ValueError, OSError):
+            return None
+
+    def _diff(self, lines, cells):
+        """Возвращает последовательности, которые превращают предыдущий кадр в новый."""
+        output = []
+        for line_number, line in enumerate(lines):
+            if line == self.previous_lines[line_number]:
+                continue
+            row = line_number - 2
+            if 0 <= row < 8 and self._same_layout(cells[row], self.previous_cells[row]):
+                column = 2
+                for cell, previous in zip(cells[row], self.previous_cells[row]):
+                    if cell != previous:
+                        output.append(move_cursor(line_number, column) + cell)
+                    column += len(cell) + 1
+            else:
+                output.append(move_cursor(line_number, 0) + CLEAR_LINE + line)
+        return "".join(output)
+
+    @staticmethod
+    def _same_layout(cells, previous_cells):
+        """Проверяет, что клетки горизонтали занимают те же столбцы экрана (символы дамок шире)."""
+        return all(len(cell) == len(previous) for cell, previous in zip(cells, previous_cells))
+
+
+_default_renderer = None
+
+
+def default_renderer():
+    """Общий вывод для Board.display (создаётся при первом вызове)."""
+    global _default_renderer
+    if _default_renderer is None:
+        _default_renderer = BoardRenderer()
+    return _default_renderer
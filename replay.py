@@ -0,0 +1,246 @@
+"""Пакетная проверка записанных партий без ввода с клавиатуры.
+
+Партии читаются из файла построчно (файл целиком в память не загружается), раздаются
+пачками по процессам и проверяются ход за ходом по тем же правилам, что и в Game.play.
+Результаты возвращаются в порядке партий во входном файле.
+
+Форматы входа (по расширению .jsonl/.json, иначе текст):
+    текст:  <вариант> <ход> <ход> ...            например: chess e2e4 e7e5 g1f3
+    JSONL:  {"id": "...", "variant": "checkers", "moves": ["c3d4", ["f6", "e5"]],
+             "position": [8 строк диаграммы], "side": "black", "flying_kings": true}
+             # id, position, side, flying_kings - необязательны
+Ход записывается парой клеток: e2e4, e2-e4, c3:e5 или списком ["e2", "e4"]; цепочка взятий
+шашки - всеми клетками приземления: c3:e5:g7 или ["c3", "e5", "g7"].
+Пустые строки и строки, начинающиеся с #, пропускаются.
+Нечитаемая запись JSONL (неверный JSON, сторона или список ходов) отклоняется с номером строки.
+
+Запуск:
+    python replay.py games.jsonl [--workers 8] [--chunk-size 256] [--output results.jsonl]
+"""
+import argparse
+import json
+import os
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from game import VARIANTS, Game
+
+MOVE_FORMAT_ERROR = "Неверный формат хода. Пример: e2e4"
+# Сколько пачек на процесс держать в очереди: больше - меньше простоев, но больше памяти
+CHUNKS_PER_WORKER = 2
+
+
+class ReplayResult:
+    """Итог проверки одной партии."""
+    def __init__(self, game_id, variant, moves_applied, move_count, side, position, zobrist_hash, rejected_ply=None, reason=None):
+        """Инициализация итога. rejected_ply - номер отклонённого хода (с 1) или None, если партия прошла целиком."""
+        self.game_id = game_id
+        self.variant = variant
+        self.moves_applied = moves_applied
+        self.move_count = move_count
+        self.side = side
+        self.position = position
+        self.zobrist_hash = zobrist_hash
+        self.rejected_ply = rejected_ply
+        self.reason = reason
+
+    @property
+    def valid(self):
+        """Все ходы партии допустимы."""
+        return self.reason is None
+
+    def to_dict(self):
+        """Возвращает итог словарём для записи в JSONL."""
+        return {
+            "id": self.game_id, "variant": self.variant, "valid": self.valid,
+            "moves_applied": self.moves_applied, "move_count": self.move_count, "side": self.side,
+            "position": self.position.splitlines(), "hash": f"{self.zobrist_hash:016x}",
+            "rejected_ply": self.rejected_ply, "reason": self.reason,
+        }
+
+
+def split_move(move):
+    """Разбирает запись хода на начальную клетку, конечную клетку и промежуточные клетки цепочки взятий.
+
+    Возвращает None при неверном формате.
+    """
+    if isinstance(move, str):
+        move = move.strip().lower()
+        if len(move) == 4:
+            squares = [move[:2], move[2:]]
+        else:
+            squares = move.replace("-", ":").replace("x", ":").split(":")
+    else:
+        squares = move
+    if not isinstance(squares, (list, tuple)) or len(squares) < 2 or not all(isinstance(square, str) and len(square) == 2 for square in squares):
+        return None
+    return squares[0], squares[-1], squares[1:-1]
+
+
+def replay_game(game_id, variant, moves, position=None, side="white", flying_kings=False):
+    """Проигрывает партию до конца или до первого недопустимого хода. Возвращает ReplayResult."""
+    if not isinstance(variant, str) or variant not in VARIANTS:
+        return ReplayResult(game_id, variant, 0, 0, side, "", 0, 0, f"Неизвестный вариант: {variant}")
+    game = Game(*VARIANTS[variant], flying_kings=flying_kings)
+    if position:
+        try:
+            game.board.load_diagram(position, side)
+        except (ValueError, TypeError, AttributeError) as error:
+            return ReplayResult(game_id, variant, 0, game.move_count, side, "", 0, 0, f"Неверная позиция: {error}")
+        # История начинается с загруженной позиции, а не с начальной расстановки: отмена и журнал восстанавливают её
+        game.move_history.reset(game.move_count)
+
+    rejected_ply = None
+    reason = None
+    applied = 0
+    for ply, move in enumerate(moves, 1):
+        squares = split_move(move)
+        reason = MOVE_FORMAT_ERROR if squares is None else game.try_move(*squares)
+        if reason is not None:
+            rejected_ply = ply
+            break
+        applied += 1
+    board = game.board
+    return ReplayResult(game_id, variant, applied, game.move_count, game.current_player, board.to_diagram(), board.zobrist_hash, rejected_ply, reason)
+
+
+def record_error(record):
+    """Причина, по которой запись партии JSONL нельзя проверить, или None."""
+    if not isinstance(record, dict):
+        return "запись партии - не объект JSON"
+    if not isinstance(record.get("variant", "chess"), str):
+        return "variant - строка с именем варианта"
+    position = record.get("position")
+    if not (position is None or isinstance(position, str)
+            or isinstance(position, list) and all(isinstance(line, str) for line in position)):
+        return "position - строка диаграммы или список её строк"
+    if not isinstance(record.get("flying_kings", False), bool):
+        return "flying_kings - true или false"
+    if record.get("side", "white") not in ("white", "black"):
+        return f"неверная сторона: {record['side']} (ожидается white или black)"
+    moves = record.get("moves", [])
+    if not isinstance(moves, list) or not all(isinstance(move, (str, list)) for move in moves):
+        return "moves - список ходов: строк или списков клеток"
+    return None
+
+
+def read_games(path):
+    """Генератор партий файла: кортежи аргументов replay_game (id, вариант, ходы, позиция, сторона, дальнобойные дамки).
+
+    Вместо нечитаемой записи JSONL выдаётся готовый отклонённый ReplayResult с номером строки,
+    чтобы одна испорченная строка не обрывала проверку остальных партий.
+    """
+    jsonl = path.endswith((".jsonl", ".json"))
+    with open(path, encoding="utf-8") as file:
+        for line_number, line in enumerate(file, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if jsonl:
+                try:
+                    record = json.loads(line)
+                except ValueError as error:
+                    yield ReplayResult(line_number, None, 0, 0, "white", "", 0, 0, f"Строка {line_number}: неверный JSON ({error})")
+                    continue
+                reason = record_error(record)
+                if reason is not None:
+                    game_id, variant = (record.get("id", line_number), record.get("variant", "chess")) if isinstance(record, dict) else (line_number, None)
+                    yield ReplayResult(game_id, variant, 0, 0, "white", "", 0, 0, f"Строка {line_number}: {reason}")
+                    continue
+                position = record.get("position")
+                if isinstance(position, list):
+                    position = "\n".join(position)
+                yield (record.get("id", line_number), record.get("variant", "chess"), record.get("moves", []), position,
+                       record.get("side", "white"), record.get("flying_kings", False))
+            else:
+                variant, *moves = line.split()
+                yield line_number, variant, moves, None, "white", False
+
+
+def replay_chunk(chunk):
+    """Проверяет пачку партий (выполняется в процессе-обработчике); готовые итоги read_games передаются как есть."""
+    return [game if isinstance(game, ReplayResult) else replay_safely(game) for game in chunk]
+
+
+def replay_safely(game):
+    """replay_game, в котором сбой проверки одной партии отклоняет её, а не всю пачку."""
+    try:
+        return replay_game(*game)
+    except Exception as error:
+        game_id, variant, *_ = game
+        return ReplayResult(game_id, variant, 0, 0, "white", "", 0, 0, f"Ошибка проверки: {type(error).__name__}: {error}")
+
+
+def chunked(games, chunk_size):
+    """Собирает партии в пачки по chunk_size."""
+    chunk = []
+    for game in games:
+        chunk.append(game)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def replay_games(games, workers=None, chunk_size=256):
+    """Генератор итогов для потока партий в порядке входа.
+
+    Партии раздаются пачками по процессам. В работе одновременно не больше CHUNKS_PER_WORKER
+    пачек на процесс, поэтому вход читается по мере обработки, а не целиком.
+    workers=1 проверяет партии в текущем процессе.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for chunk in chunked(games, chunk_size):
+            yield from replay_chunk(chunk)
+        return
+    with ProcessPoolExecutor(workers) as executor:
+        pending = deque()
+        for chunk in chunked(games, chunk_size):
+            pending.append(executor.submit(replay_chunk, chunk))
+            if len(pending) >= workers * CHUNKS_PER_WORKER:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def main():
+    """Разбор аргументов командной строки."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", help="файл партий (текст или .jsonl)")
+    parser.add_argument("--workers", type=int, default=None, help="число процессов (по умолчанию - число ядер)")
+    parser.add_argument("--chunk-size", type=int, default=256, help="партий в одной пачке")
+    parser.add_argument("--output", help="записать итог каждой партии в JSONL")
+    parser.add_argument("--show-rejected", type=int, default=10, help="сколько отклонённых партий напечатать")
+    args = parser.parse_args()
+
+    output = open(args.output, "w", encoding="utf-8") if args.output else None
+    games = moves = rejected = 0
+    reasons = Counter()
+    started = time.perf_counter()
+    try:
+        for result in replay_games(read_games(args.path), args.workers, args.chunk_size):
+            games += 1
+            moves += result.moves_applied
+            if not result.valid:
+                rejected += 1
+                reasons[result.reason] += 1
+                if rejected <= args.show_rejected:
+                    print(f"партия {result.game_id} ({result.variant}): ход {result.rejected_ply} - {result.reason}")
+            if output:
+                output.write(json.dumps(result.to_dict(), ensure_ascii=False) + "\n")
+    finally:
+        if output:
+            output.close()
+    elapsed = time.perf_counter() - started
+
+    print(f"партий: {games}, допустимых: {games - rejected}, отклонённых: {rejected}, ходов: {moves}")
+    print(f"время: {elapsed:.2f} с, {games / elapsed if elapsed else 0:,.0f} партий/с, {moves / elapsed if elapsed else 0:,.0f} ходов/с")
+    for reason, count in reasons.most_common():
+        print(f"  {count:>8}  {reason}")
+
+
+if __name__ == "__main__":
+    main()
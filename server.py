@@ -0,0 +1,253 @@
+"""Сервер партий на asyncio: много независимых партий в одном цикле событий.
+
+Каждое подключение (TCP или Unix-сокет) - отдельная сессия со своей партией Game. Команды
+и ответы - строки UTF-8. Ответ - строка состояния "ok <текст>" или "error <причина>", затем
+строки данных (если есть) и пустая строка - конец ответа.
+
+Команды:
+    new [chess|modified_chess|checkers] [flying]   новая партия (при подключении - chess)
+    move e2e4 | move e2 e4 | move c3 e5 g7         ход ("ok <номер хода> <кто ходит> [мат|пат]");
+                                                   у цепочки шашки - все клетки приземления
+    select e2                                      ходы и взятия фигуры: "ok ходы: e3 e4 взятия:" (как в play)
+    moves                                          все ходы стороны, которая ходит
+    undo [N]                                       отмена хода или N ходов
+    board                                          кадр доски с фигурами под боем и шахом
+    threats                                        фигуры под боем и шах
+    hint [секунды]                                 подсказка хода
+    position                                       текстовая запись позиции (position.py)
+    quit                                           закрыть сессию
+
+Выбор, проверка и отмена ходов - те же методы Game, что и в консольной игре (Game.play).
+Тяжёлые запросы (угрозы, кадр доски, подсказка) считаются в исполнителе по двоичной записи
+позиции, поэтому занятая доска одной сессии не задерживает ходы остальных.
+
+Запуск:
+    python server.py [--host 127.0.0.1] [--port 8765] | [--unix /tmp/games.sock]
+                     [--executor process|thread] [--workers N] [--hint-time 1.0]
+Профиль сессий (без запросов в исполнителе) - переменные GAME_PROFILE, GAME_PROFILE_INTERVAL (см. profiling.py).
+"""
+import argparse
+import asyncio
+import inspect
+import math
+import os
+import signal
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from engine import Engine, move_name
+from game import VARIANTS, Game
+from move_cache import default_cache
+from perft import square_name
+from profiling import enable_from_environment
+from render import board_cells, frame_lines
+from replay import MOVE_FORMAT_ERROR, split_move
+
+# Длинные строки от клиента (больше лимита) закрывают сессию
+LINE_LIMIT = 4096
+COMMAND_ERROR = "Неизвестная команда. Команды: new, move, select, moves, undo, board, threats, hint, position, quit"
+_local = threading.local()
+
+
+def analyse(record, query, flying_kings=False, time_limit=1.0):
+    """Тяжёлый запрос по позиции в двоичной записи (выполняется в исполнителе).
+
+    query="threats" - (клетки фигур под боем, шах); query="hint" - (ход или None, описание поиска).
+    """
+    game = Game.from_bytes(record, move_cache=None, flying_kings=flying_kings)
+    if query == "threats":
+        return game.threat_status()
+    # Движок со своими таблицами - один на поток (и процесс) исполнителя
+    engine = getattr(_local, "engine", None)
+    if engine is None:
+        engine = _local.engine = Engine()
+    result = engine.search(game.board, game.checkers_rules, time_limit)
+    return result.move, result.describe()
+
+
+class GameSession:
+    """Сессия одного подключения: партия и разбор команд протокола."""
+    def __init__(self, server):
+        """Инициализация сессии с новой партией в шахматы."""
+        self.server = server
+        self.flying_kings = False
+        self.game = Game(move_cache=server.move_cache)
+
+    async def handle(self, line):
+        """Выполняет команду. Возвращает (успех, текст, строки данных)."""
+        command, *arguments = line.split()
+        handler = getattr(self, f"command_{command}", None)
+        if handler is None:
+            return False, COMMAND_ERROR, []
+        try:
+            inspect.signature(handler).bind(*arguments)
+        except TypeError:
+            return False, f"Неверные аргументы команды {command}: {handler.__doc__}", []
+        return await handler(*arguments)
+
+    async def command_new(self, variant="chess", *options):
+        """new - новая партия."""
+        if variant not in VARIANTS:
+            return False, f"Неизвестный вариант: {variant}. Варианты: {', '.join(VARIANTS)}", []
+        self.flying_kings = "flying" in options
+        self.game = Game(*VARIANTS[variant], move_cache=self.server.move_cache, flying_kings=self.flying_kings)
+        return True, f"{variant} {self.game.current_player}", []
+
+    async def command_move(self, *squares):
+        """move - ход."""
+        squares = split_move(squares[0] if len(squares) == 1 else list(squares))
+        if squares is None:
+            return False, MOVE_FORMAT_ERROR, []
+        error = self.game.try_move(*squares)
+        if error:
+            return False, error, []
+        return True, f"{self.game.move_count} {self.game.current_player} {self.game.result() or ''}".rstrip(), []
+
+    async def command_select(self, position=""):
+        """select - ходы и взятия фигуры."""
+        _, possible_moves, capture_moves, error = self.game.select_piece(position)
+        if error:
+            return False, error, []
+        return True, (f"ходы: {' '.join(square_name(*square) for square in possible_moves)} "
+                      f"взятия: {' '.join(square_name(*square) for square in capture_moves)}").rstrip(), []
+
+    async def command_moves(self):
+        """moves - все ходы стороны."""
+        moves = [":".join(square_name(*square) for square in [(move[0], move[1]), *move[4], (move[2], move[3])])
+                 for move in self.game.side_moves()]
+        return True, " ".join(moves), []
+
+    async def command_undo(self, number_moves="1"):
+        """undo - отмена ходов."""
+        # Не isdigit: он принимает "²", на котором int падает и обрывает сессию
+        try:
+            count = int(number_moves)
+        except ValueError:
+            count = 0
+        if count < 1:
+            return False, "Число отменяемых ходов - целое положительное число.", []
+        message = self.game.undo(count)
+        return True, f"{self.game.move_count} {self.game.current_player} {message}", []
+
+    async def command_threats(self):
+        """threats - фигуры под боем и шах."""
+        threatened_pieces, king_in_check = await self.server.query(self, "threats")
+        return True, f"{'шах' if king_in_check else '-'} {' '.join(square_name(*square) for square in threatened_pieces)}".rstrip(), []
+
+    async def command_board(self):
+        """board - кадр доски."""
+        threatened_pieces, king_in_check = await self.server.query(self, "threats")
+        cells = board_cells(self.game.board, threatened_pieces=threatened_pieces, king_in_check=king_in_check)
+        return True, f"{self.game.move_count} {self.game.current_player}", frame_lines(self.game.move_count, cells)
+
+    async def command_hint(self, time_limit=None):
+        """hint - подсказка хода."""
+        try:
+            time_limit = self.game.hint_time if time_limit is None else float(time_limit)
+        except ValueError:
+            return False, "Время подсказки - число секунд.", []
+        # nan и inf прошли бы через min и оставили бы поиск без срока
+        if not math.isfinite(time_limit) or time_limit <= 0:
+            return False, "Время подсказки - положительное число секунд.", []
+        move, description = await self.server.query(self, "hint", min(time_limit, self.server.hint_limit))
+        return (True, f"{move_name(move)} {description}", []) if move else (False, "Ходов нет.", [])
+
+    async def command_position(self):
+        """position - текстовая запись позиции."""
+        return True, self.game.to_text(), []
+
+
+class GameServer:
+    """Сервер сессий: подключения, исполнитель тяжёлых запросов и счётчики."""
+    def __init__(self, executor=None, move_cache=default_cache, hint_limit=10.0):
+        """Инициализация. executor - исполнитель тяжёлых запросов (None - поток по умолчанию цикла событий),
+        move_cache - общий кэш ходов партий, hint_limit - наибольшее время подсказки, с."""
+        self.executor = executor
+        self.move_cache = move_cache
+        self.hint_limit = hint_limit
+        self.sessions = 0
+        self.commands = 0
+
+    async def query(self, session, query, *arguments):
+        """Выполняет тяжёлый запрос по текущей позиции сессии в исполнителе."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, analyse, session.game.to_bytes(), query, session.flying_kings, *arguments)
+
+    async def serve_client(self, reader, writer):
+        """Обслуживает одно подключение до команды quit или разрыва."""
+        session = GameSession(self)
+        self.sessions += 1
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):
+                    break
+                if not line:
+                    break
+                line = line.decode("utf-8", "replace").strip()
+                if not line:
+                    continue
+                if line == "quit":
+                    writer.write("ok пока\n\n".encode("utf-8"))
+                    break
+                self.commands += 1
+                ok, text, data = await session.handle(line)
+                writer.write(("\n".join([f"{'ok' if ok else 'error'} {text}".rstrip(), *data, "", ""])).encode("utf-8"))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.sessions -= 1
+            writer.close()
+
+    async def start(self, host="127.0.0.1", port=8765, unix_path=None):
+        """Открывает сокет и возвращает asyncio.Server."""
+        if unix_path:
+            return await asyncio.start_unix_server(self.serve_client, unix_path, limit=LINE_LIMIT, backlog=4096)
+        return await asyncio.start_server(self.serve_client, host, port, limit=LINE_LIMIT, backlog=4096)
+
+
+def create_executor(kind, workers):
+    """Исполнитель тяжёлых запросов: процессы (не делят GIL с циклом событий) или потоки."""
+    if kind == "process":
+        return ProcessPoolExecutor(workers)
+    return ThreadPoolExecutor(workers)
+
+
+async def serve(args):
+    """Запускает сервер и обслуживает подключения до остановки."""
+    with create_executor(args.executor, args.workers) as executor:
+        game_server = GameServer(executor, hint_limit=args.hint_time)
+        server = await game_server.start(args.host, args.port, args.unix)
+        address = args.unix or f"{args.host}:{args.port}"
+        print(f"сервер партий: {address}, исполнитель {args.executor}", flush=True)
+        # SIGTERM закрывает сервер: выход из with останавливает процессы исполнителя, иначе они переживут сервер
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, server.close)
+        async with server:
+            try:
+                await server.serve_forever()
+            except asyncio.CancelledError:
+                if server.is_serving():
+                    raise
+
+
+def main():
+    """Разбор аргументов командной строки."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="путь Unix-сокета (вместо TCP)")
+    parser.add_argument("--executor", choices=["process", "thread"], default="process")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="процессов или потоков исполнителя")
+    parser.add_argument("--hint-time", type=float, default=1.0, help="наибольшее время подсказки, с")
+    args = parser.parse_args()
+    enable_from_environment()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
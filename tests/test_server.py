@@ -0,0 +1,44 @@
+"""Разбор команд сессии сервера партий (server.py) без сокета и исполнителя.
+
+Запуск из корня проекта: python -m unittest discover tests (или pytest tests)
+"""
+import asyncio
+import unittest
+
+from server import GameServer, GameSession
+
+
+class CommandParsingTest(unittest.TestCase):
+    """Неверные числа и клетки в командах - ответ об ошибке, а не обрыв сессии."""
+    def setUp(self):
+        """Новая сессия с партией в шахматы."""
+        self.session = GameSession(GameServer())
+
+    def command(self, line):
+        """Выполняет строку команды и возвращает (успех, текст, строки данных)."""
+        return asyncio.run(self.session.handle(line))
+
+    def test_undo_rejects_non_ascii_digit(self):
+        self.assertTrue(self.command("move e2 e4")[0])
+        ok, text, _ = self.command("undo ²")
+        self.assertFalse(ok)
+        self.assertIn("целое положительное число", text)
+        # Сессия жива, ход не отменён
+        self.assertEqual(self.session.game.move_count, 2)
+
+    def test_undo_rejects_non_positive_count(self):
+        self.assertTrue(self.command("move e2 e4")[0])
+        for count in ("0", "-3", "x"):
+            self.assertFalse(self.command(f"undo {count}")[0])
+        self.assertTrue(self.command("undo 1")[0])
+        self.assertEqual(self.session.game.move_count, 1)
+
+    def test_squares_with_non_ascii_digit(self):
+        for line in ("move e² e4", "select e²"):
+            ok, _, _ = self.command(line)
+            self.assertFalse(ok)
+        self.assertTrue(self.command("move e2 e4")[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+"""Реестр вариантов игры: расстановка, фигуры и правила ходов каждого варианта.
+
+Вариант описывается Variant и регистрируется register(). Доска варианта задаётся парой
+(game_type, modified_chess) - она входит в хеш позиции и записи позиций. Расстановка, виды
+фигур и правила ходов стороны задаются объектами или ссылками "модуль:имя", которые
+импортируются при первом обращении: так модуль варианта (или правил, как checkers.py у
+шашек) не загружается, пока в этот вариант не играют. Таблицы движения фигур
+(movement.Movement) в любом случае строятся только при первых ходах.
+
+Встроенные варианты регистрирует game.py - их фигуры и расстановки определены там; новый
+вариант - вызов register() в его модуле:
+    register(Variant("shatranj", "shatranj", setup="shatranj:setup", pieces=[("shatranj:Ferz", ())]))
+"""
+import importlib
+
+# Варианты игры: имя -> (game_type, modified_chess); порядок - порядок регистрации
+VARIANTS = {}
+_registry = {}
+
+
+def resolve(reference):
+    """Объект по ссылке "модуль:имя" (модуль импортируется при первом обращении); не строку возвращает как есть."""
+    if not isinstance(reference, str):
+        return reference
+    module, _, name = reference.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+
+class Variant:
+    """Вариант игры: доска (game_type, modified_chess), расстановка, виды фигур и правила ходов."""
+    def __init__(self, name, game_type, modified_chess=False, setup=None, pieces=(), rules=None):
+        """Инициализация. setup - функция расстановки setup(board), pieces - виды фигур (класс, аргументы
+        после цвета), rules - фабрика правил ходов стороны rules(flying_kings) или None (ходы фигур по
+        описаниям движения). Ссылки можно задавать строками "модуль:имя"."""
+        self.name = name
+        self.game_type = game_type
+        self.modified_chess = modified_chess
+        self._setup = setup
+        self._pieces = pieces
+        self._rules = rules
+
+    def setup(self, board):
+        """Расставляет фигуры варианта на доске."""
+        resolve(self._setup)(board)
+
+    def piece_types(self):
+        """Виды фигур варианта: пары (класс, аргументы после цвета)."""
+        return [(resolve(piece_type), args) for piece_type, args in self._pieces]
+
+    def rules(self, flying_kings=False):
+        """Правила ходов стороны (например, checkers.CheckersRules) или None."""
+        return resolve(self._rules)(flying_kings) if self._rules is not None else None
+
+    def prepare(self):
+        """Строит заранее таблицы движения фигур варианта (например, перед запуском рабочих процессов)."""
+        for piece_type, args in self.piece_types():
+            for color in ("white", "black"):
+                piece = piece_type(color, *args)
+                for attribute in ("movement", "capture_movement"):
+                    movement = getattr(piece, attribute, None)
+                    if movement is not None:
+                        movement.tables
+
+
+def register(variant):
+    """Регистрирует вариант (вариант с тем же именем заменяется)."""
+    _registry[variant.name] = variant
+    VARIANTS[variant.name] = (variant.game_type, variant.modified_chess)
+    return variant
+
+
+def get_variant(name):
+    """Вариант по имени."""
+    try:
+        return _registry[name]
+    except KeyError:
+        raise ValueError(f"Неизвестный вариант: {name}. Варианты: {', '.join(VARIANTS)}") from None
+
+
+def variant_of(game_type, modified_chess=False):
+    """Вариант доски (game_type, modified_chess)."""
+    for variant in _registry.values():
+        if variant.game_type == game_type and variant.modified_chess == modified_chess:
+            return variant
+    raise ValueError(f"Неизвестный вариант доски: {game_type}, modified_chess={modified_chess}")
+
+
+def game_type_pieces(game_type):
+    """Виды фигур всех вариантов с этим game_type (без повторов, в порядке регистрации)."""
+    pieces = []
+    for variant in _registry.values():
+        if variant.game_type == game_type:
+            pieces += [piece for piece in variant.piece_types() if piece not in pieces]
+    return pieces
@@ -0,0 +1,26 @@
+"""Ключи Zobrist для инкрементального хеширования позиций."""
+import random
+
+
+def _random_keys(seed, count):
+    """Возвращает детерминированные 64-битные ключи: одинаковые во всех процессах."""
+    rng = random.Random(seed)
+    return [rng.getrandbits(64) for _ in range(count)]
+
+
+# Ключ добавляется в хеш, когда ходят чёрные
+SIDE_KEY = _random_keys("side to move", 1)[0]
+_PIECE_KEYS = {}
+
+
+def piece_keys(kind):
+    """Возвращает 64 ключа (по одному на клетку) для вида фигуры, см. Piece.hash_kind."""
+    keys = _PIECE_KEYS.get(kind)
+    if keys is None:
+        keys = _PIECE_KEYS[kind] = _random_keys(repr(kind), 64)
+    return keys
+
+
+def variant_key(game_type, modified_chess):
+    """Возвращает ключ варианта игры."""
+    return _random_keys(f"variant {game_type} {modified_chess}", 1)[0]